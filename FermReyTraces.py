@@ -1,10 +1,100 @@
 import sys
 import math
+import time
+import numpy as np
+from functools import partial
 from PyQt5.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout, 
-                            QHBoxLayout, QLabel, QLineEdit, QPushButton)
+                            QHBoxLayout, QLabel, QLineEdit, QPushButton, QComboBox, QCheckBox,
+                            QSpinBox)
 from PyQt5.QtGui import (QPainter, QPen, QColor, QFont, QBrush, 
-                         QCursor, QTransform)
-from PyQt5.QtCore import Qt, QTimer, QPoint, QRect
+                         QCursor, QTransform, QImage, QPixmap, QPolygonF, QPainterPath)
+from PyQt5.QtCore import Qt, QTimer, QPoint, QPointF, QRect, QRectF, QSize
+
+from mkm.fermat import (multilayer_crossing_points, multilayer_travel_time,
+                        multilayer_snell_residuals, mirage_index, grin_lens_index, EikonalSolver,
+                        ray_fan, fan_wavefronts)
+from mkm.profiling import profiler, create_status_bar
+from mkm.sweep import result_cache
+
+
+def _to_qpolygonf(points):
+    """Копирует массив точек (K, 2) в QPolygonF одной операцией с памятью, без цикла по точкам."""
+    points = np.ascontiguousarray(points, dtype=np.float64)
+    polygon = QPolygonF(len(points))
+    buffer = polygon.data()
+    buffer.setsize(points.nbytes)
+    np.frombuffer(buffer, dtype=np.float64)[:] = points.ravel()
+    return polygon
+
+class LayerCache:
+    """
+    Растровый слой холста с запасом по краям.
+
+    Слой рисуется в пиксельных координатах для вида (offset, scale), зафиксированного при построении.
+    Панорамирование в пределах запаса — это только смещение готового pixmap, изменение масштаба —
+    его временное растяжение до перестроения.
+    """
+
+    def __init__(self):
+        self.pixmap = None
+
+    def invalidate(self):
+        self.pixmap = None
+
+    def usable(self, size, offset, scale):
+        """Можно ли показать слой для текущего вида без перестроения."""
+        if self.pixmap is None or self.size != size:
+            return False
+        if self.scale != scale:
+            return True
+        delta = offset - self.offset
+        return abs(delta.x()) <= self.margin.x() and abs(delta.y()) <= self.margin.y()
+
+    def begin(self, size, offset, scale):
+        """Создает пустой слой для вида (offset, scale) и возвращает QPainter для рисования в нем."""
+        self.size = QSize(size)
+        self.offset = QPoint(offset)
+        self.scale = scale
+        self.margin = QPoint(size.width() // 2, size.height() // 2)
+        self.pixmap = QPixmap(size.width() + 2 * self.margin.x(), size.height() + 2 * self.margin.y())
+        self.pixmap.fill(Qt.transparent)
+        return self.open()
+
+    def open(self):
+        """QPainter для дорисовки в существующий слой."""
+        painter = QPainter(self.pixmap)
+        painter.setRenderHint(QPainter.Antialiasing)
+        return painter
+
+    def map_point(self, x, y):
+        """Мировые координаты -> пиксели слоя."""
+        return QPoint(
+            int(self.offset.x() + self.margin.x() + x * self.scale),
+            int(self.offset.y() + self.margin.y() - y * self.scale))
+
+    def world_transform(self):
+        """Преобразование мировых координат в пиксели слоя для QPainter.setTransform."""
+        return QTransform(self.scale, 0, 0, -self.scale,
+                          self.offset.x() + self.margin.x(), self.offset.y() + self.margin.y())
+
+    def blit(self, painter, offset, scale):
+        """
+        Выводит слой для текущего вида.
+
+        Returns:
+            True, если масштаб отличается и слой показан растянутым (нужно перестроение).
+        """
+        if self.scale == scale:
+            painter.drawPixmap(offset - self.offset - self.margin, self.pixmap)
+            return False
+        ratio = scale / self.scale
+        painter.save()
+        painter.translate(offset.x(), offset.y())
+        painter.scale(ratio, ratio)
+        painter.translate(-self.offset.x() - self.margin.x(), -self.offset.y() - self.margin.y())
+        painter.drawPixmap(0, 0, self.pixmap)
+        painter.restore()
+        return True
 
 class OpticalSimulator(QMainWindow):
     def __init__(self):
@@ -23,6 +113,9 @@ class OpticalSimulator(QMainWindow):
         self.n2 = 1.5
         self.A = (-2, 5)
         self.B = (3, -5)
+        self.layers = []  # Дополнительные границы ниже y=0: [(y, n), ...]
+        self.medium = "Граница"
+        self.fan_rays = 0  # Число лучей веера; 0 — режим золотого сечения
         
         self.init_ui()
         self.reset_simulation()
@@ -50,6 +143,22 @@ class OpticalSimulator(QMainWindow):
             control_panel.addWidget(lbl)
             control_panel.addWidget(inp)
 
+        # Дополнительные слои под границей y=0, например "-2:1.33; -4:2.4"
+        self.layers_input = QLineEdit("")
+        self.layers_input.setPlaceholderText("y:n; y:n")
+        control_panel.addWidget(QLabel("Слои:"))
+        control_panel.addWidget(self.layers_input)
+
+        self.medium_combo = QComboBox()
+        self.medium_combo.addItems(list(CanvasWidget.MEDIA))
+        control_panel.addWidget(QLabel("Среда:"))
+        control_panel.addWidget(self.medium_combo)
+
+        self.fan_checkbox = QCheckBox("Веер")
+        self.fan_rays_input = QLineEdit("10000")
+        control_panel.addWidget(self.fan_checkbox)
+        control_panel.addWidget(self.fan_rays_input)
+
         self.btn_update = QPushButton("Обновить")
         self.btn_update.clicked.connect(self.update_parameters)
         control_panel.addWidget(self.btn_update)
@@ -61,12 +170,27 @@ class OpticalSimulator(QMainWindow):
         control_panel.addWidget(self.btn_start)
         control_panel.addWidget(self.btn_stop)
 
+        # Скорость воспроизведения готовой трассы: интервал между итерациями
+        self.interval_spinbox = QSpinBox()
+        self.interval_spinbox.setRange(0, 5000)
+        self.interval_spinbox.setSingleStep(50)
+        self.interval_spinbox.setValue(500)
+        self.interval_spinbox.setSuffix(" мс")
+        self.interval_spinbox.valueChanged.connect(self.timer_interval_changed)
+        control_panel.addWidget(self.interval_spinbox)
+
+        self.btn_result = QPushButton("Результат")
+        self.btn_result.clicked.connect(self.show_result)
+        control_panel.addWidget(self.btn_result)
+
         layout.addLayout(control_panel)
 
         # Холст для рисования
         self.canvas = CanvasWidget(self)
         layout.addWidget(self.canvas)
 
+        self.setStatusBar(create_status_bar(self))
+
         # Таймер анимации
         self.timer = QTimer()
         self.timer.timeout.connect(self.animation_step)
@@ -83,6 +207,14 @@ class OpticalSimulator(QMainWindow):
                 float(self.inputs["Bx:"].text()),
                 float(self.inputs["By:"].text())
             )
+            self.layers = [
+                tuple(float(value) for value in item.split(":"))
+                for item in self.layers_input.text().split(";") if item.strip()
+            ]
+            if any(len(layer) != 2 for layer in self.layers):
+                raise ValueError("Слой задается парой y:n")
+            self.medium = self.medium_combo.currentText()
+            self.fan_rays = int(self.fan_rays_input.text()) if self.fan_checkbox.isChecked() else 0
             self.reset_simulation()
         except ValueError:
             pass
@@ -92,11 +224,22 @@ class OpticalSimulator(QMainWindow):
         self.canvas.n2 = self.n2
         self.canvas.A = self.A
         self.canvas.B = self.B
+        self.canvas.layers = self.layers
+        self.canvas.medium = self.medium
+        self.canvas.fan_rays = self.fan_rays
         self.canvas.reset()
         self.canvas.update()
 
     def start_animation(self):
-        self.timer.start(500)
+        self.timer.start(self.interval_spinbox.value())
+
+    def timer_interval_changed(self, value):
+        self.timer.setInterval(value)
+
+    def show_result(self):
+        self.timer.stop()
+        self.canvas.show_result()
+        self.canvas.update()
 
     def stop_animation(self):
         self.timer.stop()
@@ -133,63 +276,141 @@ class OpticalSimulator(QMainWindow):
         self.canvas.update()
 
 class CanvasWidget(QWidget):
+    # Среды: "Граница" — две однородные среды, остальные — градиентные поля n(x, y)
+    MEDIA = {
+        "Граница": None,
+        "Мираж": partial(mirage_index, n0=1.0, gradient=0.02),
+        "GRIN-линза": grin_lens_index,
+    }
+
     def __init__(self, parent):
         super().__init__(parent)
         self.n1 = 1.0
         self.n2 = 1.5
         self.A = (-2, 5)
         self.B = (3, -5)
+        self.layers = []
         self.history = []
+        self.trace = []
+        self.result = None
         self.true_x = None
+        self.multilayer_path = None
+        self.medium = "Граница"
+        self.eikonal_solvers = {}  # Кэш решателей по среде: поле времен пересчитывается только при смене A
+        self.eikonal_path = None
+        self.fan_rays = 0
+        self.fan = None
+        self.info_lines = []
+
+        # Кэш статичного слоя: перестраивается только при смене содержимого или вида
+        self.static_layer = LayerCache()
+        self.label_rects = []
+        self.drawn_iterations = 0
+        self.true_path_drawn = False
+        self.frame_time = None
+        self.layer_rebuild_timer = QTimer(self)
+        self.layer_rebuild_timer.setSingleShot(True)
+        self.layer_rebuild_timer.timeout.connect(self.rebuild_layer)
         self.reset()
 
+    @profiler.timed('fermat.solve')
     def reset(self):
         self.history = []
+        self.trace = []
+        self.result = None
         self.true_x = None
-        self.generator = self.golden_section_generator()
-        next(self.generator)
-
-    def golden_section_generator(self):
-        gr = (math.sqrt(5) + 1) / 2
-        a = min(self.A[0], self.B[0])
-        b = max(self.A[0], self.B[0])
-        c = b - (b - a)/gr
-        d = a + (b - a)/gr
-        fc = self.time_function(c)
-        fd = self.time_function(d)
-        
-        while abs(b - a) > 1e-5:
-            yield {'a': a, 'b': b, 'c': c, 'd': d, 'fc': fc, 'fd': fd}
-            
-            if fc < fd:
-                b = d
-            else:
-                a = c
-            
-            c = b - (b - a)/gr
-            d = a + (b - a)/gr
-            fc = self.time_function(c)
-            fd = self.time_function(d)
-        
-        self.true_x = (a + b)/2
-        yield True
+        self.multilayer_path = None
+        self.eikonal_path = None
+        self.fan = None
+        self.info_lines = []
+        self.static_layer.invalidate()
+        if self.fan_rays > 0:
+            # Веер лучей: геометрия строится один раз в мировых координатах,
+            # панорамирование и масштаб меняют только преобразование QPainter
+            self.build_ray_fan()
+            return
+        if self.MEDIA.get(self.medium) is not None:
+            # Градиентная среда: путь наименьшего времени по полю эйконала
+            solver = self.eikonal_solver()
+            self.eikonal_path = solver.trace_ray(self.A, self.B)
+            self.eikonal_time = solver.travel_time(self.A, self.B)
+            self.info_lines = [
+                f"Среда: {self.medium}",
+                f"Время прохождения: {self.eikonal_time:.5f}",
+                f"Сетка: {len(solver.x)}×{len(solver.y)}, шаг {solver.hx:.3f}",
+            ]
+            return
+        if self.layers:
+            # Слоистая среда: путь находится сразу методом Ньютона по всем точкам пересечения
+            interfaces, indices = self.multilayer_media()
+            xs = multilayer_crossing_points(self.A, self.B, interfaces, indices)
+            self.multilayer_path = [self.A] + list(zip(xs, interfaces)) + [self.B]
+            self.multilayer_xs = xs
+            self.info_lines = self.multilayer_info()
+            return
+
+        # Трасса золотого сечения считается сразу целиком, холст только воспроизводит ее
+        self.result = result_cache.compute('fermat.golden_section', A=self.A, B=self.B, n1=self.n1, n2=self.n2)
+        self.trace = self.result['trace']
+        self.expected_iterations = max(1, len(self.trace))
+
+    @profiler.timed('fermat.ray_fan')
+    def build_ray_fan(self):
+        fan = ray_fan(self.A, self.n1, self.n2, self.fan_rays)
+        source = np.broadcast_to(np.asarray(self.A, dtype=float), fan['hits'].shape)
+        # Пары точек для drawLines: A -> точка на границе, точка на границе -> конец луча
+        pairs = np.stack((source, fan['hits'], fan['hits'], fan['ends']), axis=1)
+        self.fan = {
+            'refracted': _to_qpolygonf(pairs[~fan['tir']].reshape(-1, 2)),
+            'reflected': _to_qpolygonf(pairs[fan['tir']].reshape(-1, 2)),
+            'wavefronts': QPainterPath(),
+            'tir_count': int(fan['tir'].sum()),
+        }
+        # Для изохрон достаточно разреженного веера: форма фронта гладкая
+        sparse_fan = ray_fan(self.A, self.n1, self.n2, min(self.fan_rays, 2000))
+        max_time = self.n1 * self.A[1] + max(self.n1, self.n2) * sparse_fan['length']
+        for polyline in fan_wavefronts(self.A, sparse_fan, self.n1, np.linspace(0, max_time, 16)[1:]):
+            self.fan['wavefronts'].addPolygon(_to_qpolygonf(polyline))
+
+        self.info_lines = [f"Лучей: {self.fan_rays}", f"Полное внутреннее отражение: {self.fan['tir_count']}"]
+        if self.n1 > self.n2:
+            self.info_lines.append(f"Критический угол: {math.degrees(math.asin(self.n2 / self.n1)):.2f}°")
+
+    def eikonal_solver(self):
+        """Решатель эйконала для текущей среды (создается один раз, область охватывает A и B)."""
+        solver = self.eikonal_solvers.get(self.medium)
+        extent = max(10.0, 1.2 * max(abs(v) for v in self.A + self.B))
+        if solver is None or solver.x[-1] < extent:
+            solver = EikonalSolver(self.MEDIA[self.medium], (-extent, extent), (-extent, extent))
+            image = np.interp(solver.n, (solver.n.min(), solver.n.max() + 1e-12), (235, 140))
+            solver.image_data = np.ascontiguousarray(image[::-1].astype(np.uint8))
+            self.eikonal_solvers[self.medium] = solver
+        return solver
 
-    def time_function(self, x):
-        d1 = math.sqrt((x - self.A[0])**2 + (0 - self.A[1])**2)
-        d2 = math.sqrt((self.B[0] - x)**2 + (self.B[1] - 0)**2)
-        return self.n1 * d1 + self.n2 * d2
+    def multilayer_media(self):
+        """Границы (включая y=0) и показатели преломления всех слоев сверху вниз."""
+        interfaces = [0.0] + [y for y, _ in self.layers]
+        indices = [self.n1, self.n2] + [n for _, n in self.layers]
+        return interfaces, indices
 
     def next_iteration(self):
-        try:
-            state = next(self.generator)
-            if state is not True:
-                self.history.append(state)
-                return True
-            return False
-        except StopIteration:
-            return False
+        """Показывает следующую итерацию готовой трассы; False — трасса закончилась."""
+        if len(self.history) < len(self.trace):
+            self.history.append(self.trace[len(self.history)])
+            return True
+        if self.result is not None and self.true_x is None:
+            self.true_x = self.result['x']
+            self.info_lines = self.golden_section_info()
+        return False
+
+    def show_result(self):
+        """Сразу показывает всю трассу и результат."""
+        while self.next_iteration():
+            pass
 
+    @profiler.timed('paint.frame')
     def paintEvent(self, event):
+        started = time.perf_counter()
         painter = QPainter(self)
         painter.setRenderHint(QPainter.Antialiasing)
         
@@ -204,12 +425,68 @@ class CanvasWidget(QWidget):
                 int(offset.x() + x * scale),
                 int(offset.y() - y * scale))
         
+        if self.eikonal_path is not None:
+            self.draw_gradient_medium(painter, map_point)
+        else:
+            # Статичные части (границы, лучи, подписи) — из кэшированного слоя
+            layer = self.static_layer
+            if not layer.usable(self.size(), offset, scale):
+                self.render_static_layer(offset, scale)
+            else:
+                profiler.count('paint.layer_cache_hits')
+                if layer.scale == scale and (self.drawn_iterations < len(self.history)
+                                             or (self.true_x is not None and not self.true_path_drawn)):
+                    self.render_new_iterations()
+            if layer.blit(painter, offset, scale):
+                self.layer_rebuild_timer.start(200)
+
+            if self.fan is not None:
+                painter.setPen(QPen(Qt.blue, 10))
+                painter.drawPoint(map_point(*self.A))
+
+        if self.info_lines:
+            self.draw_text_panel(painter, self.info_lines)
+
+        # Время кадра (экспоненциальное сглаживание)
+        frame_ms = 1000 * (time.perf_counter() - started)
+        self.frame_time = frame_ms if self.frame_time is None else 0.9 * self.frame_time + 0.1 * frame_ms
+        profiler.count('gui.frames')
+        painter.setPen(QPen(Qt.darkGray, 1))
+        painter.setFont(QFont('Arial', 9))
+        painter.drawText(10, self.height() - 10,
+                         f"Кадр: {self.frame_time:.2f} мс, итераций: {len(self.history)}")
+
+    def rebuild_layer(self):
+        self.static_layer.invalidate()
+        self.update()
+
+    @profiler.timed('paint.static_layer')
+    def render_static_layer(self, offset, scale):
+        """Полностью перестраивает слой для текущего вида."""
+        layer = self.static_layer
+        painter = layer.begin(self.size(), offset, scale)
+        self.label_rects = []
+        self.drawn_iterations = 0
+        self.true_path_drawn = False
+
+        if self.fan is not None:
+            self.draw_ray_fan(painter, layer)
+            painter.end()
+            return
+
+        map_point = layer.map_point
+
         # Отрисовка границы сред
         painter.setPen(QPen(Qt.black, 2))
         left_bound = map_point(-100, 0)
         right_bound = map_point(100, 0)
         painter.drawLine(left_bound, right_bound)
 
+        # Дополнительные границы слоистой среды
+        painter.setPen(QPen(Qt.black, 1, Qt.DashLine))
+        for y, _ in self.layers:
+            painter.drawLine(map_point(-100, y), map_point(100, y))
+
         # Отрисовка точек A и B
         a_scr = map_point(*self.A)
         b_scr = map_point(*self.B)
@@ -220,63 +497,132 @@ class CanvasWidget(QWidget):
         painter.drawText(a_scr.x() - 20, a_scr.y() - 10, "A")
         painter.drawText(b_scr.x() - 20, b_scr.y() - 10, "B")
 
+        # Отрисовка пути через слоистую среду
+        if self.multilayer_path is not None:
+            painter.setPen(QPen(QColor(0, 120, 0), 3))
+            points = [map_point(x, y) for x, y in self.multilayer_path]
+            for start, end in zip(points[:-1], points[1:]):
+                painter.drawLine(start, end)
+
+        painter.end()
+        self.render_new_iterations()
+
+    @profiler.timed('paint.new_iterations')
+    def render_new_iterations(self):
+        """Дорисовывает в слой итерации, появившиеся после последнего обновления."""
+        layer = self.static_layer
+        map_point = layer.map_point
+        painter = layer.open()
+        painter.setFont(self.font())
+        metrics = painter.fontMetrics()
+        a_scr = map_point(*self.A)
+        b_scr = map_point(*self.B)
+
         # Отрисовка пробных лучей
-        for i, state in enumerate(self.history):
-            alpha = int(30 + 70 * i/len(self.history)) if self.history else 255
+        for i in range(self.drawn_iterations, len(self.history)):
+            state = self.history[i]
+            # Прозрачность задается от полного числа итераций, чтобы не перерисовывать старые лучи
+            alpha = int(30 + 70 * min(i / self.expected_iterations, 1))
             color = QColor(150, 150, 150)
             color.setAlpha(alpha)
-            
-            c_scr = map_point(state['c'], 0)
-            d_scr = map_point(state['d'], 0)
-            
-            painter.setPen(QPen(color, 1))
-            
-            # Луч через точку c
-            painter.drawLine(a_scr, c_scr)
-            painter.drawLine(c_scr, b_scr)
-            # Отображение времени для c
             time_color = QColor(90, 90, 90, alpha)
-            painter.setPen(QPen(time_color, 1))
-            painter.drawText(c_scr.x() + 5, c_scr.y() - 10, f"t={state['fc']:.6f}")
-            
-            # Луч через точку d
-            painter.setPen(QPen(color, 1))
-            painter.drawLine(a_scr, d_scr)
-            painter.drawLine(d_scr, b_scr)
-            # Отображение времени для d
-            painter.setPen(QPen(time_color, 1))
-            painter.drawText(d_scr.x() + 5, d_scr.y() - 10, f"t={state['fd']:.6f}")
+
+            for x, t in ((state['c'], state['fc']), (state['d'], state['fd'])):
+                point_scr = map_point(x, 0)
+                painter.setPen(QPen(color, 1))
+                painter.drawLine(a_scr, point_scr)
+                painter.drawLine(point_scr, b_scr)
+
+                # Отображение времени, если подпись не перекрывает уже нарисованные
+                text = f"t={t:.6f}"
+                rect = metrics.boundingRect(text).translated(point_scr.x() + 5, point_scr.y() - 10)
+                if not any(rect.intersects(other) for other in self.label_rects):
+                    self.label_rects.append(rect)
+                    painter.setPen(QPen(time_color, 1))
+                    painter.drawText(point_scr.x() + 5, point_scr.y() - 10, text)
+        self.drawn_iterations = len(self.history)
 
         # Отрисовка истинного пути
-        if self.true_x is not None:
+        if self.true_x is not None and not self.true_path_drawn:
             mid_scr = map_point(self.true_x, 0)
-            
-            # Оптимальный путь
             painter.setPen(QPen(Qt.red, 3))
             painter.drawLine(a_scr, mid_scr)
             painter.drawLine(mid_scr, b_scr)
-            
-            # Расчет углов
-            theta1 = math.atan2(self.true_x - self.A[0], self.A[1])
-            theta2 = math.atan2(self.B[0] - self.true_x, abs(self.B[1]))
-            
-            
-            # Информационная панель
-            self.draw_info_panel(painter, theta1, theta2)
-        
+            self.true_path_drawn = True
+        painter.end()
 
-    def draw_info_panel(self, painter, theta1, theta2):
-        true_time = self.time_function(self.true_x)
-        snell_lhs = self.n1 * math.sin(theta1)
-        snell_rhs = self.n2 * math.sin(theta2)
-        
-        info = [
-            f"Время прохождения: {true_time:.7f}",
-            f"n₁⋅sinθ₁ = {snell_lhs:.4f}",
-            f"n₂⋅sinθ₂ = {snell_rhs:.4f}",
-            "✓ Закон Снеллиуса выполнен" if abs(snell_lhs - snell_rhs) < 1e-3 else "✗ Ошибка Снеллиуса"
+    def golden_section_info(self):
+        """Строки информационной панели; считаются один раз после завершения поиска."""
+        snell = self.result['snell']
+        newton_x = self.result['newton_x']
+        return [
+            f"Время прохождения: {self.result['time']:.7f}",
+            f"n₁⋅sinθ₁ = {snell['lhs']:.4f}",
+            f"n₂⋅sinθ₂ = {snell['rhs']:.4f}",
+            "✓ Закон Снеллиуса выполнен" if snell['ok'] else "✗ Ошибка Снеллиуса",
+            f"x (Ньютон) = {newton_x:.9f}, |Δx| = {abs(newton_x - self.true_x):.1e}"
         ]
-        
+
+    def draw_ray_fan(self, painter, layer):
+        painter.setTransform(layer.world_transform())
+
+        def cosmetic_pen(color, width):
+            pen = QPen(color, width)
+            pen.setCosmetic(True)  # Толщина в пикселях, независимо от масштаба
+            return pen
+
+        painter.setPen(cosmetic_pen(Qt.black, 2))
+        painter.drawLine(QPointF(-100, 0), QPointF(100, 0))
+
+        # Тысячи лучей — без сглаживания и одним вызовом на группу
+        painter.setRenderHint(QPainter.Antialiasing, False)
+        painter.setPen(cosmetic_pen(QColor(30, 90, 200, 25), 1))
+        painter.drawLines(self.fan['refracted'])
+        painter.setPen(cosmetic_pen(QColor(200, 40, 40, 25), 1))
+        painter.drawLines(self.fan['reflected'])
+
+        painter.setRenderHint(QPainter.Antialiasing, True)
+        painter.setPen(cosmetic_pen(QColor(20, 20, 20), 1.5))
+        painter.setBrush(Qt.NoBrush)
+        painter.drawPath(self.fan['wavefronts'])
+
+    def draw_gradient_medium(self, painter, map_point):
+        solver = self.eikonal_solver()
+
+        # Поле показателя преломления (темнее — больше n)
+        height, width = solver.image_data.shape
+        image = QImage(solver.image_data.data, width, height, width, QImage.Format_Grayscale8)
+        top_left = map_point(solver.x[0], solver.y[-1])
+        bottom_right = map_point(solver.x[-1], solver.y[0])
+        painter.drawImage(QRectF(top_left, bottom_right), image)
+
+        # Путь наименьшего времени
+        painter.setPen(QPen(QColor(150, 0, 150), 3))
+        points = [map_point(x, y) for x, y in self.eikonal_path]
+        for start, end in zip(points[:-1], points[1:]):
+            painter.drawLine(start, end)
+
+        a_scr = map_point(*self.A)
+        b_scr = map_point(*self.B)
+        painter.setPen(QPen(Qt.blue, 10))
+        painter.drawPoint(a_scr)
+        painter.drawPoint(b_scr)
+        painter.setPen(QPen(Qt.blue, 1))
+        painter.drawText(a_scr.x() - 20, a_scr.y() - 10, "A")
+        painter.drawText(b_scr.x() - 20, b_scr.y() - 10, "B")
+
+    def multilayer_info(self):
+        interfaces, indices = self.multilayer_media()
+        total_time = multilayer_travel_time(self.multilayer_xs, self.A, self.B, interfaces, indices)
+        invariants, residuals = multilayer_snell_residuals(self.multilayer_xs, self.A, self.B, interfaces, indices)
+
+        info = [f"Время прохождения: {total_time:.7f}"]
+        for i, (y, residual) in enumerate(zip(interfaces, residuals)):
+            mark = "✓" if abs(residual) < 1e-3 else "✗"
+            info.append(f"{mark} y={y:g}: n⋅sinθ = {invariants[i]:.4f} / {invariants[i + 1]:.4f}")
+        return info
+
+    def draw_text_panel(self, painter, info):
         painter.setPen(QPen(Qt.black, 1))
         painter.setFont(QFont('Arial', 12, QFont.Bold))
         
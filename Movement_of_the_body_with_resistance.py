@@ -1,166 +1,30 @@
 import sys
-import math
 import numpy as np
-import matplotlib.pyplot as plt
 from PyQt5.QtWidgets import (QApplication, QWidget, QLabel, QLineEdit, QPushButton,
-                             QVBoxLayout, QHBoxLayout, QTextEdit, QSizePolicy, QDoubleSpinBox, QCheckBox)
+                             QVBoxLayout, QHBoxLayout, QTextEdit, QSizePolicy, QDoubleSpinBox, QCheckBox,
+                             QFileDialog, QSpinBox)
 from PyQt5.QtCore import Qt
 
 
+from matplotlib.figure import Figure
 from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
 from matplotlib.backends.backend_qt5agg import NavigationToolbar2QT as NavigationToolbar
 
-
-class Mathematic:
-    """
-    Класс, содержащий математические функции и константы.
-    """
-    GRAVITY = 9.81  # Ускорение свободного падения, м/с^2
-
-
-class Physic:
-    """
-    Класс для моделирования физических явлений, связанных с движением тела в поле силы тяжести и сопротивлением воздуха.
-    """
-
-    def __init__(self, v0, vM, gravity=Mathematic.GRAVITY, dt=0.01):
-        """
-        Инициализация объекта Physic.
-
-        Args:
-            v0: Начальная скорость тела, м/с.
-            vM: Предельная скорость тела, м/с (скорость установившегося падения).
-            gravity: Ускорение свободного падения, м/с^2.
-            dt: Временной шаг для численного интегрирования, с.
-        """
-        self.v0 = v0
-        self.vM = vM
-        self.gravity = gravity
-        self.dt = dt
-        self.g_vec = np.array([0.0, -self.gravity])  # Precompute gravity vector
-        self.air_res_coeff = self.gravity / self.vM ** 2  # Precompute air resistance coefficient
-
-    def range_no_air_resistance(self, angle_degrees):
-        """
-        Вычисляет дальность полета тела без учета сопротивления воздуха.
-
-        Args:
-            angle_degrees: Угол вылета в градусах.
-
-        Returns:
-            Дальность полета, м.
-        """
-        angle_radians = math.radians(angle_degrees)
-        return (self.v0**2 * math.sin(2 * angle_radians)) / self.gravity
-
-    def optimal_angle_no_air_resistance(self):
-        """
-        Вычисляет оптимальный угол вылета для максимальной дальности без учета сопротивления воздуха.
-
-        Returns:
-            Оптимальный угол в градусах.
-        """
-        return 45.0
-
-    def predictor_corrector(self, angle_degrees, wind_speed=0):
-        """
-        Реализует метод Предиктор-Корректор для моделирования движения тела с учетом сопротивления воздуха и ветра (Векторная реализация).
-
-        Args:
-            angle_degrees: Угол вылета в градусах.
-            wind_speed: Скорость ветра, направленного против оси x, м/с.
-
-        Returns:
-            Кортеж: (массив x-координат, массив y-координат, время полета)
-        """
-        angle_radians = np.radians(angle_degrees)
-        # Начальные условия в виде векторов
-        pos = np.array([0.0, 0.0])  # [x, y] - вектор позиции (начало координат)
-        vel = np.array([self.v0 * np.cos(angle_radians) - wind_speed, self.v0 * np.sin(angle_radians)]) # [vx, vy] - вектор скорости (начальная скорость с учетом ветра)
-
-        # Initial acceleration
-        acc = self.g_vec  # Initial acceleration is just gravity (no air resistance initially)
-
-        trajectory = [pos.copy()] # Initial position
-        time = 0
-        dt = self.dt  # Cache dt for faster access
-
-        while pos[1] >= 0:  # Пока y >= 0
-
-            # Предиктор:
-            pos_pred = pos + vel * dt + 0.5 * acc * dt**2  # ri+1 = ri + vi * dt + (1/2) * ai * dt^2 - прогнозируем положение
-            vel_pred = vel + acc * dt  # vi+1 = vi + ai * dt - прогнозируем скорость
-
-            # Корректор:
-            acc_pred = self.g_vec - (self.air_res_coeff) * np.linalg.norm(vel_pred) * vel_pred  # ai+1 = g - (g / vM^2) * vi+1 - вычисляем ускорение с учетом сопротивления воздуха
-            vel = vel + 0.5 * (acc + acc_pred) * dt  # vi+1 = vi + ((ai + ai+1) / 2) * dt - уточняем скорость
-            pos = pos + vel * dt #ri+1 = ri + vi * dt  -  уточняем позицию (упрощенно, можно использовать более точную формулу)
-            acc = self.g_vec - (self.air_res_coeff) * np.linalg.norm(vel) * vel # Обновляем ускорение для следующей итерации
-            
-            trajectory.append(pos.copy()) # Store a copy of the position
-            time += dt
-
-        trajectory = np.array(trajectory)  # Convert to NumPy array
-        return trajectory[:, 0], trajectory[:, 1], time  # Return x, y, and time
-
-    def find_optimal_angle_with_air_resistance(self, wind_speed=0, angle_step=0.1):
-        """
-        Находит оптимальный угол вылета для максимальной дальности с учетом сопротивления воздуха и ветра.
-
-        Args:
-            wind_speed: Скорость ветра, направленного против оси x, м/с.
-            angle_step: Шаг изменения угла в градусах.
-
-        Returns:
-            Оптимальный угол в градусах.
-        """
-        angles = np.arange(0, 90, angle_step)
-        max_ranges = np.zeros_like(angles)
-
-        for i, angle in enumerate(angles):
-            trajectory_x, _, _ = self.predictor_corrector(angle, wind_speed)
-            max_ranges[i] = trajectory_x[-1]
-
-        optimal_angle_index = np.argmax(max_ranges) # Index of maximum range
-        return angles[optimal_angle_index]
-
-    def vertical_fall_predictor_corrector(self, initial_height):
-         """
-         Моделирует вертикальное падение тела с учетом сопротивления воздуха с использованием метода предиктор-корректор (векторная версия).
-
-         Args:
-             initial_height: Начальная высота тела, м.
-
-         Returns:
-             Кортеж: (массив времен, массив высот, массив скоростей)
-         """
-         y = initial_height
-         vy = 0  # Начальная вертикальная скорость
-         times = [0]
-         heights = [y]
-         velocities = [vy]
-         time = 0
-
-         while y > 0:
-             # Предиктор
-             ay = - self.gravity - (self.gravity / self.vM ** 2) * vy * abs(vy)  # Ускорение всегда против скорости
-             vy_pred = vy + ay * self.dt
-             y_pred = y + vy * self.dt
-
-             # Корректор
-             ay_pred = - self.gravity - (self.gravity / self.vM ** 2) * vy_pred * abs(vy_pred)
-             vy = vy + 0.5 * (ay + ay_pred) * self.dt
-             y = y + 0.5 * (vy + vy_pred) * self.dt
-
-             time += self.dt
-             times.append(time)
-             heights.append(y)
-             velocities.append(vy)
-
-         return times, heights, velocities
+from mkm.ballistics import Physic, MonteCarloDispersion
+from mkm.profiling import profiler, create_status_bar
+from mkm.sweep import result_cache
+from mkm.export import save_columns
+from mkm.lod import LodAxes
 
 
 class PhysicsGUI(QWidget):
+    # Разброс параметров выстрела в режиме Монте-Карло вокруг введенных значений
+    V0_SPREAD = 0.01  # Относительное СКО начальной скорости
+    VM_SPREAD = 0.05  # Относительная полуширина равномерного разброса vM
+    WIND_SPREAD = 5.0  # Полуширина треугольного разброса ветра, м/с
+    ANGLE_SPREAD = 0.5  # СКО угла, градусы
+    DISPERSION_TOL = 0.5  # Остановка по стандартной ошибке средней дальности, м
+
     def __init__(self):
         super().__init__()
         self.setWindowTitle("Physics Simulation")
@@ -192,20 +56,40 @@ class PhysicsGUI(QWidget):
         self.use_optimal_angle_checkbox = QCheckBox("Использовать оптимальный угол")
         self.use_optimal_angle_checkbox.setChecked(False)
 
+        self.use_analytic_fall_checkbox = QCheckBox("Аналитическое решение падения")
+        self.use_analytic_fall_checkbox.setChecked(False)
+
+        self.samples_label = QLabel("Выстрелов (Монте-Карло):")
+        self.samples_spinbox = QSpinBox()
+        self.samples_spinbox.setRange(1000, 1000000)
+        self.samples_spinbox.setSingleStep(10000)
+        self.samples_spinbox.setValue(100000)
+
+        self.calculate_dispersion_button = QPushButton("Рассеивание (Монте-Карло)")
+        self.calculate_dispersion_button.clicked.connect(self.calculate_dispersion)
+
+        self.save_button = QPushButton("Сохранить траекторию…")
+        self.save_button.clicked.connect(self.save_trajectory)
+        self.save_button.setEnabled(False)
+
         self.result_label = QLabel("Результаты:")
         self.result_text = QTextEdit()
         self.result_text.setReadOnly(True)
 
         # --- Matplotlib figures ---
-        self.trajectory_fig, self.trajectory_ax = plt.subplots()
+        self.trajectory_fig = Figure()
+        self.trajectory_ax = self.trajectory_fig.subplots()
         self.trajectory_canvas = FigureCanvas(self.trajectory_fig)
         self.trajectory_canvas.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Expanding)
         self.trajectory_toolbar = NavigationToolbar(self.trajectory_canvas, self)
+        self.trajectory_lod = LodAxes(self.trajectory_ax)
 
-        self.vertical_fig, self.vertical_ax = plt.subplots()
+        self.vertical_fig = Figure()
+        self.vertical_ax = self.vertical_fig.subplots()
         self.vertical_canvas = FigureCanvas(self.vertical_fig)
         self.vertical_canvas.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Expanding)
         self.vertical_toolbar = NavigationToolbar(self.vertical_canvas, self)
+        self.vertical_lod = LodAxes(self.vertical_ax)
 
         # --- Layout ---
         input_layout = QVBoxLayout()
@@ -224,6 +108,11 @@ class PhysicsGUI(QWidget):
         input_layout.addWidget(self.calculate_optimal_button)
         input_layout.addWidget(self.calculate_trajectory_button)
         input_layout.addWidget(self.use_optimal_angle_checkbox)
+        input_layout.addWidget(self.use_analytic_fall_checkbox)
+        input_layout.addWidget(self.samples_label)
+        input_layout.addWidget(self.samples_spinbox)
+        input_layout.addWidget(self.calculate_dispersion_button)
+        input_layout.addWidget(self.save_button)
 
         results_layout = QVBoxLayout()
         results_layout.addWidget(self.result_label)
@@ -243,8 +132,13 @@ class PhysicsGUI(QWidget):
         main_layout.addLayout(trajectory_layout)
         main_layout.addLayout(vertical_layout)
 
-        self.setLayout(main_layout)
+        outer_layout = QVBoxLayout()
+        outer_layout.addLayout(main_layout)
+        outer_layout.addWidget(create_status_bar(self))
+
+        self.setLayout(outer_layout)
         self.optimal_angle = None # Store optimal angle
+        self.trajectory = None  # Параметры и массивы последней траектории для экспорта
 
     def calculate_optimal(self):
         try:
@@ -253,11 +147,10 @@ class PhysicsGUI(QWidget):
             wind_speed = float(self.wind_entry.text())
             angle_step = self.angle_step_spinbox.value()
 
-            # Создаем объект Physic
-            physics = Physic(v0=v0, vM=vM)
-
-            # Находим оптимальный угол
-            self.optimal_angle = physics.find_optimal_angle_with_air_resistance(wind_speed, angle_step)
+            # Находим оптимальный угол (повторный расчет с теми же параметрами берется из кэша)
+            with profiler.timer('ballistics.optimal_angle'):
+                self.optimal_angle = result_cache.compute('ballistics.optimal_angle', v0=v0, vM=vM,
+                                                          wind_speed=wind_speed, angle_step=angle_step)
             self.result_text.clear()
             self.result_text.insertPlainText(f"Оптимальный угол: {self.optimal_angle:.2f} градусов\n")
 
@@ -284,11 +177,20 @@ class PhysicsGUI(QWidget):
             range_no_air = physics.range_no_air_resistance(angle)
 
             # Расчет траектории с сопротивлением воздуха
-            trajectory_x_wind, trajectory_y_wind, _ = physics.predictor_corrector(angle, wind_speed)
+            with profiler.timer('ballistics.trajectory'):
+                trajectory = result_cache.compute('ballistics.trajectory', v0=v0, vM=vM, angle=angle,
+                                                  wind_speed=wind_speed)
+            trajectory_x_wind, trajectory_y_wind = trajectory['x'], trajectory['y']
+            self.trajectory = ({'v0': v0, 'vM': vM, 'angle': angle, 'wind_speed': wind_speed, 'dt': physics.dt},
+                               trajectory)
+            self.save_button.setEnabled(True)
             max_range_with_wind = trajectory_x_wind[-1]
 
             # Расчет вертикального падения
-            times, heights, velocities = physics.vertical_fall_predictor_corrector(initial_height)
+            with profiler.timer('ballistics.vertical_fall'):
+                times, heights, velocities = result_cache.compute(
+                    'ballistics.vertical_fall', v0=v0, vM=vM, initial_height=initial_height,
+                    analytic=self.use_analytic_fall_checkbox.isChecked())
 
             # Вывод результатов
             results = f"Угол выстрела: {angle:.2f} градусов\n"
@@ -301,29 +203,100 @@ class PhysicsGUI(QWidget):
 
             # Обновление графика траектории
             self.trajectory_ax.clear()
-            self.trajectory_ax.plot(trajectory_x_wind, trajectory_y_wind, label="Траектория с ветром (predictor-corrector)")
+            self.trajectory_lod.clear()
+            self.trajectory_lod.plot(trajectory_x_wind, trajectory_y_wind, label="Траектория с ветром (predictor-corrector)")
             self.trajectory_ax.set_xlabel("x (м)")
             self.trajectory_ax.set_ylabel("y (м)")
             self.trajectory_ax.set_title("Траектория полета пули с учетом ветра")
             self.trajectory_ax.legend()
             self.trajectory_ax.grid(True)
-            self.trajectory_canvas.draw()
+            with profiler.timer('draw.trajectory'):
+                self.trajectory_canvas.draw()
+            profiler.count('gui.frames')
 
             # Обновление графика вертикального падения
             self.vertical_ax.clear()
-            self.vertical_ax.plot(times, heights, label="Высота")
-            self.vertical_ax.plot(times, velocities, label="Скорость")
+            self.vertical_lod.clear()
+            self.vertical_lod.plot(times, heights, label="Высота", monotonic=True)
+            self.vertical_lod.plot(times, velocities, label="Скорость", monotonic=True)
             self.vertical_ax.set_xlabel("Время (с)")
             self.vertical_ax.set_ylabel("Высота (м) / Скорость (м/с)")
             self.vertical_ax.set_title("Вертикальное падение с сопротивлением воздуха")
             self.vertical_ax.legend()
             self.vertical_ax.grid(True)
-            self.vertical_canvas.draw()
+            with profiler.timer('draw.vertical_fall'):
+                self.vertical_canvas.draw()
+            profiler.count('gui.frames')
 
         except ValueError:
             self.result_text.clear()
             self.result_text.insertPlainText("Ошибка: Введите числовые значения.")
 
+    def calculate_dispersion(self):
+        """Рассеивание точек падения: статистика обновляется по мере готовности пачек выстрелов."""
+        try:
+            v0 = float(self.v0_entry.text())
+            vM = float(self.vM_entry.text())
+            wind_speed = float(self.wind_entry.text())
+        except ValueError:
+            self.result_text.clear()
+            self.result_text.insertPlainText("Ошибка: Введите числовые значения.")
+            return
+        angle = self.angle_spinbox.value()
+        distributions = {
+            'v0': ('normal', v0, self.V0_SPREAD * v0),
+            'vM': ('uniform', (1 - self.VM_SPREAD) * vM, (1 + self.VM_SPREAD) * vM),
+            'wind_speed': ('triangular', wind_speed - self.WIND_SPREAD, wind_speed, wind_speed + self.WIND_SPREAD),
+            'angle': ('normal', angle, self.ANGLE_SPREAD),
+        }
+        analysis = MonteCarloDispersion(distributions, batch_size=10000, seed=0)
+
+        self.calculate_dispersion_button.setEnabled(False)
+        summary = None
+        try:
+            with profiler.timer('ballistics.monte_carlo'):
+                for summary in analysis.run(self.samples_spinbox.value(), tol=self.DISPERSION_TOL):
+                    self.result_text.setPlainText(self._dispersion_text(angle, summary))
+                    QApplication.processEvents()  # Окно перерисовывается между пачками
+        finally:
+            self.calculate_dispersion_button.setEnabled(True)
+
+        centers = 0.5 * (summary['range_edges'][:-1] + summary['range_edges'][1:])
+        self.trajectory_ax.clear()
+        self.trajectory_lod.clear()
+        self.trajectory_ax.bar(centers, summary['range_hist'][1:-1], width=np.diff(summary['range_edges']),
+                               color='tab:blue', alpha=0.7, label="Точки падения")
+        mean_range, cep = summary['mean_range'], summary['cep']
+        self.trajectory_ax.axvline(mean_range, color='tab:red', label=f"Среднее {mean_range:.1f} м")
+        self.trajectory_ax.axvspan(mean_range - cep, mean_range + cep, color='tab:red', alpha=0.15,
+                                   label=f"Вероятное отклонение {cep:.1f} м")
+        self.trajectory_ax.set_xlabel("Дальность (м)")
+        self.trajectory_ax.set_ylabel("Число выстрелов")
+        self.trajectory_ax.set_title("Рассеивание дальности (Монте-Карло)")
+        self.trajectory_ax.legend()
+        self.trajectory_ax.grid(True)
+        with profiler.timer('draw.dispersion'):
+            self.trajectory_canvas.draw()
+        profiler.count('gui.frames')
+
+    @staticmethod
+    def _dispersion_text(angle, summary):
+        std_range, std_time = np.sqrt(np.diag(summary['covariance']))
+        text = f"Монте-Карло, угол {angle:.2f} градусов\n"
+        text += f"Выстрелов: {summary['count']}{' (сошлось)' if summary['converged'] else ''}\n"
+        text += f"Средняя дальность: {summary['mean_range']:.2f} ± {summary['standard_error'][0]:.2f} метров\n"
+        text += f"СКО дальности: {std_range:.2f} метров\n"
+        text += f"Вероятное отклонение по дальности: {summary['cep']:.2f} метров\n"
+        text += f"Среднее время полета: {summary['mean_time']:.2f} ± {std_time:.2f} секунд"
+        return text
+
+    def save_trajectory(self):
+        """Сохраняет последнюю траекторию в колоночном формате (каталог .mkm)."""
+        path, _ = QFileDialog.getSaveFileName(self, "Сохранить траекторию", "trajectory.mkm", "Результат MKM (*.mkm)")
+        if path:
+            params, trajectory = self.trajectory
+            save_columns(path, 'ballistics.trajectory', params, x=trajectory['x'], y=trajectory['y'])
+
 
 if __name__ == '__main__':
     app = QApplication(sys.argv)
@@ -1,149 +1,17 @@
 import sys
-import numpy as np
-import matplotlib.pyplot as plt
 from PyQt5.QtWidgets import (QApplication, QWidget, QLabel, QLineEdit, QPushButton, 
-                            QVBoxLayout, QHBoxLayout, QSizePolicy, QDoubleSpinBox, QComboBox)
+                            QVBoxLayout, QHBoxLayout, QSizePolicy, QDoubleSpinBox, QComboBox, QFileDialog,
+                            QSpinBox)
 from PyQt5.QtCore import Qt
-from matplotlib.patches import Rectangle, Arc
+from matplotlib.figure import Figure
 from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
 from matplotlib.backends.backend_qt5agg import NavigationToolbar2QT as NavigationToolbar
 
-
-class HorseshoeMagnet:
-    def __init__(self, a, b, d, M, Na=20, Nb=20):
-        self.a = a
-        self.b = b 
-        self.d = d
-        self.M = M
-        self.Na = Na
-        self.Nb = Nb
-        self.ax = a / Na
-        self.ay = b / Nb
-        self.c = M / (4 * np.pi) * self.ax * self.ay
-
-    def H_ext(self, xm, ym, zm):
-        Hx, Hy, Hz = 0.0, 0.0, 0.0
-
-        for ip in range(1, 3):
-            for ia in range(1, self.Na + 1):
-                x = self.ax / 2 + (ia - 1) * self.ax + (ip - 1) * self.d
-                for ib in range(1, self.Nb + 1):
-                    y = self.ay / 2 + (ib - 1) * self.ay
-                    r2 = zm**2 + (x - xm)**2 + (y - ym)**2
-                    r = np.sqrt(r2)
-                    r3 = r * r2
-                    k = 3 - 2 * ip
-
-                    Hx += self.c * (xm - x) * k / r3
-                    Hy += self.c * (ym - y) * k / r3
-                    Hz += self.c * zm * k / r3
-
-        return Hx, Hy, Hz
-
-    def plot_field(self, plane='Y=0', x_range=(-0.5, 0.7), y_range=(-0.5, 0.5), z_range=(-0.5, 0.5), num_points=30):
-        if plane == 'Y=0':
-            y_coord = 0.0
-            x = np.linspace(x_range[0], x_range[1], num_points)
-            z = np.linspace(z_range[0], z_range[1], num_points)
-            X, Z = np.meshgrid(x, z)
-
-            Hx, Hy, Hz = np.zeros_like(X), np.zeros_like(X), np.zeros_like(X)
-            for i in range(X.shape[0]):
-                for j in range(X.shape[1]):
-                    Hx[i,j], Hy[i,j], Hz[i,j] = self.H_ext(X[i,j], y_coord, Z[i,j])
-
-            H_magnitude = np.sqrt(Hx**2 + Hz**2)
-            Hx_norm, Hz_norm = Hx / H_magnitude, Hz / H_magnitude
-
-            self.axes.clear()
-
-            # Горизонтальное расположение магнита (вид сверху)
-            self.axes.add_patch(Rectangle((0, -self.b/2), self.a, self.b,
-                                    color='blue', alpha=0.4, label='Северный полюс'))
-            self.axes.add_patch(Rectangle((self.d, -self.b/2), self.a, self.b,
-                                    color='red', alpha=0.4, label='Южный полюс'))
-            self.axes.add_patch(Rectangle((self.a, -self.b/2), self.d-self.a, self.b,
-                                    color='gray', alpha=0.3, label='Соединение'))
-
-            self.axes.quiver(X, Z, Hx_norm, Hz_norm, angles='xy', scale_units='xy', scale=15, pivot='mid')
-            self.axes.set_xlabel("x, м")
-            self.axes.set_ylabel("z, м")
-            self.axes.set_title(f"Магнитное поле в плоскости Y=0\nРазмеры: a={self.a}, b={self.b}, d={self.d}")
-            self.axes.set_xlim(x_range)
-            self.axes.set_ylim(z_range)
-            self.axes.set_aspect('equal')
-            self.axes.legend()
-            self.canvas.draw()
-
-        elif plane == 'Z=0':
-            z_coord = 0.0
-            x = np.linspace(x_range[0], x_range[1], num_points)
-            y = np.linspace(y_range[0], y_range[1], num_points)
-            X, Y = np.meshgrid(x, y)
-
-            Hx, Hy, Hz = np.zeros_like(X), np.zeros_like(X), np.zeros_like(X)
-            for i in range(X.shape[0]):
-                for j in range(X.shape[1]):
-                    Hx[i,j], Hy[i,j], Hz[i,j] = self.H_ext(X[i,j], Y[i,j], z_coord)
-
-            H_magnitude = np.sqrt(Hx**2 + Hy**2)
-            Hx_norm, Hy_norm = Hx / (H_magnitude + 1e-10), Hy / (H_magnitude + 1e-10)
-            
-            self.axes.clear()
-
-            # Корректное отображение подковы (вид сбоку)
-            pole_width = self.a
-            pole_height = self.b
-            gap = self.d - pole_width  # Расстояние между ножками
-            
-            # Левая ножка (северный полюс - синий)
-            self.axes.add_patch(Rectangle(
-                (0, 0), 
-                pole_width, 
-                pole_height, 
-                color='blue', alpha=0.4, label='Северный полюс'
-            ))
-            
-            # Правая ножка (южный полюс - красный)
-            self.axes.add_patch(Rectangle(
-                (self.d, 0), 
-                pole_width, 
-                pole_height, 
-                color='red', alpha=0.4, label='Южный полюс'
-            ))
-            
-            # Дуга подковы (серый)
-            arc_center_x = self.d / 2
-            arc_height = pole_height * 1.2
-            self.axes.add_patch(Arc(
-                (arc_center_x, pole_height), 
-                width=self.d + pole_width,  # Ширина дуги
-                height=arc_height, 
-                theta1=180, theta2=0, 
-                color='gray', linewidth=4, alpha=0.4
-            ))
-
-            # Векторное поле
-            self.axes.quiver(
-                X, Y, Hx_norm, Hy_norm, 
-                angles='xy', 
-                scale_units='xy', 
-                scale=25,  # Уменьшенный масштаб для лучшей видимости
-                pivot='mid', 
-                width=0.003,
-                headlength=4,
-                headaxislength=3
-            )
-            
-            self.axes.set_xlabel("x, м")
-            self.axes.set_ylabel("y, м")
-            self.axes.set_title(f"Магнитное поле в плоскости Z=0 (вид сбоку)\nРазмеры: a={self.a}, b={self.b}, d={self.d}")
-            self.axes.set_xlim(x_range)
-            self.axes.set_ylim([y_range[0], y_range[1] + arc_height])  # Учет высоты дуги
-            self.axes.grid(True)
-            self.axes.set_aspect('equal')
-            self.axes.legend(loc='upper right')
-            self.canvas.draw()
+from mkm.magnet import HorseshoeMagnet
+from mkm.profiling import profiler, create_status_bar
+from mkm.sweep import result_cache
+from mkm.export import save_columns
+from mkm.lod import LodAxes
 
 
 class MagnetGUI(QWidget):
@@ -155,9 +23,12 @@ class MagnetGUI(QWidget):
         self.create_input_widgets()
         
         # График
-        self.fig, self.axes = plt.subplots()
+        self.fig = Figure()
+        self.axes = self.fig.subplots()
         self.canvas = FigureCanvas(self.fig)
         self.toolbar = NavigationToolbar(self.canvas, self)
+        # Стрелки прореживаются до плотности экрана; при приближении показываются все узлы сетки
+        self.lod = LodAxes(self.axes)
         
         # Разметка
         self.setup_layout()
@@ -178,15 +49,24 @@ class MagnetGUI(QWidget):
         self.plane_label = QLabel("Плоскость:")
         self.plane_combo = QComboBox()
         self.plane_combo.addItems(["Y=0", "Z=0"])
+
+        self.points_label = QLabel("Узлов сетки по оси:")
+        self.points_spinbox = QSpinBox()
+        self.points_spinbox.setRange(10, 300)
+        self.points_spinbox.setValue(30)
         
         self.update_button = QPushButton("Обновить график")
         self.update_button.clicked.connect(self.update_plot)
 
+        self.save_button = QPushButton("Сохранить сетку…")
+        self.save_button.clicked.connect(self.save_grid)
+
     def setup_layout(self):
         input_layout = QVBoxLayout()
         for widget in [self.a_label, self.a_edit, self.b_label, self.b_edit,
                       self.d_label, self.d_edit, self.M_label, self.M_edit,
-                      self.plane_label, self.plane_combo, self.update_button]:
+                      self.plane_label, self.plane_combo, self.points_label, self.points_spinbox,
+                      self.update_button, self.save_button]:
             input_layout.addWidget(widget)
             
         plot_layout = QVBoxLayout()
@@ -196,8 +76,12 @@ class MagnetGUI(QWidget):
         main_layout = QHBoxLayout()
         main_layout.addLayout(input_layout)
         main_layout.addLayout(plot_layout)
+
+        outer_layout = QVBoxLayout()
+        outer_layout.addLayout(main_layout)
+        outer_layout.addWidget(create_status_bar(self))
         
-        self.setLayout(main_layout)
+        self.setLayout(outer_layout)
 
     def update_plot(self):
         try:
@@ -213,15 +97,30 @@ class MagnetGUI(QWidget):
             
             # Увеличиваем диапазон для отображения поля
             size = max(a, b, d) * 3
-            self.magnet.plot_field(plane=plane, 
-                                 x_range=(-size, size*2),
-                                 y_range=(-size, size),
-                                 z_range=(-size, size),
-                                 num_points=30)
+            ranges = dict(x_range=(-size, size*2), y_range=(-size, size), z_range=(-size, size),
+                          num_points=self.points_spinbox.value())
+            # Поле на сетке берется из общего кэша: повторное нажатие только перерисовывает.
+            # Сетка 300x300 при промахе кэша считается векторно около секунды — на это время курсор «занят»
+            QApplication.setOverrideCursor(Qt.WaitCursor)
+            try:
+                grid = result_cache.compute('magnet.field_grid', a=a, b=b, d=d, M=M, plane=plane, **ranges)
+            finally:
+                QApplication.restoreOverrideCursor()
+            self.grid = (dict(a=a, b=b, d=d, M=M, plane=plane, **ranges), grid)
+            with profiler.timer('magnet.plot_field'):
+                self.magnet.plot_field(plane=plane, grid=grid, lod=self.lod, **ranges)
+            profiler.count('gui.frames')
             
         except ValueError as e:
             print(f"Ошибка ввода: {e}")
 
+    def save_grid(self):
+        """Сохраняет сетку поля последнего графика в колоночном формате (каталог .mkm)."""
+        path, _ = QFileDialog.getSaveFileName(self, "Сохранить сетку поля", "field.mkm", "Результат MKM (*.mkm)")
+        if path:
+            params, (U, V, Hx, Hy, Hz) = self.grid
+            save_columns(path, 'magnet.field_grid', params, u=U, v=V, Hx=Hx, Hy=Hy, Hz=Hz)
+
 
 if __name__ == '__main__':
     app = QApplication(sys.argv)
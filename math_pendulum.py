@@ -1,71 +1,16 @@
 import sys
 import numpy as np
-import matplotlib.pyplot as plt
-from PyQt5.QtWidgets import QApplication, QWidget, QVBoxLayout, QHBoxLayout, QPushButton, QLabel, QLineEdit
+from PyQt5.QtWidgets import (QApplication, QWidget, QVBoxLayout, QHBoxLayout, QPushButton, QLabel, QLineEdit,
+                             QFileDialog)
+from matplotlib.figure import Figure
 from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
 from matplotlib.animation import FuncAnimation
 
-class Physicist:
-    def __init__(self, g=9.81, length=1.0):
-        self.g = g
-        self.length = length
-
-    def huygens_formula(self):
-        """Вычисляет период колебаний по формуле Гюйгенса."""
-        return 2 * np.pi * np.sqrt(self.length / self.g)
-
-    def exact_period(self, theta0):
-         """Вычисляет "точный" период, используя эллиптический интеграл."""
-         k = np.sin(theta0 / 2)
-         t = 1 - k * k
-         t1 = (((0.01451196212 * t + 0.03742563713) * t +
-               0.03590092383) * t + 0.09666344259) * t + 1.38629436112
-         t2 = (((0.00441787012 * t + 0.03328355346) * t +
-               0.06880248576) * t + 0.12498593597) * t + 0.5
-         cei1 = t1 - t2 * np.log(t)
-         return 4 * np.sqrt(self.length / self.g) * cei1
-
-    def equation(self, theta, omega, damping):
-        """Дифференциальное уравнение маятника."""
-        return - (self.g / self.length) * np.sin(theta) - damping * omega
-
-class Mathematician:
-    def __init__(self, physicist, theta0, omega0, step, damping, points):
-        self.physicist = physicist
-        self.theta0 = theta0
-        self.omega0 = omega0
-        self.step = step
-        self.damping = damping
-        self.points = points
-
-    def integrate(self):
-        """Интегрирует дифференциальное уравнение маятника."""
-        theta, omega = self.theta0, self.omega0
-        t_values, theta_values, omega_values = [0], [theta], [omega]
-
-        for i in range(1, self.points):
-            omega += self.physicist.equation(theta, omega, self.damping) * self.step
-            theta += omega * self.step
-            t_values.append(i * self.step)
-            theta_values.append(theta)
-            omega_values.append(omega)
-
-        return np.array(t_values), np.array(theta_values), np.array(omega_values)
-
-    def compute_period(self, t_values, theta_values):
-        """Вычисляет период колебаний на основе данных моделирования."""
-        # Находим все пересечения нуля (сверху вниз)
-        crossings = np.where((theta_values[:-1] >= 0) & (theta_values[1:] < 0))[0]
-
-        # Если нет пересечений или только одно, возвращаем None
-        if len(crossings) < 2:
-            return None
-
-        # Вычисляем периоды между последовательными пересечениями
-        periods = np.diff(t_values[crossings])
-
-        # Возвращаем средний период
-        return np.mean(periods)
+from mkm.pendulum import Physicist, Mathematician
+from mkm.profiling import profiler, create_status_bar
+from mkm.sweep import result_cache
+from mkm.export import save_columns
+from mkm.lod import LodAxes
 
 class PendulumApp(QWidget):
     def __init__(self):
@@ -104,10 +49,13 @@ class PendulumApp(QWidget):
         self.start_button = QPushButton("Пуск")
         self.stop_button = QPushButton("Стоп")
         self.refresh_button = QPushButton("Обновить")
+        self.save_button = QPushButton("Сохранить ряды…")
+        self.save_button.setEnabled(False)
 
         control_panel.addWidget(self.start_button)
         control_panel.addWidget(self.stop_button)
         control_panel.addWidget(self.refresh_button)
+        control_panel.addWidget(self.save_button)
 
         # Вывод результатов
         self.iterations_label = QLabel("Итерации: 0")
@@ -126,17 +74,26 @@ class PendulumApp(QWidget):
         layout.addLayout(control_panel)
 
         # Правая панель - графики и маятник
-        self.figure, (self.ax_pendulum, self.ax1, self.ax2) = plt.subplots(3, 1, figsize=(5, 7))
+        self.figure = Figure(figsize=(5, 7))
+        self.ax_pendulum, self.ax1, self.ax2 = self.figure.subplots(3, 1)
+        # Ряды прореживаются под ширину осей; при приближении детали берутся из полных массивов
+        self.lod1 = LodAxes(self.ax1)
+        self.lod2 = LodAxes(self.ax2)
         self.canvas = FigureCanvas(self.figure)
         layout.addWidget(self.canvas)
 
-        self.setLayout(layout)
+        outer_layout = QVBoxLayout()
+        outer_layout.addLayout(layout)
+        outer_layout.addWidget(create_status_bar(self))
+
+        self.setLayout(outer_layout)
         self.setWindowTitle("Маятник")
         self.setGeometry(100, 100, 800, 600)
 
         self.start_button.clicked.connect(self.start_simulation)
         self.stop_button.clicked.connect(self.stop_simulation)
         self.refresh_button.clicked.connect(self.refresh_simulation)
+        self.save_button.clicked.connect(self.save_series)
 
     def start_simulation(self):
         try:
@@ -157,7 +114,13 @@ class PendulumApp(QWidget):
         mathematician = Mathematician(self.physicist, theta0, omega0, step, damping, points)
 
         # Интегрируем и получаем результаты
-        self.t_values, self.theta_values, self.omega_values = mathematician.integrate()
+        with profiler.timer('pendulum.integrate'):
+            self.t_values, self.theta_values, self.omega_values = result_cache.compute(
+                'pendulum.integrate', length=length, theta0=theta0, omega0=omega0, step=step,
+                damping=damping, points=points, g=self.physicist.g)
+        self.run_params = {'g': self.physicist.g, 'length': length, 'theta0': theta0, 'omega0': omega0,
+                           'step': step, 'damping': damping, 'points': points}
+        self.save_button.setEnabled(True)
 
         # Вычисляем период Гюйгенса, период из моделирования и "точный" период
         huygens_period = self.physicist.huygens_formula()
@@ -187,6 +150,13 @@ class PendulumApp(QWidget):
         self.refresh_simulation() #Останавливаем и очищаем перед стартом
         self.ani = FuncAnimation(self.figure, self.update_plot, frames=len(self.t_values), interval=5, repeat=False)
 
+    def save_series(self):
+        """Сохраняет ряды t, theta, omega последнего расчета в колоночном формате (каталог .mkm)."""
+        path, _ = QFileDialog.getSaveFileName(self, "Сохранить ряды", "pendulum.mkm", "Результат MKM (*.mkm)")
+        if path:
+            save_columns(path, 'pendulum.integrate', self.run_params,
+                         t=self.t_values, theta=self.theta_values, omega=self.omega_values)
+
     def stop_simulation(self):
         if self.ani is not None:
             self.ani.event_source.stop()
@@ -196,6 +166,8 @@ class PendulumApp(QWidget):
         self.ax_pendulum.clear()
         self.ax1.clear()
         self.ax2.clear()
+        self.lod1.clear()
+        self.lod2.clear()
 
         #Сохраняем пределы осей
         if self.t_values is not None and self.theta_values is not None:
@@ -209,6 +181,8 @@ class PendulumApp(QWidget):
             self.ax_pendulum.clear()
             self.ax1.clear()
             self.ax2.clear()
+            self.lod1.clear()
+            self.lod2.clear()
 
             x = np.sin(self.theta_values[i])
             y = -np.cos(self.theta_values[i])
@@ -220,7 +194,7 @@ class PendulumApp(QWidget):
             self.ax_pendulum.set_title("Маятник")
             self.ax_pendulum.set_aspect('equal')
 
-            self.ax1.plot(self.t_values[:i], self.theta_values[:i], 'b')
+            self.lod1.plot(self.t_values[:i], self.theta_values[:i], 'b', monotonic=True)
             self.ax1.set_title("Колебания")
             self.ax1.set_xlabel("Время (с)") # Добавлено
             self.ax1.set_ylabel("Угол (рад)") # Добавлено
@@ -230,7 +204,7 @@ class PendulumApp(QWidget):
             self.ax1.set_ylim(np.min(self.theta_values), np.max(self.theta_values))
 
 
-            self.ax2.plot(self.theta_values[:i], self.omega_values[:i], 'r')
+            self.lod2.plot(self.theta_values[:i], self.omega_values[:i], 'r', monotonic=False)
             self.ax2.set_title("Фазовый портрет")
             self.ax2.set_xlabel("Угол (рад)")     # Добавлено
             self.ax2.set_ylabel("Угловая скорость (рад/с)") # Добавлено
@@ -239,8 +213,11 @@ class PendulumApp(QWidget):
             #self.ax2.set_xlim(np.min(self.theta_values), np.max(self.theta_values))
             #self.ax2.set_ylim(np.min(self.omega_values), np.max(self.omega_values))
 
-            self.figure.tight_layout() # Очень полезно для предотвращения наложения подписей
-            self.canvas.draw()
+            with profiler.timer('draw.layout'):
+                self.figure.tight_layout() # Очень полезно для предотвращения наложения подписей
+            with profiler.timer('draw.frame'):
+                self.canvas.draw()
+            profiler.count('gui.frames')
         except Exception as e:
             print(f"Ошибка при обновлении графика: {e}")
 
@@ -0,0 +1,45 @@
+"""
+Вычислительное ядро симуляторов MKM без графического интерфейса.
+
+Модули ядра не импортируют PyQt5 и matplotlib, поэтому их можно использовать в пакетных
+скриптах и на сервере без дисплея:
+
+    ballistics  — Physic, Mathematic, Atmosphere, MonteCarloDispersion (полет тела с сопротивлением воздуха);
+    pendulum    — Physicist, Mathematician (математический маятник);
+    fitting     — PendulumFit (оценка параметров маятника по записи угла);
+    magnet      — HorseshoeMagnet (поле подковообразного магнита);
+    particles   — ParticleTracker, FieldLattice (движение частиц в поле магнита);
+    fermat      — FermatSolver и решатели принципа Ферма;
+    convergence — ConvergenceStudy (сходимость по шагу интегрирования).
+
+Служебные модули: bench (бенчмарки с контролем регрессий) и importtime (бюджет времени импорта).
+
+Классы доступны и из корня пакета (from mkm import Physic); модуль загружается при первом обращении.
+"""
+import importlib
+
+_EXPORTS = {
+    'Mathematic': 'ballistics',
+    'Physic': 'ballistics',
+    'Atmosphere': 'ballistics',
+    'MonteCarloDispersion': 'ballistics',
+    'Physicist': 'pendulum',
+    'Mathematician': 'pendulum',
+    'PendulumFit': 'fitting',
+    'HorseshoeMagnet': 'magnet',
+    'ParticleTracker': 'particles',
+    'FieldLattice': 'particles',
+    'FermatSolver': 'fermat',
+    'ConvergenceStudy': 'convergence',
+}
+
+
+def __getattr__(name):
+    if name in _EXPORTS:
+        module = importlib.import_module(f'{__name__}.{_EXPORTS[name]}')
+        return getattr(module, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__():
+    return sorted(list(globals()) + list(_EXPORTS))
@@ -0,0 +1,753 @@
+import os
+import math
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+import numpy as np
+
+from mkm.profiling import profiler
+
+
+class Mathematic:
+    """
+    Класс, содержащий математические функции и константы.
+    """
+    GRAVITY = 9.81  # Ускорение свободного падения, м/с^2
+
+
+class Atmosphere:
+    """
+    Относительная плотность воздуха rho(h) / rho(0) по таблице с равномерным шагом по высоте.
+
+    Таблица строится один раз (конструкторы standard и exponential), а на каждом шаге интегрирования
+    плотность берется линейной интерполяцией между соседними узлами — без exp и pow. Ниже нуля и выше
+    таблицы используются крайние значения.
+    """
+
+    def __init__(self, density_ratio, step):
+        """
+        Args:
+            density_ratio: Значения rho(h) / rho(0) в узлах h = 0, step, 2 * step, ...
+            step: Шаг таблицы по высоте, м.
+        """
+        self.table = np.asarray(density_ratio, dtype=float)
+        self.step = step
+        self.max_altitude = step * (len(self.table) - 1)
+        self._inverse_step = 1.0 / step
+        self._slope = np.append(np.diff(self.table), 0.0)  # Приращение до следующего узла
+        # Для скалярного интегратора: списки Python быстрее поэлементного доступа к массивам
+        self._table_list = self.table.tolist()
+        self._slope_list = self._slope.tolist()
+
+    @classmethod
+    def standard(cls, max_altitude=40000.0, step=10.0):
+        """Международная стандартная атмосфера (ISA) до max_altitude (не выше 47 км)."""
+        heights = np.arange(0.0, max_altitude + step / 2, step)
+        g0, molar_mass, gas_constant = 9.80665, 0.0289644, 8.3144598
+        exponent = g0 * molar_mass / gas_constant
+        temperature = np.empty_like(heights)
+        pressure = np.empty_like(heights)
+        # Слои: (нижняя граница, м; вертикальный градиент температуры, К/м)
+        layers = ((0.0, -0.0065), (11000.0, 0.0), (20000.0, 0.001), (32000.0, 0.0028), (47000.0, 0.0))
+        base_temperature, base_pressure = 288.15, 101325.0
+        for index, (bottom, lapse) in enumerate(layers):
+            top = layers[index + 1][0] if index + 1 < len(layers) else np.inf
+            inside = (heights >= bottom) & (heights < top)
+            dh = heights[inside] - bottom
+            if lapse == 0.0:
+                temperature[inside] = base_temperature
+                pressure[inside] = base_pressure * np.exp(-exponent * dh / base_temperature)
+            else:
+                temperature[inside] = base_temperature + lapse * dh
+                pressure[inside] = base_pressure * (temperature[inside] / base_temperature) ** (-exponent / lapse)
+            if np.isfinite(top):
+                top_temperature = base_temperature + lapse * (top - bottom)
+                if lapse == 0.0:
+                    base_pressure *= np.exp(-exponent * (top - bottom) / base_temperature)
+                else:
+                    base_pressure *= (top_temperature / base_temperature) ** (-exponent / lapse)
+                base_temperature = top_temperature
+        density = pressure / temperature
+        return cls(density / density[0], step)
+
+    @classmethod
+    def exponential(cls, scale_height=8500.0, max_altitude=40000.0, step=10.0):
+        """Изотермическая атмосфера: rho(h) / rho(0) = exp(-h / scale_height)."""
+        heights = np.arange(0.0, max_altitude + step / 2, step)
+        return cls(np.exp(-heights / scale_height), step)
+
+    def density_ratio(self, altitude):
+        """Относительная плотность на высоте altitude, м (массив)."""
+        u = np.clip(np.asarray(altitude, dtype=float) * self._inverse_step, 0.0, len(self.table) - 1)
+        index = u.astype(np.intp)
+        return self.table[index] + (u - index) * self._slope[index]
+
+    def density_ratio_scalar(self, altitude):
+        """То же для одного числа (без накладных расходов NumPy)."""
+        u = min(max(altitude * self._inverse_step, 0.0), len(self._table_list) - 1)
+        index = int(u)
+        return self._table_list[index] + (u - index) * self._slope_list[index]
+
+
+class Physic:
+    """
+    Класс для моделирования физических явлений, связанных с движением тела в поле силы тяжести и сопротивлением воздуха.
+    """
+
+    def __init__(self, v0, vM, gravity=Mathematic.GRAVITY, dt=0.01):
+        """
+        Инициализация объекта Physic.
+
+        Args:
+            v0: Начальная скорость тела, м/с.
+            vM: Предельная скорость тела, м/с (скорость установившегося падения).
+            gravity: Ускорение свободного падения, м/с^2.
+            dt: Временной шаг для численного интегрирования, с.
+        """
+        self.v0 = v0
+        self.vM = vM
+        self.gravity = gravity
+        self.dt = dt
+        self.g_vec = np.array([0.0, -self.gravity])  # Precompute gravity vector
+        self.air_res_coeff = self.gravity / self.vM ** 2  # Precompute air resistance coefficient
+
+    def range_no_air_resistance(self, angle_degrees):
+        """
+        Вычисляет дальность полета тела без учета сопротивления воздуха.
+
+        Args:
+            angle_degrees: Угол вылета в градусах.
+
+        Returns:
+            Дальность полета, м.
+        """
+        angle_radians = math.radians(angle_degrees)
+        return (self.v0**2 * math.sin(2 * angle_radians)) / self.gravity
+
+    def optimal_angle_no_air_resistance(self):
+        """
+        Вычисляет оптимальный угол вылета для максимальной дальности без учета сопротивления воздуха.
+
+        Returns:
+            Оптимальный угол в градусах.
+        """
+        return 45.0
+
+    def predictor_corrector(self, angle_degrees, wind_speed=0):
+        """
+        Реализует метод Предиктор-Корректор для моделирования движения тела с учетом сопротивления воздуха и ветра (Векторная реализация).
+
+        Args:
+            angle_degrees: Угол вылета в градусах.
+            wind_speed: Скорость ветра, направленного против оси x, м/с.
+
+        Returns:
+            Кортеж: (массив x-координат, массив y-координат, время полета)
+        """
+        chunks = list(self.trajectory_chunks(angle_degrees, wind_speed))
+        trajectory_x = np.concatenate([x for _, x, _ in chunks])
+        trajectory_y = np.concatenate([y for _, _, y in chunks])
+        return trajectory_x, trajectory_y, chunks[-1][0][-1]  # Return x, y, and time
+
+    def trajectory_chunks(self, angle_degrees, wind_speed=0, chunk_size=10000):
+        """
+        Тот же расчет, что predictor_corrector, но траектория отдается блоками не длиннее chunk_size точек.
+
+        Позволяет записывать длинные траектории (малый dt) без хранения всего массива в памяти.
+
+        Yields:
+            Кортежи массивов (t, x, y).
+        """
+        angle_radians = np.radians(angle_degrees)
+        # Начальные условия в виде векторов
+        pos = np.array([0.0, 0.0])  # [x, y] - вектор позиции (начало координат)
+        vel = np.array([self.v0 * np.cos(angle_radians) - wind_speed, self.v0 * np.sin(angle_radians)]) # [vx, vy] - вектор скорости (начальная скорость с учетом ветра)
+
+        # Initial acceleration
+        acc = self.g_vec  # Initial acceleration is just gravity (no air resistance initially)
+
+        trajectory = [pos.copy()] # Initial position
+        time = 0
+        times = [time]
+        dt = self.dt  # Cache dt for faster access
+
+        while pos[1] >= 0:  # Пока y >= 0
+            if len(trajectory) == chunk_size:
+                trajectory = np.array(trajectory)
+                profiler.count('ballistics.steps', chunk_size)
+                yield np.array(times), trajectory[:, 0], trajectory[:, 1]
+                trajectory, times = [], []
+
+            # Предиктор:
+            pos_pred = pos + vel * dt + 0.5 * acc * dt**2  # ri+1 = ri + vi * dt + (1/2) * ai * dt^2 - прогнозируем положение
+            vel_pred = vel + acc * dt  # vi+1 = vi + ai * dt - прогнозируем скорость
+
+            # Корректор:
+            acc_pred = self.g_vec - (self.air_res_coeff) * np.linalg.norm(vel_pred) * vel_pred  # ai+1 = g - (g / vM^2) * vi+1 - вычисляем ускорение с учетом сопротивления воздуха
+            vel = vel + 0.5 * (acc + acc_pred) * dt  # vi+1 = vi + ((ai + ai+1) / 2) * dt - уточняем скорость
+            pos = pos + vel * dt #ri+1 = ri + vi * dt  -  уточняем позицию (упрощенно, можно использовать более точную формулу)
+            acc = self.g_vec - (self.air_res_coeff) * np.linalg.norm(vel) * vel # Обновляем ускорение для следующей итерации
+            
+            trajectory.append(pos.copy()) # Store a copy of the position
+            time += dt
+            times.append(time)
+
+        trajectory = np.array(trajectory).reshape(-1, 2)  # Convert to NumPy array
+        profiler.count('ballistics.steps', len(trajectory))
+        yield np.array(times), trajectory[:, 0], trajectory[:, 1]
+
+    def predictor_corrector_batch(self, angle_degrees, wind_speed=0, v0=None, vM=None):
+        """
+        Пакетная версия predictor_corrector: интегрирует сразу много выстрелов массивными операциями NumPy.
+
+        Схема шага совпадает с predictor_corrector, поэтому для одного выстрела результат тот же.
+        Выстрел, упавший на землю, исключается из дальнейших вычислений.
+
+        Args:
+            angle_degrees: Угол (или массив углов) вылета в градусах.
+            wind_speed: Скорость (или массив скоростей) ветра, направленного против оси x, м/с.
+            v0: Начальная скорость (или массив скоростей), м/с. По умолчанию self.v0.
+            vM: Предельная скорость (или массив скоростей), м/с. По умолчанию self.vM.
+
+        Returns:
+            Кортеж: (массив дальностей, массив времен полета)
+        """
+        v0 = self.v0 if v0 is None else v0
+        vM = self.vM if vM is None else vM
+        angle_radians, wind_speed, v0, vM = np.broadcast_arrays(
+            np.radians(np.asarray(angle_degrees, dtype=float)),
+            np.asarray(wind_speed, dtype=float),
+            np.asarray(v0, dtype=float),
+            np.asarray(vM, dtype=float))
+        shape = angle_radians.shape
+        angle_radians, wind_speed, v0, vM = (arr.ravel() for arr in (angle_radians, wind_speed, v0, vM))
+
+        dt = self.dt
+        gravity = self.gravity
+        k = gravity / vM ** 2  # Коэффициент сопротивления для каждого выстрела
+
+        # Состояние только активных (еще летящих) выстрелов
+        active = np.arange(angle_radians.size)
+        x = np.zeros(active.size)
+        y = np.zeros(active.size)
+        vx = v0 * np.cos(angle_radians) - wind_speed
+        vy = v0 * np.sin(angle_radians)
+        ax = np.zeros(active.size)
+        ay = np.full(active.size, -gravity)
+
+        ranges = np.zeros(active.size)
+        times = np.zeros(active.size)
+        time = 0
+
+        while active.size:
+            # Предиктор
+            vx_pred = vx + ax * dt
+            vy_pred = vy + ay * dt
+
+            # Корректор
+            drag = k * np.sqrt(vx_pred * vx_pred + vy_pred * vy_pred)
+            vx = vx + 0.5 * (ax - drag * vx_pred) * dt
+            vy = vy + 0.5 * (ay - gravity - drag * vy_pred) * dt
+            x = x + vx * dt
+            y = y + vy * dt
+            drag = k * np.sqrt(vx * vx + vy * vy)
+            ax = -drag * vx
+            ay = -gravity - drag * vy
+            time += dt
+
+            landed = y < 0
+            if landed.any():
+                ranges[active[landed]] = x[landed]
+                times[active[landed]] = time
+                flying = ~landed
+                active, x, y, vx, vy, ax, ay, k = (arr[flying] for arr in (active, x, y, vx, vy, ax, ay, k))
+
+        return ranges.reshape(shape), times.reshape(shape)
+
+    def predictor_corrector_3d(self, angle_degrees, azimuth_degrees=0, wind=(0.0, 0.0, 0.0), atmosphere=None):
+        """
+        Трехмерная траектория с вектором ветра и плотностью воздуха, зависящей от высоты.
+
+        Оси: x — по направлению стрельбы при нулевом азимуте, y — вверх, z — вбок (азимут отсчитывается
+        от x к z). Состояние ведется в системе земли, сила сопротивления зависит от скорости относительно
+        воздуха: a = g - (g / vM^2) * rho(y) / rho(0) * |v - w| (v - w). Схема шага та же, что в
+        predictor_corrector, поэтому при нулевом ветре, нулевом азимуте и atmosphere=None результат
+        совпадает с ним поразрядно (z = 0).
+
+        В predictor_corrector скорость ветра wind_speed вычитается из начальной скорости, и координата x
+        фактически отсчитывается в системе воздуха; здесь при wind=(wind_speed, 0, 0) получается та же высота
+        y и x = x_2d + wind_speed * t.
+
+        Args:
+            angle_degrees: Угол вылета над горизонтом в градусах.
+            azimuth_degrees: Азимут в градусах.
+            wind: Вектор скорости ветра (wx, wy, wz), м/с.
+            atmosphere: Atmosphere (плотность по высоте); None — постоянная плотность.
+
+        Returns:
+            Кортеж: (массив x-координат, массив y-координат, массив z-координат, время полета)
+        """
+        angle_radians = np.radians(angle_degrees)
+        azimuth_radians = np.radians(azimuth_degrees)
+        pos = np.zeros(3)
+        vel = self.v0 * np.cos(angle_radians) * np.array([np.cos(azimuth_radians), 0.0, np.sin(azimuth_radians)])
+        vel[1] = self.v0 * np.sin(angle_radians)
+        wind = np.asarray(wind, dtype=float)
+        g_vec = np.array([0.0, -self.gravity, 0.0])
+        acc = g_vec  # Как в predictor_corrector: в начальный момент учитывается только тяжесть
+
+        coeff = self.air_res_coeff
+        trajectory = [pos.copy()]
+        time = 0
+        dt = self.dt
+
+        if atmosphere is not None:
+            coeff = self.air_res_coeff * atmosphere.density_ratio_scalar(pos[1])
+
+        while pos[1] >= 0:
+            # Предиктор
+            vel_pred = vel + acc * dt
+            # Корректор
+            rel = vel_pred - wind
+            acc_pred = g_vec - coeff * np.linalg.norm(rel) * rel
+            vel = vel + 0.5 * (acc + acc_pred) * dt
+            pos = pos + vel * dt
+            if atmosphere is not None:
+                coeff = self.air_res_coeff * atmosphere.density_ratio_scalar(pos[1])
+            rel = vel - wind
+            acc = g_vec - coeff * np.linalg.norm(rel) * rel
+
+            trajectory.append(pos.copy())
+            time += dt
+
+        trajectory = np.array(trajectory)
+        profiler.count('ballistics.steps', len(trajectory))
+        return trajectory[:, 0], trajectory[:, 1], trajectory[:, 2], time
+
+    def predictor_corrector_3d_batch(self, angle_degrees, azimuth_degrees=0, wind=(0.0, 0.0, 0.0), v0=None,
+                                     vM=None, atmosphere=None):
+        """
+        Пакетная версия predictor_corrector_3d: точки падения сразу многих выстрелов.
+
+        Схема шага совпадает с predictor_corrector_batch, поэтому при нулевом ветре, нулевом азимуте и
+        atmosphere=None дальности и времена полета совпадают с ним поразрядно. Плотность берется из
+        таблицы Atmosphere для высот всех летящих выстрелов одной операцией.
+
+        Args:
+            angle_degrees: Угол (или массив углов) вылета в градусах.
+            azimuth_degrees: Азимут (или массив азимутов) в градусах.
+            wind: Вектор ветра формы (3,) или массив векторов формы (..., 3), м/с.
+            v0: Начальная скорость (или массив скоростей), м/с. По умолчанию self.v0.
+            vM: Предельная скорость у земли (или массив), м/с. По умолчанию self.vM.
+            atmosphere: Atmosphere; None — постоянная плотность.
+
+        Returns:
+            Кортеж: (массив x точек падения, массив z точек падения (снос), массив времен полета)
+        """
+        v0 = self.v0 if v0 is None else v0
+        vM = self.vM if vM is None else vM
+        wind = np.asarray(wind, dtype=float)
+        angle_radians, azimuth_radians, wx, wy, wz, v0, vM = np.broadcast_arrays(
+            np.radians(np.asarray(angle_degrees, dtype=float)),
+            np.radians(np.asarray(azimuth_degrees, dtype=float)),
+            wind[..., 0], wind[..., 1], wind[..., 2],
+            np.asarray(v0, dtype=float),
+            np.asarray(vM, dtype=float))
+        shape = angle_radians.shape
+        angle_radians, azimuth_radians, wx, wy, wz, v0, vM = (
+            arr.ravel() for arr in (angle_radians, azimuth_radians, wx, wy, wz, v0, vM))
+
+        dt = self.dt
+        gravity = self.gravity
+        k0 = gravity / vM ** 2  # Коэффициент сопротивления у земли для каждого выстрела
+        k = k0
+
+        active = np.arange(angle_radians.size)
+        x = np.zeros(active.size)
+        y = np.zeros(active.size)
+        z = np.zeros(active.size)
+        horizontal = v0 * np.cos(angle_radians)
+        vx = horizontal * np.cos(azimuth_radians)
+        vy = v0 * np.sin(angle_radians)
+        vz = horizontal * np.sin(azimuth_radians)
+        ax = np.zeros(active.size)
+        ay = np.full(active.size, -gravity)
+        az = np.zeros(active.size)
+
+        ranges = np.zeros(active.size)
+        drifts = np.zeros(active.size)
+        times = np.zeros(active.size)
+        time = 0
+
+        if atmosphere is not None:
+            k = k0 * atmosphere.density_ratio(y)
+
+        while active.size:
+            # Предиктор (k уже соответствует текущей высоте — посчитан в конце предыдущего шага)
+            vx_pred = vx + ax * dt
+            vy_pred = vy + ay * dt
+            vz_pred = vz + az * dt
+
+            # Корректор
+            rx, ry, rz = vx_pred - wx, vy_pred - wy, vz_pred - wz
+            drag = k * np.sqrt(rx * rx + ry * ry + rz * rz)
+            vx = vx + 0.5 * (ax - drag * rx) * dt
+            vy = vy + 0.5 * (ay - gravity - drag * ry) * dt
+            vz = vz + 0.5 * (az - drag * rz) * dt
+            x = x + vx * dt
+            y = y + vy * dt
+            z = z + vz * dt
+            if atmosphere is not None:
+                k = k0 * atmosphere.density_ratio(y)
+            rx, ry, rz = vx - wx, vy - wy, vz - wz
+            drag = k * np.sqrt(rx * rx + ry * ry + rz * rz)
+            ax = -drag * rx
+            ay = -gravity - drag * ry
+            az = -drag * rz
+            time += dt
+
+            landed = y < 0
+            if landed.any():
+                ranges[active[landed]] = x[landed]
+                drifts[active[landed]] = z[landed]
+                times[active[landed]] = time
+                flying = ~landed
+                active, x, y, z, vx, vy, vz, ax, ay, az, wx, wy, wz, k0, k = (
+                    arr[flying] for arr in (active, x, y, z, vx, vy, vz, ax, ay, az, wx, wy, wz, k0, k))
+
+        return ranges.reshape(shape), drifts.reshape(shape), times.reshape(shape)
+
+    def find_optimal_angle_with_air_resistance(self, wind_speed=0, angle_step=0.1):
+        """
+        Находит оптимальный угол вылета для максимальной дальности с учетом сопротивления воздуха и ветра.
+
+        Args:
+            wind_speed: Скорость ветра, направленного против оси x, м/с.
+            angle_step: Шаг изменения угла в градусах.
+
+        Returns:
+            Оптимальный угол в градусах.
+        """
+        angles = np.arange(0, 90, angle_step)
+        max_ranges = np.zeros_like(angles)
+
+        for i, angle in enumerate(angles):
+            trajectory_x, _, _ = self.predictor_corrector(angle, wind_speed)
+            max_ranges[i] = trajectory_x[-1]
+
+        optimal_angle_index = np.argmax(max_ranges) # Index of maximum range
+        return angles[optimal_angle_index]
+
+    def vertical_fall_predictor_corrector(self, initial_height):
+         """
+         Моделирует вертикальное падение тела с учетом сопротивления воздуха с использованием метода предиктор-корректор (векторная версия).
+
+         Args:
+             initial_height: Начальная высота тела, м.
+
+         Returns:
+             Кортеж: (массив времен, массив высот, массив скоростей)
+         """
+         y = initial_height
+         vy = 0  # Начальная вертикальная скорость
+         times = [0]
+         heights = [y]
+         velocities = [vy]
+         time = 0
+
+         while y > 0:
+             # Предиктор
+             ay = - self.gravity - (self.gravity / self.vM ** 2) * vy * abs(vy)  # Ускорение всегда против скорости
+             vy_pred = vy + ay * self.dt
+             y_pred = y + vy * self.dt
+
+             # Корректор
+             ay_pred = - self.gravity - (self.gravity / self.vM ** 2) * vy_pred * abs(vy_pred)
+             vy = vy + 0.5 * (ay + ay_pred) * self.dt
+             y = y + 0.5 * (vy + vy_pred) * self.dt
+
+             time += self.dt
+             times.append(time)
+             heights.append(y)
+             velocities.append(vy)
+
+         profiler.count('ballistics.steps', len(times) - 1)
+         return times, heights, velocities
+
+    def fall_time_and_impact_speed(self, initial_height):
+        """
+        Аналитически вычисляет время падения и скорость удара для тела, брошенного без начальной скорости.
+
+        Из y(t) = h - (vM^2 / g) * ln(cosh(g t / vM)) при y = 0 следует
+        T = (vM / g) * arccosh(exp(s)), |v(T)| = vM * sqrt(1 - exp(-2 s)), где s = g h / vM^2.
+        Формулы записаны без exp(s), поэтому не переполняются при больших высотах.
+
+        Args:
+            initial_height: Начальная высота (или массив высот), м; отрицательная высота — ValueError.
+
+        Returns:
+            Кортеж: (время падения, скорость удара) — массивы той же формы, что initial_height.
+        """
+        initial_height = np.asarray(initial_height, dtype=float)
+        if np.any(initial_height < 0):
+            raise ValueError("Начальная высота не может быть отрицательной")
+        s = self.gravity * initial_height / self.vM ** 2
+        q = -np.expm1(-2 * s)  # 1 - exp(-2 s)
+        fall_time = self.vM / self.gravity * (s + np.log1p(np.sqrt(q)))
+        impact_speed = self.vM * np.sqrt(q)
+        return fall_time, impact_speed
+
+    def vertical_fall_analytic(self, initial_height, times=None):
+        """
+        Точное решение задачи о вертикальном падении с квадратичным сопротивлением из состояния покоя.
+
+        v(t) = -vM * tanh(g t / vM), y(t) = h - (vM^2 / g) * ln(cosh(g t / vM)).
+
+        Args:
+            initial_height: Начальная высота тела, м.
+            times: Сетка времен, с. По умолчанию — сетка с шагом dt до момента падения (включительно).
+
+        Returns:
+            Кортеж: (массив времен, массив высот, массив скоростей)
+        """
+        if times is None:
+            fall_time, _ = self.fall_time_and_impact_speed(initial_height)
+            times = np.append(np.arange(0, fall_time, self.dt), fall_time)
+        times = np.asarray(times, dtype=float)
+
+        u = self.gravity * times / self.vM
+        log_cosh = np.abs(u) + np.log1p(np.exp(-2 * np.abs(u))) - np.log(2)  # Устойчивый ln(cosh(u))
+        heights = initial_height - self.vM ** 2 / self.gravity * log_cosh
+        velocities = -self.vM * np.tanh(u)
+        return times, heights, velocities
+
+
+def sample_distribution(rng, spec, size):
+    """
+    Генерирует выборку параметра по описанию распределения.
+
+    Args:
+        rng: Генератор случайных чисел numpy.random.Generator.
+        spec: Число (параметр без разброса) или кортеж ('normal', среднее, СКО),
+            ('uniform', нижняя граница, верхняя граница), ('triangular', левая граница, мода, правая граница).
+        size: Размер выборки.
+
+    Returns:
+        Массив значений параметра.
+    """
+    if np.isscalar(spec):
+        return np.full(size, float(spec))
+    kind, *params = spec
+    if kind == 'normal':
+        return rng.normal(params[0], params[1], size)
+    if kind == 'uniform':
+        return rng.uniform(params[0], params[1], size)
+    if kind == 'triangular':
+        return rng.triangular(params[0], params[1], params[2], size)
+    raise ValueError(f"Неизвестное распределение: {kind}")
+
+
+def _dispersion_batch(seed_sequence, batch_size, distributions, gravity, dt):
+    """Интегрирует одну пачку выстрелов Монте-Карло (выполняется в процессе пула)."""
+    rng = np.random.default_rng(seed_sequence)
+    v0 = sample_distribution(rng, distributions['v0'], batch_size)
+    vM = sample_distribution(rng, distributions['vM'], batch_size)
+    wind_speed = sample_distribution(rng, distributions.get('wind_speed', 0.0), batch_size)
+    angle = sample_distribution(rng, distributions['angle'], batch_size)
+
+    physics = Physic(v0=float(np.mean(v0)), vM=float(np.mean(vM)), gravity=gravity, dt=dt)
+    return physics.predictor_corrector_batch(angle, wind_speed, v0, vM)
+
+
+class RunningStatistics:
+    """
+    Потоковая статистика точек падения: среднее и ковариация (дальность, время полета) и гистограммы.
+
+    Память не зависит от числа выстрелов: хранятся только суммы и счетчики гистограмм.
+    """
+
+    def __init__(self, bins=200):
+        self.bins = bins
+        self.count = 0
+        self.mean = np.zeros(2)
+        self.m2 = np.zeros((2, 2))  # Сумма произведений отклонений (алгоритм Чана)
+        self.range_edges = None
+        self.time_edges = None
+        self.range_hist = None
+        self.time_hist = None
+
+    def _init_histograms(self, ranges, times):
+        """Выбирает границы гистограмм по первой пачке (среднее ± 6 СКО)."""
+        def edges(values):
+            center, spread = np.mean(values), 6 * np.std(values)
+            spread = spread if spread > 0 else max(abs(center) * 1e-6, 1e-9)
+            return np.linspace(center - spread, center + spread, self.bins + 1)
+
+        self.range_edges = edges(ranges)
+        self.time_edges = edges(times)
+        # Крайние ячейки счетчиков — выходы за левую и правую границы
+        self.range_hist = np.zeros(self.bins + 2, dtype=np.int64)
+        self.time_hist = np.zeros(self.bins + 2, dtype=np.int64)
+
+    def update(self, ranges, times):
+        """Добавляет пачку дальностей и времен полета."""
+        samples = np.column_stack((np.ravel(ranges), np.ravel(times)))
+        n = samples.shape[0]
+        if n == 0:
+            return
+        if self.range_hist is None:
+            self._init_histograms(samples[:, 0], samples[:, 1])
+
+        batch_mean = samples.mean(axis=0)
+        deviations = samples - batch_mean
+        batch_m2 = deviations.T @ deviations
+
+        total = self.count + n
+        delta = batch_mean - self.mean
+        self.m2 += batch_m2 + np.outer(delta, delta) * self.count * n / total
+        self.mean += delta * n / total
+        self.count = total
+
+        self.range_hist += np.bincount(np.searchsorted(self.range_edges, samples[:, 0], side='right'),
+                                       minlength=self.bins + 2)
+        self.time_hist += np.bincount(np.searchsorted(self.time_edges, samples[:, 1], side='right'),
+                                      minlength=self.bins + 2)
+
+    @property
+    def covariance(self):
+        """Выборочная ковариационная матрица (дальность, время полета)."""
+        if self.count < 2:
+            return np.full((2, 2), np.nan)
+        return self.m2 / (self.count - 1)
+
+    def standard_error(self):
+        """Стандартная ошибка среднего (дальность, время полета)."""
+        return np.sqrt(np.diag(self.covariance) / self.count)
+
+    def cep(self):
+        """
+        Вероятное отклонение по дальности: медиана |x - среднее| по гистограмме.
+
+        Returns:
+            Радиус, внутри которого лежит половина точек падения, м.
+        """
+        if self.count == 0:
+            return np.nan
+        centers = 0.5 * (self.range_edges[:-1] + self.range_edges[1:])
+        deviations = np.abs(centers - self.mean[0])
+        order = np.argsort(deviations)
+        cumulative = np.cumsum(self.range_hist[1:-1][order])
+        index = np.searchsorted(cumulative, 0.5 * self.count)
+        if index >= len(order):
+            return np.inf  # Половина выборки вне гистограммы
+        return deviations[order[index]]
+
+    def summary(self):
+        """Снимок текущей статистики в виде словаря."""
+        return {
+            'count': self.count,
+            'mean_range': self.mean[0],
+            'mean_time': self.mean[1],
+            'covariance': self.covariance,
+            'standard_error': self.standard_error(),
+            'cep': self.cep(),
+            'range_edges': self.range_edges,
+            'range_hist': self.range_hist,
+            'time_edges': self.time_edges,
+            'time_hist': self.time_hist,
+        }
+
+
+class MonteCarloDispersion:
+    """
+    Анализ рассеивания точек падения методом Монте-Карло.
+
+    Параметры v0, vM, wind_speed и angle выбираются из заданных распределений (см. sample_distribution),
+    пачки выстрелов интегрируются predictor_corrector_batch в пуле процессов. Каждая пачка получает
+    свой SeedSequence, поэтому результат воспроизводим при любом числе процессов.
+    """
+
+    def __init__(self, distributions, gravity=Mathematic.GRAVITY, dt=0.01, batch_size=10000,
+                 max_workers=None, seed=None, bins=200):
+        """
+        Args:
+            distributions: Словарь {'v0': ..., 'vM': ..., 'wind_speed': ..., 'angle': ...} с описаниями распределений.
+            gravity: Ускорение свободного падения, м/с^2.
+            dt: Временной шаг интегрирования, с.
+            batch_size: Число выстрелов в одной пачке.
+            max_workers: Число процессов (по умолчанию — число ядер).
+            seed: Начальное зерно генератора.
+            bins: Число ячеек гистограмм.
+        """
+        self.distributions = distributions
+        self.gravity = gravity
+        self.dt = dt
+        self.batch_size = batch_size
+        self.max_workers = max_workers
+        self.seed = seed
+        self.bins = bins
+
+    def run(self, num_samples, tol=None, min_samples=None):
+        """
+        Запускает моделирование и выдает статистику после каждой обработанной пачки.
+
+        Генератор можно прервать в любой момент — незапущенные пачки отменяются.
+
+        Args:
+            num_samples: Максимальное число выстрелов.
+            tol: Допустимая стандартная ошибка средней дальности, м. При ее достижении расчет останавливается.
+            min_samples: Минимальное число выстрелов до проверки сходимости (по умолчанию две пачки).
+
+        Yields:
+            Словарь RunningStatistics.summary() с ключом 'converged'.
+        """
+        stats = RunningStatistics(self.bins)
+        min_samples = 2 * self.batch_size if min_samples is None else min_samples
+        num_batches = -(-num_samples // self.batch_size)
+        seeds = np.random.SeedSequence(self.seed).spawn(num_batches)
+        sizes = [min(self.batch_size, num_samples - i * self.batch_size) for i in range(num_batches)]
+
+        workers = self.max_workers or os.cpu_count() or 1
+        in_flight = 2 * workers  # Ограничиваем число пачек в памяти
+
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            next_batch = 0
+            pending = {}
+            results = {}
+            next_to_merge = 0
+            try:
+                while next_to_merge < num_batches:
+                    while next_batch < num_batches and len(pending) + len(results) < in_flight:
+                        future = pool.submit(_dispersion_batch, seeds[next_batch], sizes[next_batch],
+                                             self.distributions, self.gravity, self.dt)
+                        pending[future] = next_batch
+                        next_batch += 1
+
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        results[pending.pop(future)] = future.result()
+
+                    # Пачки объединяются в порядке номеров — статистика не зависит от порядка завершения
+                    while next_to_merge in results:
+                        stats.update(*results.pop(next_to_merge))
+                        next_to_merge += 1
+
+                        summary = stats.summary()
+                        summary['converged'] = (tol is not None and stats.count >= min_samples
+                                                and summary['standard_error'][0] <= tol)
+                        yield summary
+                        if summary['converged']:
+                            return
+            finally:
+                for future in pending:
+                    future.cancel()
+
+    def analyze(self, num_samples, tol=None, min_samples=None):
+        """
+        Выполняет run() до конца (или до сходимости) и возвращает итоговую статистику.
+
+        Returns:
+            Словарь RunningStatistics.summary() с ключом 'converged'.
+        """
+        summary = None
+        for summary in self.run(num_samples, tol, min_samples):
+            pass
+        return summary
@@ -0,0 +1,268 @@
+"""
+Набор бенчмарков для горячих участков ядра.
+
+Результаты записываются в JSON вместе с описанием машины и сравниваются с сохраненным базовым
+замером; замедление больше порога считается регрессией (код возврата 1).
+
+    python -m mkm.bench --output bench.json
+    python -m mkm.bench --baseline bench.json --threshold 0.2
+    python -m mkm.bench -k magnet --repeat 3
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+from mkm.ballistics import Atmosphere, Physic
+from mkm.fermat import FermatSolver
+from mkm.fitting import PendulumFit, synthetic_recording
+from mkm.magnet import HorseshoeMagnet
+from mkm.particles import FieldLattice, ParticleTracker, induced_dipole_coefficient
+from mkm.pendulum import Physicist, Mathematician
+
+DEFAULT_THRESHOLD = 0.2  # допустимое относительное замедление
+BENCHMARKS = {}
+
+
+def benchmark(name, repeat=5, warmup=True, **params):
+    """
+    Регистрирует бенчмарк.
+
+    Декорируемая функция получает params, выполняет подготовку и возвращает вызываемый объект
+    без аргументов — замеряется только он.
+    """
+    def register(setup):
+        BENCHMARKS[name] = {'setup': setup, 'repeat': repeat, 'warmup': warmup, 'params': params}
+        return setup
+    return register
+
+
+# Параметры соответствуют значениям по умолчанию в GUI
+
+@benchmark('magnet.H_ext', repeat=20, a=0.1, b=0.05, d=0.2, M=1e6, Na=20, Nb=20)
+def _magnet_h_ext(a, b, d, M, Na, Nb):
+    magnet = HorseshoeMagnet(a, b, d, M, Na, Nb)
+    return lambda: magnet.H_ext(0.1, 0.0, 0.1)
+
+
+@benchmark('magnet.field_grid', repeat=3, a=0.1, b=0.05, d=0.2, M=1e6, num_points=30)
+def _magnet_field_grid(a, b, d, M, num_points):
+    magnet = HorseshoeMagnet(a, b, d, M)
+    return lambda: magnet.field_grid('Y=0', num_points=num_points)
+
+
+@benchmark('magnet.field_at', repeat=5, a=0.1, b=0.05, d=0.2, M=1e6, points=10000)
+def _magnet_field_at(a, b, d, M, points):
+    magnet = HorseshoeMagnet(a, b, d, M)
+    positions = np.random.default_rng(0).uniform(-0.3, 0.4, (points, 3))
+    return lambda: magnet.field_at(positions)
+
+
+@benchmark('particles.lattice_push', repeat=5, a=0.1, b=0.05, d=0.2, M=1e6, particles=10000, steps=100)
+def _particles_lattice_push(a, b, d, M, particles, steps):
+    magnet = HorseshoeMagnet(a, b, d, M)
+    lattice = FieldLattice(magnet, spacing=0.02)
+    rng = np.random.default_rng(0)
+    positions = np.column_stack((rng.uniform(0, d + a, particles), rng.uniform(0, b, particles),
+                                 np.full(particles, 0.15)))
+
+    def run():
+        tracker = ParticleTracker(lattice, positions, np.zeros(3), mode='dipole',
+                                  coefficient=induced_dipole_coefficient(1000, 7870), drag=20,
+                                  acceleration=(0, 0, -9.81), dt=1e-5)
+        for _ in tracker.run(steps, chunk_steps=steps, record_every=steps):
+            pass
+    return run
+
+
+@benchmark('pendulum.integrate', repeat=5, length=1.0, theta0=0.2, omega0=0.0, step=0.001,
+           damping=0.05, points=100000)
+def _pendulum_integrate(length, theta0, omega0, step, damping, points):
+    mathematician = Mathematician(Physicist(length=length), theta0, omega0, step, damping, points)
+    return mathematician.integrate
+
+
+@benchmark('pendulum.fit', repeat=1, warmup=False, length=1.2, damping=0.05, theta0=0.6, omega0=0.3,
+           points=100000, noise=0.002)
+def _pendulum_fit(length, damping, theta0, omega0, points, noise):
+    t, theta = synthetic_recording(length, damping, theta0, omega0, points=points, noise=noise, seed=0)
+    return lambda: PendulumFit(t, theta).fit()
+
+
+@benchmark('ballistics.predictor_corrector', repeat=5, v0=750.0, vM=150.0, angle=45.0, wind_speed=20.0)
+def _predictor_corrector(v0, vM, angle, wind_speed):
+    physics = Physic(v0=v0, vM=vM)
+    return lambda: physics.predictor_corrector(angle, wind_speed)
+
+
+@benchmark('ballistics.batch_3d', repeat=3, v0=750.0, vM=150.0, shots=10000, wind=[5.0, 0.0, -10.0])
+def _batch_3d(v0, vM, shots, wind):
+    physics = Physic(v0=v0, vM=vM)
+    atmosphere = Atmosphere.standard()
+    angles = np.linspace(5.0, 85.0, shots)
+    return lambda: physics.predictor_corrector_3d_batch(angles, 0.0, wind, atmosphere=atmosphere)
+
+
+@benchmark('ballistics.find_optimal_angle', repeat=3, warmup=False, v0=750.0, vM=150.0,
+           wind_speed=20.0, angle_step=2.0)
+def _find_optimal_angle(v0, vM, wind_speed, angle_step):
+    physics = Physic(v0=v0, vM=vM)
+    return lambda: physics.find_optimal_angle_with_air_resistance(wind_speed, angle_step)
+
+
+@benchmark('ballistics.vertical_fall', repeat=20, v0=750.0, vM=150.0, initial_height=100.0)
+def _vertical_fall(v0, vM, initial_height):
+    physics = Physic(v0=v0, vM=vM)
+    return lambda: physics.vertical_fall_predictor_corrector(initial_height)
+
+
+@benchmark('fermat.golden_section', repeat=20, A=(-2.0, 5.0), B=(3.0, -5.0), n1=1.0, n2=1.5)
+def _fermat_golden_section(A, B, n1, n2):
+    solver = FermatSolver(A, B, n1, n2)
+    return solver.solve
+
+
+def machine_metadata():
+    """Описание машины и окружения, в котором выполнялись замеры."""
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {
+        'timestamp': datetime.datetime.now().isoformat(timespec='seconds'),
+        'platform': platform.platform(),
+        'machine': platform.machine(),
+        'processor': platform.processor(),
+        'cpu_count': os.cpu_count(),
+        'python': platform.python_version(),
+        'implementation': platform.python_implementation(),
+        'numpy': np.__version__,
+        'commit': commit,
+    }
+
+
+def run_benchmark(name, repeat=None):
+    """
+    Выполняет один бенчмарк.
+
+    Returns:
+        Словарь: параметры и времена (min, median, mean, stdev, с) по repeat запускам.
+    """
+    spec = BENCHMARKS[name]
+    repeat = repeat or spec['repeat']
+    function = spec['setup'](**spec['params'])
+    if spec['warmup']:
+        function()
+
+    times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - started)
+
+    return {
+        'params': spec['params'],
+        'repeat': repeat,
+        'min': min(times),
+        'median': statistics.median(times),
+        'mean': statistics.fmean(times),
+        'stdev': statistics.stdev(times) if repeat > 1 else 0.0,
+    }
+
+
+def run_benchmarks(names=None, repeat=None, progress=None):
+    """Выполняет выбранные бенчмарки (по умолчанию все) и возвращает отчет с метаданными."""
+    results = {}
+    for name in names or BENCHMARKS:
+        results[name] = run_benchmark(name, repeat)
+        if progress is not None:
+            progress(name, results[name])
+    return {'metadata': machine_metadata(), 'results': results}
+
+
+def compare(report, baseline, threshold=DEFAULT_THRESHOLD, key='min'):
+    """
+    Сравнивает отчет с базовым замером.
+
+    Сравнивается минимальное время: оно меньше всего зависит от фоновой нагрузки.
+
+    Параметры сравниваются в JSON-представлении: после загрузки базового замера кортежи становятся списками.
+
+    Returns:
+        Кортеж: (список строк сравнения (имя, базовое, текущее, отношение), список регрессий,
+        список пропущенных бенчмарков с причиной)
+    """
+    rows = []
+    regressions = []
+    skipped = []
+    for name, result in report['results'].items():
+        reference = baseline['results'].get(name)
+        if reference is None:
+            skipped.append(f"{name}: нет в базовом замере")
+            continue
+        if _normalized(reference.get('params')) != _normalized(result['params']):
+            skipped.append(f"{name}: изменились параметры")
+            continue
+        ratio = result[key] / reference[key]
+        rows.append((name, reference[key], result[key], ratio))
+        if ratio > 1 + threshold:
+            regressions.append(f"{name}: {ratio:.2f}x ({reference[key] * 1000:.2f} -> {result[key] * 1000:.2f} мс)")
+    return rows, regressions, skipped
+
+
+def _normalized(params):
+    return json.loads(json.dumps(params))
+
+
+def _same_machine(first, second):
+    fields = ('machine', 'processor', 'cpu_count', 'python', 'numpy')
+    return all(first.get(field) == second.get(field) for field in fields)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('-k', dest='pattern', help='выполнять только бенчмарки, содержащие подстроку')
+    parser.add_argument('--repeat', type=int, help='число запусков (по умолчанию свое для каждого бенчмарка)')
+    parser.add_argument('--output', help='файл для записи результатов в JSON')
+    parser.add_argument('--baseline', help='JSON с базовым замером для сравнения')
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help='допустимое относительное замедление (0.2 = 20%%)')
+    args = parser.parse_args(argv)
+
+    names = [name for name in BENCHMARKS if not args.pattern or args.pattern in name]
+    report = run_benchmarks(names, args.repeat, progress=lambda name, result: print(
+        f"{name:34s} min {result['min'] * 1000:10.3f} мс   median {result['median'] * 1000:10.3f} мс"))
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as file:
+            json.dump(report, file, ensure_ascii=False, indent=2)
+
+    if not args.baseline:
+        return 0
+
+    with open(args.baseline, encoding='utf-8') as file:
+        baseline = json.load(file)
+    if not _same_machine(report['metadata'], baseline['metadata']):
+        print("ВНИМАНИЕ: базовый замер сделан на другой машине или в другом окружении")
+
+    rows, regressions, skipped = compare(report, baseline, args.threshold)
+    print()
+    for name, reference, current, ratio in rows:
+        print(f"{name:34s} {reference * 1000:10.3f} -> {current * 1000:10.3f} мс   {ratio:5.2f}x")
+    for reason in skipped:
+        print(f"ПРОПУЩЕН: {reason}")
+    for regression in regressions:
+        print(f"РЕГРЕССИЯ: {regression}")
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,175 @@
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+import numpy as np
+
+from mkm.ballistics import Physic, Mathematic
+from mkm.pendulum import Physicist, Mathematician
+
+
+def _landing_point(step, v0, vM, angle_degrees, wind_speed, gravity):
+    """
+    Точка и момент падения с линейной интерполяцией между двумя последними узлами траектории.
+
+    Без интерполяции дальность и время полета меняются с шагом ступенчато (время кратно dt),
+    и порядок сходимости самой схемы по ним не определить.
+    """
+    physics = Physic(v0=v0, vM=vM, gravity=gravity, dt=step)
+    x, y, time = physics.predictor_corrector(angle_degrees, wind_speed)
+    fraction = y[-2] / (y[-2] - y[-1])  # Доля последнего шага до пересечения y = 0
+    return x[-2] + fraction * (x[-1] - x[-2]), time - (1 - fraction) * step
+
+
+def projectile_range(step, v0, vM, angle_degrees, wind_speed=0, gravity=Mathematic.GRAVITY):
+    """Дальность полета (Physic.predictor_corrector) при шаге step."""
+    return float(_landing_point(step, v0, vM, angle_degrees, wind_speed, gravity)[0])
+
+
+def projectile_flight_time(step, v0, vM, angle_degrees, wind_speed=0, gravity=Mathematic.GRAVITY):
+    """Время полета (Physic.predictor_corrector) при шаге step."""
+    return float(_landing_point(step, v0, vM, angle_degrees, wind_speed, gravity)[1])
+
+
+def pendulum_period(step, length, theta0, omega0, damping, duration, g=9.81):
+    """
+    Период маятника (Mathematician.integrate) при шаге step на интервале duration.
+
+    В отличие от Mathematician.compute_period моменты пересечения нуля интерполируются внутри шага.
+    """
+    physicist = Physicist(g=g, length=length)
+    points = int(round(duration / step)) + 1
+    mathematician = Mathematician(physicist, theta0, omega0, step, damping, points)
+    t_values, theta_values, _ = mathematician.integrate()
+
+    crossings = np.where((theta_values[:-1] >= 0) & (theta_values[1:] < 0))[0]
+    if len(crossings) < 2:
+        return np.nan
+    fraction = theta_values[crossings] / (theta_values[crossings] - theta_values[crossings + 1])
+    return float(np.mean(np.diff(t_values[crossings] + fraction * step)))
+
+
+class ConvergenceStudy:
+    """
+    Исследование сходимости по шагу интегрирования с экстраполяцией Ричардсона.
+
+    Величина quantity(step) вычисляется для шагов base_step, base_step/2, ..., base_step/2^(levels-1)
+    параллельно в пуле процессов. Наблюдаемый порядок сходимости p оценивается по наклону
+    log2|Q(h) - Q(h/2)| от log2 h, по нему — экстраполированное значение и погрешность каждого шага.
+    """
+
+    def __init__(self, quantity, base_step, levels=6, max_workers=None):
+        """
+        Args:
+            quantity: Функция quantity(step) -> float. Для параллельного счета должна сериализоваться pickle
+                (функция уровня модуля или functools.partial от нее).
+            base_step: Самый крупный шаг.
+            levels: Число шагов в последовательности (не меньше 3).
+            max_workers: Число процессов (по умолчанию — число ядер). 1 — считать в текущем процессе.
+        """
+        if levels < 3:
+            raise ValueError("Для оценки порядка сходимости нужно не менее трех шагов")
+        self.quantity = quantity
+        self.base_step = base_step
+        self.levels = levels
+        self.max_workers = max_workers
+
+    @classmethod
+    def for_physic(cls, physics, quantity='range', angle_degrees=45.0, wind_speed=0, levels=6, max_workers=None):
+        """
+        Исследование для объекта Physic: шаг — physics.dt.
+
+        Args:
+            quantity: 'range' (дальность) или 'flight_time' (время полета).
+        """
+        functions = {'range': projectile_range, 'flight_time': projectile_flight_time}
+        if quantity not in functions:
+            raise ValueError(f"Неизвестная величина: {quantity}")
+        function = partial(functions[quantity], v0=physics.v0, vM=physics.vM, angle_degrees=angle_degrees,
+                           wind_speed=wind_speed, gravity=physics.gravity)
+        return cls(function, physics.dt, levels, max_workers)
+
+    @classmethod
+    def for_mathematician(cls, mathematician, duration=None, levels=6, max_workers=None):
+        """
+        Исследование периода маятника для объекта Mathematician: шаг — mathematician.step.
+
+        Args:
+            duration: Интервал моделирования, с. По умолчанию step * points, как в самом объекте.
+        """
+        physicist = mathematician.physicist
+        duration = mathematician.step * mathematician.points if duration is None else duration
+        function = partial(pendulum_period, length=physicist.length, theta0=mathematician.theta0,
+                           omega0=mathematician.omega0, damping=mathematician.damping,
+                           duration=duration, g=physicist.g)
+        return cls(function, mathematician.step, levels, max_workers)
+
+    def steps(self):
+        """Последовательность шагов от крупного к мелкому."""
+        return self.base_step / 2.0 ** np.arange(self.levels)
+
+    def evaluate(self):
+        """Вычисляет величину на всех шагах."""
+        steps = self.steps()
+        if self.max_workers == 1:
+            return steps, np.array([self.quantity(step) for step in steps])
+        with ProcessPoolExecutor(max_workers=self.max_workers) as pool:
+            # Мелкие шаги самые дорогие — отправляем их первыми
+            values = list(pool.map(self.quantity, steps[::-1]))[::-1]
+        return steps, np.array(values)
+
+    def run(self, tol=None):
+        """
+        Выполняет исследование.
+
+        Args:
+            tol: Требуемая абсолютная погрешность величины.
+
+        Returns:
+            Словарь: 'steps', 'values', 'orders' (локальные порядки по тройкам шагов), 'order' (наблюдаемый
+            порядок по всем шагам), 'extrapolated' (значение по Ричардсону), 'errors' (оценки
+            погрешности каждого шага), 'recommended_step' (наибольший из проверенных шагов, у которого и у
+            всех более мелких погрешность не больше tol, либо None), 'predicted_step' (шаг, при котором
+            модель C*h^p дает ровно tol).
+        """
+        steps, values = self.evaluate()
+        differences = np.abs(np.diff(values))
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            orders = np.log2(differences[:-1] / differences[1:])
+            log_differences = np.log2(differences)
+        usable = np.isfinite(log_differences)
+        if usable.sum() >= 2:
+            order = np.polyfit(np.log2(steps[1:][usable]), log_differences[usable], 1)[0]
+        else:
+            order = np.nan
+
+        if np.isfinite(order) and order > 0:
+            extrapolated = values[-1] + (values[-1] - values[-2]) / (2.0 ** order - 1)
+        else:
+            # Порядок не определен (величина не меняется или сходимость немонотонна)
+            extrapolated = values[-1]
+        errors = np.abs(values - extrapolated)
+
+        recommended_step = None
+        predicted_step = None
+        if tol is not None:
+            # Шаг подходит, только если он и все более мелкие шаги укладываются в tol: при немонотонных
+            # погрешностях отдельный крупный шаг может оказаться точным случайно
+            within = np.flip(np.logical_and.accumulate(np.flip(errors <= tol)))
+            # Погрешность самого мелкого шага оценивается по разности с соседним
+            fits = np.nonzero(within[:-1])[0]
+            if fits.size:
+                recommended_step = steps[fits[0]]
+            if np.isfinite(order) and order > 0 and errors[-2] > 0:
+                constant = errors[-2] / steps[-2] ** order
+                predicted_step = (tol / constant) ** (1 / order)
+
+        return {
+            'steps': steps,
+            'values': values,
+            'orders': orders,
+            'order': order,
+            'extrapolated': extrapolated,
+            'errors': errors,
+            'recommended_step': recommended_step,
+            'predicted_step': predicted_step,
+        }
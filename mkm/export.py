@@ -0,0 +1,200 @@
+"""
+Потоковый колоночный экспорт результатов: траекторий, рядов маятника и сеток поля.
+
+Результат записывается в каталог <имя>.mkm: по одному файлу .npy на колонку и meta.json с типом
+расчета, его параметрами и описанием колонок. Колонки дописываются блоками, поэтому большой расчет
+сохраняется без хранения целиком в памяти; заголовок .npy с итоговым числом строк записывается при
+закрытии. При чтении колонки отображаются в память (mmap), и для графика можно взять подвыборку
+(run['x'][::100]), не читая файл полностью.
+
+    with ColumnWriter('shot.mkm', 'ballistics.trajectory', params) as writer:
+        for t, x, y in physic.trajectory_chunks(45, 20):
+            writer.append(t=t, x=x, y=y)
+
+    run = load_run('shot.mkm')
+    run['x'], run.params
+"""
+import json
+import os
+
+import numpy as np
+
+from mkm.sweep import to_jsonable
+
+FORMAT_VERSION = 1
+_HEADER_SIZE = 128  # фиксированный размер заголовка .npy, чтобы его можно было переписать на месте
+
+
+def _npy_header(dtype, shape):
+    """Заголовок .npy версии 1.0, дополненный пробелами до _HEADER_SIZE байт."""
+    header = repr({'descr': np.lib.format.dtype_to_descr(dtype), 'fortran_order': False, 'shape': tuple(shape)})
+    prefix = np.lib.format.MAGIC_PREFIX + b'\x01\x00'
+    padding = _HEADER_SIZE - len(prefix) - 2 - len(header) - 1
+    if padding < 0:
+        raise ValueError(f"Слишком длинный заголовок .npy: {header}")
+    header = (header + ' ' * padding + '\n').encode('latin1')
+    return prefix + len(header).to_bytes(2, 'little') + header
+
+
+class ColumnWriter:
+    """
+    Поблочная запись колонок в каталог path.
+
+    Тип и форма строки каждой колонки фиксируются первым блоком; все колонки блока должны иметь
+    одинаковое число строк. Используется как контекстный менеджер; при ошибке внутри блока with
+    meta.json помечается как незавершенный ('complete': False).
+
+    Args:
+        path: Каталог результата (создается; расширение .mkm рекомендуется).
+        kind: Тип расчета, например 'pendulum.integrate'.
+        params: Параметры расчета (сериализуемые в JSON) для метаданных.
+    """
+
+    def __init__(self, path, kind, params=None):
+        self.path = path
+        self.kind = kind
+        self.params = params or {}
+        self.rows = 0
+        self.columns = {}  # имя -> (файл, dtype, форма строки)
+        os.makedirs(path, exist_ok=True)
+
+    def append(self, **chunk):
+        """Дописывает блок: именованные массивы одинаковой длины по первой оси."""
+        arrays = {name: np.asarray(values) for name, values in chunk.items()}
+        lengths = {len(array) for array in arrays.values()}
+        if len(lengths) != 1:
+            raise ValueError(f"Колонки блока разной длины: { {name: len(a) for name, a in arrays.items()} }")
+        if not self.columns:
+            for name, array in arrays.items():
+                file = open(os.path.join(self.path, f'{name}.npy'), 'wb')
+                file.write(_npy_header(array.dtype, (0,) + array.shape[1:]))
+                self.columns[name] = (file, array.dtype, array.shape[1:])
+        elif set(arrays) != set(self.columns):
+            raise ValueError(f"Ожидались колонки {sorted(self.columns)}, получены {sorted(arrays)}")
+
+        for name, array in arrays.items():
+            file, dtype, row_shape = self.columns[name]
+            if array.shape[1:] != row_shape:
+                raise ValueError(f"Колонка {name}: форма строки {array.shape[1:]} вместо {row_shape}")
+            file.write(np.ascontiguousarray(array, dtype=dtype).tobytes())
+        self.rows += lengths.pop()
+
+    def close(self, complete=True):
+        """Записывает итоговые заголовки и meta.json."""
+        meta_columns = {}
+        for name, (file, dtype, row_shape) in self.columns.items():
+            file.seek(0)
+            file.write(_npy_header(dtype, (self.rows,) + row_shape))
+            file.close()
+            meta_columns[name] = {'dtype': dtype.str, 'shape': [self.rows, *row_shape]}
+        meta = {'format': FORMAT_VERSION, 'kind': self.kind, 'params': to_jsonable(self.params),
+                'rows': self.rows, 'columns': meta_columns, 'complete': complete}
+        with open(os.path.join(self.path, 'meta.json'), 'w', encoding='utf-8') as file:
+            json.dump(meta, file, ensure_ascii=False, indent=2, allow_nan=False)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close(complete=exc_type is None)
+        return False
+
+
+class ExportedRun:
+    """
+    Сохраненный результат: метаданные и колонки, отображенные в память.
+
+    run['x'] возвращает np.memmap только для чтения; данные читаются с диска по мере обращения.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, 'meta.json'), encoding='utf-8') as file:
+            self.meta = json.load(file)
+        self.kind = self.meta['kind']
+        self.params = self.meta['params']
+        self.rows = self.meta['rows']
+        self.columns = list(self.meta['columns'])
+
+    def __getitem__(self, name):
+        if name not in self.meta['columns']:
+            raise KeyError(name)
+        return np.load(os.path.join(self.path, f'{name}.npy'), mmap_mode='r')
+
+    def __contains__(self, name):
+        return name in self.meta['columns']
+
+
+def load_run(path):
+    """Открывает результат, сохраненный ColumnWriter."""
+    return ExportedRun(path)
+
+
+def save_columns(path, kind, params, chunk_rows=100000, **columns):
+    """Записывает уже посчитанные массивы (например, из GUI) блоками по chunk_rows строк."""
+    length = len(next(iter(columns.values())))
+    with ColumnWriter(path, kind, params) as writer:
+        for start in range(0, max(length, 1), chunk_rows):
+            writer.append(**{name: np.asarray(values)[start:start + chunk_rows] for name, values in columns.items()})
+    return path
+
+
+def export_trajectory(path, physic, angle_degrees, wind_speed=0, chunk_size=100000):
+    """Потоково считает и записывает траекторию Physic.predictor_corrector: колонки t, x, y."""
+    params = {'v0': physic.v0, 'vM': physic.vM, 'gravity': physic.gravity, 'dt': physic.dt,
+              'angle': angle_degrees, 'wind_speed': wind_speed}
+    with ColumnWriter(path, 'ballistics.trajectory', params) as writer:
+        for t, x, y in physic.trajectory_chunks(angle_degrees, wind_speed, chunk_size):
+            writer.append(t=t, x=x, y=y)
+    return path
+
+
+def export_pendulum(path, mathematician, chunk_size=100000):
+    """Потоково интегрирует маятник и записывает колонки t, theta, omega."""
+    physicist = mathematician.physicist
+    params = {'g': physicist.g, 'length': physicist.length, 'theta0': mathematician.theta0,
+              'omega0': mathematician.omega0, 'step': mathematician.step, 'damping': mathematician.damping,
+              'points': mathematician.points}
+    with ColumnWriter(path, 'pendulum.integrate', params) as writer:
+        for t, theta, omega in mathematician.integrate_chunks(chunk_size):
+            writer.append(t=t, theta=theta, omega=omega)
+    return path
+
+
+def export_field_grid(path, magnet, plane='Y=0', x_range=(-0.5, 0.7), y_range=(-0.5, 0.5), z_range=(-0.5, 0.5),
+                      num_points=30, rows_per_chunk=16):
+    """
+    Потоково считает сетку поля HorseshoeMagnet.field_grid и записывает ее построчно.
+
+    Колонки u, v (координаты: x и z для плоскости Y=0, x и y для Z=0), Hx, Hy, Hz; строка колонки —
+    строка сетки длиной num_points.
+    """
+    params = {'a': magnet.a, 'b': magnet.b, 'd': magnet.d, 'M': magnet.M, 'Na': magnet.Na, 'Nb': magnet.Nb,
+              'plane': plane, 'x_range': x_range, 'y_range': y_range, 'z_range': z_range, 'num_points': num_points}
+    with ColumnWriter(path, 'magnet.field_grid', params) as writer:
+        for U, V, Hx, Hy, Hz in magnet.field_rows(plane, x_range, y_range, z_range, num_points, rows_per_chunk):
+            writer.append(u=U, v=V, Hx=Hx, Hy=Hy, Hz=Hz)
+    return path
+
+
+def export_particles(path, tracker, steps, chunk_steps=100, record_every=1):
+    """
+    Потоково интегрирует mkm.particles.ParticleTracker и записывает колонки t и position (строка — положения
+    всех N частиц, форма (N, 3)).
+
+    Статистика захвата добавляется в параметры результата ('capture'), а состояние каждой частицы —
+    в подкаталог capture.mkm: колонки initial_position, status, stop_time, stop_position.
+    """
+    params = {'mode': tracker.mode, 'dt': tracker.dt, 'particles': len(tracker.status), 'steps': steps,
+              'record_every': record_every, 'acceleration': tracker.acceleration,
+              'magnet': {'a': tracker.magnet.a, 'b': tracker.magnet.b, 'd': tracker.magnet.d, 'M': tracker.magnet.M,
+                         'Na': tracker.magnet.Na, 'Nb': tracker.magnet.Nb}}
+    with ColumnWriter(path, 'particles.track', params) as writer:
+        for t, positions, _ in tracker.run(steps, chunk_steps, record_every):
+            writer.append(t=t, position=positions)
+        summary = tracker.statistics()
+        writer.params['capture'] = {name: value for name, value in summary.items() if np.isscalar(value)}
+    save_columns(os.path.join(path, 'capture.mkm'), 'particles.capture', writer.params['capture'],
+                 initial_position=tracker.initial_positions, status=tracker.status, stop_time=tracker.stop_time,
+                 stop_position=tracker.current_positions())
+    return path
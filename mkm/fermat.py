@@ -0,0 +1,544 @@
+import math
+import heapq
+import numpy as np
+
+from mkm.profiling import profiler
+
+
+class FermatSolver:
+    """
+    Поиск пути луча A -> B через границу y = 0 по принципу Ферма без графического интерфейса.
+
+    Весь ход золотого сечения вычисляется сразу (golden_section_trace), поэтому результат доступен
+    немедленно, а холст только воспроизводит готовую трассу.
+    """
+
+    def __init__(self, A, B, n1, n2, tol=1e-5):
+        """
+        Args:
+            A: Точка источника (x, y) в среде n1.
+            B: Точка приемника (x, y) в среде n2.
+            n1: Показатель преломления первой среды.
+            n2: Показатель преломления второй среды.
+            tol: Ширина отрезка, при которой золотое сечение останавливается.
+        """
+        self.A = A
+        self.B = B
+        self.n1 = n1
+        self.n2 = n2
+        self.tol = tol
+
+    def time_function(self, x):
+        d1 = math.sqrt((x - self.A[0])**2 + (0 - self.A[1])**2)
+        d2 = math.sqrt((self.B[0] - x)**2 + (self.B[1] - 0)**2)
+        return self.n1 * d1 + self.n2 * d2
+
+    def golden_section_trace(self):
+        """
+        Полная трасса поиска золотым сечением.
+
+        Returns:
+            Кортеж: (список состояний {'a', 'b', 'c', 'd', 'fc', 'fd'} по итерациям, найденная абсцисса)
+        """
+        gr = (math.sqrt(5) + 1) / 2
+        a = min(self.A[0], self.B[0])
+        b = max(self.A[0], self.B[0])
+        c = b - (b - a)/gr
+        d = a + (b - a)/gr
+        fc = self.time_function(c)
+        fd = self.time_function(d)
+
+        trace = []
+        while abs(b - a) > self.tol:
+            trace.append({'a': a, 'b': b, 'c': c, 'd': d, 'fc': fc, 'fd': fd})
+
+            if fc < fd:
+                b = d
+            else:
+                a = c
+
+            c = b - (b - a)/gr
+            d = a + (b - a)/gr
+            fc = self.time_function(c)
+            fd = self.time_function(d)
+
+        return trace, (a + b)/2
+
+    def snell_check(self, x):
+        """
+        Проверка закона Снеллиуса для точки пересечения x.
+
+        Returns:
+            Словарь: 'theta1', 'theta2' (углы, рад), 'lhs' = n1*sinθ1, 'rhs' = n2*sinθ2, 'ok' (совпадение до 1e-3).
+        """
+        theta1 = math.atan2(x - self.A[0], self.A[1])
+        theta2 = math.atan2(self.B[0] - x, abs(self.B[1]))
+        lhs = self.n1 * math.sin(theta1)
+        rhs = self.n2 * math.sin(theta2)
+        return {'theta1': theta1, 'theta2': theta2, 'lhs': lhs, 'rhs': rhs, 'ok': abs(lhs - rhs) < 1e-3}
+
+    def solve(self):
+        """
+        Решает задачу целиком.
+
+        Returns:
+            Словарь: 'trace', 'x' (золотое сечение), 'time', 'snell', 'newton_x' (метод Ньютона для проверки).
+        """
+        trace, x = self.golden_section_trace()
+        return {
+            'trace': trace,
+            'x': x,
+            'time': self.time_function(x),
+            'snell': self.snell_check(x),
+            'newton_x': float(fermat_crossing_point(self.A, self.B, self.n1, self.n2)),
+        }
+
+
+def golden_section_crossing_point(A, B, n1, n2, tol=1e-5):
+    """
+    Золотое сечение для массивов пар A, B (векторизованная версия FermatSolver.golden_section_trace).
+
+    Returns:
+        Абсциссы точек пересечения границы.
+    """
+    ax, ay, bx, by, n1, n2 = np.broadcast_arrays(*(np.asarray(v, dtype=float) for v in (A[0], A[1], B[0], B[1], n1, n2)))
+    gr = (math.sqrt(5) + 1) / 2
+    a = np.minimum(ax, bx)
+    b = np.maximum(ax, bx)
+    c = b - (b - a)/gr
+    d = a + (b - a)/gr
+    fc = fermat_travel_time(c, (ax, ay), (bx, by), n1, n2)
+    fd = fermat_travel_time(d, (ax, ay), (bx, by), n1, n2)
+
+    while np.any(np.abs(b - a) > tol):
+        active = np.abs(b - a) > tol
+        left = active & (fc < fd)
+        right = active & ~(fc < fd)
+        b = np.where(left, d, b)
+        a = np.where(right, c, a)
+        c = b - (b - a)/gr
+        d = a + (b - a)/gr
+        fc = fermat_travel_time(c, (ax, ay), (bx, by), n1, n2)
+        fd = fermat_travel_time(d, (ax, ay), (bx, by), n1, n2)
+
+    return (a + b)/2
+
+
+def fermat_travel_time(x, A, B, n1, n2):
+    """
+    Оптическая длина пути A -> (x, 0) -> B (векторизовано).
+
+    Точки задаются парами (x, y), компоненты которых могут быть массивами.
+    """
+    d1 = np.hypot(x - A[0], A[1])
+    d2 = np.hypot(B[0] - x, B[1])
+    return n1 * d1 + n2 * d2
+
+
+def fermat_crossing_point(A, B, n1, n2, tol=1e-14, max_iter=60):
+    """
+    Находит точку пересечения границы y = 0 лучом A -> B методом Ньютона с защитой бисекцией.
+
+    Время прохождения T(x) = n1*|A - (x, 0)| + n2*|B - (x, 0)| выпукло, его минимум лежит между
+    абсциссами A и B. На каждой итерации отрезок [lo, hi] сужается по знаку T'(x); если шаг
+    Ньютона x - T'/T'' выходит из отрезка, делается шаг бисекции. Обычно хватает 4-6 итераций.
+
+    Args:
+        A: Точка источника (x, y); компоненты — числа или массивы.
+        B: Точка приемника (x, y); компоненты — числа или массивы.
+        n1: Показатель преломления среды, содержащей A (число или массив).
+        n2: Показатель преломления среды, содержащей B (число или массив).
+        tol: Относительная точность по x.
+        max_iter: Максимальное число итераций.
+
+    Returns:
+        Абсцисса точки пересечения (массив формы broadcast всех аргументов).
+    """
+    ax, ay, bx, by, n1, n2 = np.broadcast_arrays(*(np.asarray(v, dtype=float) for v in (A[0], A[1], B[0], B[1], n1, n2)))
+    lo = np.minimum(ax, bx)
+    hi = np.maximum(ax, bx)
+
+    # Начальное приближение — пересечение прямой AB с границей
+    with np.errstate(divide='ignore', invalid='ignore'):
+        x = ax + (bx - ax) * np.abs(ay) / (np.abs(ay) + np.abs(by))
+    x = np.where(np.isfinite(x), x, 0.5 * (lo + hi))
+
+    for _ in range(max_iter):
+        dx1 = x - ax
+        dx2 = bx - x
+        d1 = np.hypot(dx1, ay)
+        d2 = np.hypot(dx2, by)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            gradient = n1 * np.where(d1 > 0, dx1 / d1, 0.0) - n2 * np.where(d2 > 0, dx2 / d2, 0.0)
+            curvature = n1 * ay ** 2 / d1 ** 3 + n2 * by ** 2 / d2 ** 3
+            newton = x - gradient / curvature
+
+        lo = np.where(gradient < 0, x, lo)
+        hi = np.where(gradient > 0, x, hi)
+        inside = np.isfinite(newton) & (newton >= lo) & (newton <= hi)
+        x_new = np.where(inside, newton, 0.5 * (lo + hi))
+
+        converged = (gradient == 0) | (np.abs(x_new - x) <= tol * (1 + np.abs(x)))
+        x = np.where(gradient == 0, x, x_new)
+        if converged.all():
+            break
+
+    return x
+
+def _solve_tridiagonal(lower, diag, upper, rhs):
+    """Решает трехдиагональную систему методом прогонки (алгоритм Томаса) за O(N)."""
+    n = len(diag)
+    c = np.zeros(n)
+    d = np.zeros(n)
+    c[0] = upper[0] / diag[0] if n > 1 else 0.0
+    d[0] = rhs[0] / diag[0]
+    for i in range(1, n):
+        denominator = diag[i] - lower[i - 1] * c[i - 1]
+        if i < n - 1:
+            c[i] = upper[i] / denominator
+        d[i] = (rhs[i] - lower[i - 1] * d[i - 1]) / denominator
+    solution = np.zeros(n)
+    solution[-1] = d[-1]
+    for i in range(n - 2, -1, -1):
+        solution[i] = d[i] - c[i] * solution[i + 1]
+    return solution
+
+
+def _multilayer_geometry(A, B, interfaces, indices):
+    """Проверяет слоистую среду и возвращает толщины пройденных слоев и показатели преломления."""
+    levels = np.concatenate(([A[1]], np.asarray(interfaces, dtype=float), [B[1]]))
+    heights = levels[:-1] - levels[1:]
+    indices = np.asarray(indices, dtype=float)
+    if len(indices) != len(levels) - 1:
+        raise ValueError("Число показателей преломления должно быть на единицу больше числа границ")
+    if np.any(heights <= 0):
+        raise ValueError("Границы должны убывать по y, A — лежать выше первой, B — ниже последней")
+    return heights, indices
+
+
+def multilayer_travel_time(xs, A, B, interfaces, indices):
+    """Оптическая длина ломаной A -> (x_i, y_i) -> B через горизонтальные границы."""
+    heights, indices = _multilayer_geometry(A, B, interfaces, indices)
+    nodes = np.concatenate(([A[0]], xs, [B[0]]))
+    return float(np.sum(indices * np.hypot(np.diff(nodes), heights)))
+
+
+def multilayer_crossing_points(A, B, interfaces, indices, tol=1e-13, max_iter=100):
+    """
+    Находит точки пересечения границ лучом A -> B в стопке горизонтальных слоев.
+
+    Время прохождения — выпуклая функция абсцисс x_1..x_N точек на границах, и каждое слагаемое
+    зависит только от двух соседних точек, поэтому гессиан трехдиагональный. Шаг Ньютона находится
+    прогонкой за O(N), при росте времени шаг дробится пополам.
+
+    Args:
+        A: Точка источника (x, y) выше первой границы.
+        B: Точка приемника (x, y) ниже последней границы.
+        interfaces: Ординаты границ y_1 > y_2 > ... > y_N.
+        indices: Показатели преломления N + 1 слоев сверху вниз (первый содержит A, последний — B).
+        tol: Относительная точность по x.
+        max_iter: Максимальное число итераций.
+
+    Returns:
+        Массив абсцисс точек пересечения границ.
+    """
+    heights, indices = _multilayer_geometry(A, B, interfaces, indices)
+    levels = np.asarray(interfaces, dtype=float)
+
+    # Начальное приближение — прямая AB
+    xs = A[0] + (B[0] - A[0]) * (A[1] - levels) / (A[1] - B[1])
+    time = multilayer_travel_time(xs, A, B, interfaces, indices)
+
+    for _ in range(max_iter):
+        nodes = np.concatenate(([A[0]], xs, [B[0]]))
+        dx = np.diff(nodes)
+        lengths = np.hypot(dx, heights)
+
+        sines = dx / lengths
+        gradient = indices[:-1] * sines[:-1] - indices[1:] * sines[1:]
+        curvature = indices * heights ** 2 / lengths ** 3
+        diag = curvature[:-1] + curvature[1:]
+        off = -curvature[1:-1]
+
+        step = _solve_tridiagonal(off, diag, off, gradient)
+
+        # Дробление шага, если время прохождения не уменьшилось
+        factor = 1.0
+        while True:
+            candidate = xs - factor * step
+            candidate_time = multilayer_travel_time(candidate, A, B, interfaces, indices)
+            if candidate_time <= time or factor < 1e-6:
+                break
+            factor /= 2
+
+        converged = np.max(np.abs(factor * step)) <= tol * (1 + np.max(np.abs(xs)))
+        xs, time = candidate, candidate_time
+        if converged:
+            break
+
+    return xs
+
+
+def multilayer_snell_residuals(xs, A, B, interfaces, indices):
+    """
+    Невязки закона Снеллиуса n_i*sin(θ_i) - n_(i+1)*sin(θ_(i+1)) на каждой границе.
+
+    Returns:
+        Кортеж: (массив n*sinθ для каждого слоя, массив невязок на границах)
+    """
+    heights, indices = _multilayer_geometry(A, B, interfaces, indices)
+    nodes = np.concatenate(([A[0]], xs, [B[0]]))
+    dx = np.diff(nodes)
+    invariants = indices * dx / np.hypot(dx, heights)
+    return invariants, invariants[:-1] - invariants[1:]
+
+def mirage_index(x, y, n0=1.0003, gradient=1e-4, ground=0.0):
+    """
+    Показатель преломления над нагретой поверхностью y = ground: растет с высотой (миражи).
+
+    Профиль привязан к поверхности, а не к сетке, поэтому значение в точке не зависит от области
+    решения; ниже поверхности n = n0.
+    """
+    return n0 + gradient * np.maximum(y - ground, 0.0) + 0 * x
+
+
+def grin_lens_index(x, y, n0=1.5, a=0.005):
+    """Градиентная линза: n = n0 * (1 - a * r^2 / 2), r — расстояние до оси y = 0."""
+    return n0 * (1 - 0.5 * a * y ** 2) + 0 * x
+
+
+class EikonalSolver:
+    """
+    Решение уравнения эйконала |∇T| = n(x, y) на прямоугольной сетке методом быстрого марша (O(N log N)).
+
+    Поле времен T от источника кэшируется, поэтому путь наименьшего времени к каждой новой
+    точке B находится только обратным ходом по -∇T.
+    """
+
+    def __init__(self, index, x_range=(-10, 10), y_range=(-10, 10), shape=(301, 301)):
+        """
+        Args:
+            index: Функция n(X, Y) от массивов сетки либо готовый массив формы shape (строки — y, столбцы — x).
+            x_range: Границы области по x.
+            y_range: Границы области по y.
+            shape: Число узлов (по y, по x).
+        """
+        self.x = np.linspace(x_range[0], x_range[1], shape[1])
+        self.y = np.linspace(y_range[0], y_range[1], shape[0])
+        self.hx = self.x[1] - self.x[0]
+        self.hy = self.y[1] - self.y[0]
+        X, Y = np.meshgrid(self.x, self.y)
+        self.n = np.asarray(index(X, Y) if callable(index) else index, dtype=float)
+        if self.n.shape != X.shape:
+            raise ValueError("Размер поля показателя преломления не совпадает с сеткой")
+        self._fields = {}  # Кэш: источник -> (T, dT/dy, dT/dx)
+
+    def _cell(self, point):
+        """Индексы левого нижнего узла ячейки и доли внутри нее."""
+        fx = np.clip((point[0] - self.x[0]) / self.hx, 0, len(self.x) - 1 - 1e-9)
+        fy = np.clip((point[1] - self.y[0]) / self.hy, 0, len(self.y) - 1 - 1e-9)
+        j, i = int(fx), int(fy)
+        return i, j, fy - i, fx - j
+
+    def _interpolate(self, grid, point):
+        """Билинейная интерполяция значения сетки в точке."""
+        i, j, ty, tx = self._cell(point)
+        return ((1 - ty) * ((1 - tx) * grid[i, j] + tx * grid[i, j + 1])
+                + ty * ((1 - tx) * grid[i + 1, j] + tx * grid[i + 1, j + 1]))
+
+    def travel_time_field(self, source):
+        """
+        Поле оптической длины пути T(x, y) от источника (кэшируется).
+
+        Args:
+            source: Точка источника (x, y) внутри области.
+
+        Returns:
+            Массив T формы сетки.
+        """
+        source = (float(source[0]), float(source[1]))
+        if source not in self._fields:
+            profiler.count('fermat.eikonal_cache_misses')
+            with profiler.timer('fermat.fast_marching'):
+                T = self._fast_marching(source)
+            self._fields[source] = (T,) + tuple(np.gradient(T, self.hy, self.hx))
+        else:
+            profiler.count('fermat.eikonal_cache_hits')
+        return self._fields[source][0]
+
+    def _fast_marching(self, source):
+        ny, nx = self.n.shape
+        hx, hy = self.hx, self.hy
+        n = self.n.ravel().tolist()
+        T = [math.inf] * (nx * ny)
+        known = [False] * (nx * ny)
+        heap = []
+
+        # Узлы ячейки с источником получают точное время по прямой
+        i0, j0, _, _ = self._cell(source)
+        for i in (i0, i0 + 1):
+            for j in (j0, j0 + 1):
+                k = i * nx + j
+                T[k] = n[k] * math.hypot(self.x[j] - source[0], self.y[i] - source[1])
+                heapq.heappush(heap, (T[k], k))
+
+        while heap:
+            t, k = heapq.heappop(heap)
+            if known[k]:
+                continue
+            known[k] = True
+            i, j = divmod(k, nx)
+            for ni, nj in ((i - 1, j), (i + 1, j), (i, j - 1), (i, j + 1)):
+                if not (0 <= ni < ny and 0 <= nj < nx):
+                    continue
+                m = ni * nx + nj
+                if known[m]:
+                    continue
+
+                # Наименьшие известные соседи по x и по y (схема против потока)
+                a = min(T[m - 1] if nj > 0 and known[m - 1] else math.inf,
+                        T[m + 1] if nj < nx - 1 and known[m + 1] else math.inf)
+                b = min(T[m - nx] if ni > 0 and known[m - nx] else math.inf,
+                        T[m + nx] if ni < ny - 1 and known[m + nx] else math.inf)
+                s = n[m]
+                candidate = min(a + s * hx, b + s * hy)
+                if a < math.inf and b < math.inf:
+                    # (T - a)^2 / hx^2 + (T - b)^2 / hy^2 = s^2
+                    wx, wy = 1 / hx ** 2, 1 / hy ** 2
+                    qa = wx + wy
+                    qb = -2 * (a * wx + b * wy)
+                    qc = a * a * wx + b * b * wy - s * s
+                    discriminant = qb * qb - 4 * qa * qc
+                    if discriminant >= 0:
+                        root = (-qb + math.sqrt(discriminant)) / (2 * qa)
+                        if root >= max(a, b):
+                            candidate = min(candidate, root)
+                if candidate < T[m]:
+                    T[m] = candidate
+                    heapq.heappush(heap, (candidate, m))
+
+        return np.array(T).reshape(ny, nx)
+
+    def travel_time(self, source, target):
+        """Оптическая длина пути наименьшего времени от source до target."""
+        return float(self._interpolate(self.travel_time_field(source), target))
+
+    def trace_ray(self, source, target, max_steps=100000):
+        """
+        Путь наименьшего времени от source до target обратным ходом по -∇T из target.
+
+        Returns:
+            Массив точек пути формы (K, 2) от source к target.
+        """
+        self.travel_time_field(source)
+        _, grad_y, grad_x = self._fields[(float(source[0]), float(source[1]))]
+        step = 0.5 * min(self.hx, self.hy)
+
+        point = np.array(target, dtype=float)
+        path = [point.copy()]
+        for _ in range(max_steps):
+            if math.hypot(point[0] - source[0], point[1] - source[1]) <= 2 * step:
+                break
+            # Шаг Рунге-Кутты 2-го порядка вдоль -∇T/|∇T|
+            direction = self._descent(grad_x, grad_y, point)
+            middle = point + 0.5 * step * direction
+            direction = self._descent(grad_x, grad_y, middle)
+            if not direction.any():
+                break  # Градиент вырожден — дальше спускаться некуда
+            point = point + step * direction
+            point[0] = min(max(point[0], self.x[0]), self.x[-1])
+            point[1] = min(max(point[1], self.y[0]), self.y[-1])
+            path.append(point.copy())
+        path.append(np.array(source, dtype=float))
+        return np.array(path[::-1])
+
+    def _descent(self, grad_x, grad_y, point):
+        gx = self._interpolate(grad_x, point)
+        gy = self._interpolate(grad_y, point)
+        norm = math.hypot(gx, gy)
+        return np.array([-gx, -gy]) / norm if norm > 0 else np.zeros(2)
+
+def ray_fan(A, n1, n2, num_rays=10000, length=20.0, max_angle=89.0):
+    """
+    Веер лучей из A (n1, y > 0), преломленных на границе y = 0 по закону Снеллиуса (векторизовано).
+
+    Если n1 > n2 и sinθ2 = n1/n2 * sinθ1 > 1, происходит полное внутреннее отражение:
+    луч отражается обратно в первую среду.
+
+    Args:
+        A: Источник (x, y), y > 0.
+        n1: Показатель преломления среды с источником.
+        n2: Показатель преломления среды под границей.
+        num_rays: Число лучей.
+        length: Длина луча после границы.
+        max_angle: Наибольший угол падения (от нормали), градусы.
+
+    Returns:
+        Словарь массивов: 'angles' (углы падения), 'hits' (точки на границе, (N, 2)),
+        'ends' (концы лучей, (N, 2)), 'tir' (маска полного внутреннего отражения),
+        'first_length' (длины до границы), 'second_index' (показатель среды после границы).
+    """
+    if A[1] <= 0:
+        raise ValueError("Источник веера должен лежать выше границы y=0")
+    angles = np.radians(np.linspace(-max_angle, max_angle, num_rays))
+    sin1 = np.sin(angles)
+    cos1 = np.cos(angles)
+    hits = np.column_stack((A[0] + A[1] * sin1 / cos1, np.zeros(num_rays)))
+
+    sin2 = n1 / n2 * sin1
+    tir = np.abs(sin2) > 1
+    cos2 = np.sqrt(np.clip(1 - sin2 ** 2, 0, None))
+    # Преломленный луч идет вниз, отраженный — вверх под углом падения
+    directions = np.where(tir[:, None], np.column_stack((sin1, cos1)), np.column_stack((sin2, -cos2)))
+
+    return {
+        'angles': angles,
+        'hits': hits,
+        'ends': hits + length * directions,
+        'tir': tir,
+        'first_length': A[1] / cos1,
+        'second_index': np.where(tir, n1, n2),
+        'length': length,
+    }
+
+
+def fan_wavefronts(A, fan, n1, levels):
+    """
+    Изохроны веера: точки лучей с одинаковой оптической длиной пути.
+
+    Args:
+        A: Источник веера.
+        fan: Результат ray_fan.
+        n1: Показатель преломления среды с источником.
+        levels: Значения оптической длины пути.
+
+    Returns:
+        Список полилиний (массивов (K, 2)); фронт разрывается там, где лучи уже кончились
+        или соседние лучи идут по разным ветвям (преломление / отражение).
+    """
+    source = np.asarray(A, dtype=float)
+    hits, ends, tir = fan['hits'], fan['ends'], fan['tir']
+    first_time = n1 * fan['first_length']
+    directions = (ends - hits) / fan['length']
+
+    polylines = []
+    for level in levels:
+        on_first = level <= first_time
+        distance_first = np.minimum(level, first_time) / n1
+        distance_second = (level - first_time) / fan['second_index']
+        points = np.where(
+            on_first[:, None],
+            source + distance_first[:, None] * (hits - source) / fan['first_length'][:, None],
+            hits + distance_second[:, None] * directions)
+        valid = on_first | (distance_second <= fan['length'])
+
+        # Разбиение на непрерывные участки
+        branch = np.where(on_first, 0, np.where(tir, 1, 2))
+        breaks = ~valid[:-1] | ~valid[1:] | ((branch[:-1] != branch[1:]) & (branch[:-1] != 0) & (branch[1:] != 0))
+        starts = np.concatenate(([0], np.nonzero(breaks)[0] + 1))
+        stops = np.concatenate((np.nonzero(breaks)[0] + 1, [len(points)]))
+        for start, stop in zip(starts, stops):
+            segment = points[start:stop][valid[start:stop]]
+            if len(segment) > 1:
+                polylines.append(segment)
+    return polylines
@@ -0,0 +1,83 @@
+"""
+Проверка времени импорта ядра.
+
+Каждый модуль импортируется в отдельном чистом интерпретаторе; время сравнивается с бюджетом,
+а в sys.modules не должно оказаться PyQt5 и matplotlib.
+
+    python -m mkm.importtime [--budget 0.5] [--repeat 5]
+"""
+import argparse
+import json
+import pkgutil
+import subprocess
+import sys
+
+import mkm
+
+# Все модули пакета: новый модуль ядра попадает под проверку без правки списка
+CORE_MODULES = sorted(f'mkm.{info.name}' for info in pkgutil.iter_modules(mkm.__path__))
+GUI_PACKAGES = ('PyQt5', 'matplotlib')
+DEFAULT_BUDGET = 0.5  # с на модуль, включая импорт numpy
+
+_PROBE = """
+import json, sys, time
+started = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - started
+gui = sorted({{name.split('.')[0] for name in sys.modules}} & set({gui!r}))
+print(json.dumps({{'seconds': elapsed, 'gui': gui}}))
+"""
+
+
+def measure_import(module, repeat=5):
+    """
+    Время импорта модуля в чистом интерпретаторе (минимум из repeat запусков).
+
+    Returns:
+        Словарь: 'seconds' (время, с), 'gui' (загруженные GUI-пакеты).
+    """
+    best = None
+    for _ in range(repeat):
+        output = subprocess.run([sys.executable, '-c', _PROBE.format(module=module, gui=GUI_PACKAGES)],
+                                check=True, capture_output=True, text=True).stdout
+        result = json.loads(output)
+        if best is None or result['seconds'] < best['seconds']:
+            best = result
+    return best
+
+
+def check_import_budget(modules=CORE_MODULES, budget=DEFAULT_BUDGET, repeat=5):
+    """
+    Проверяет бюджет времени импорта.
+
+    Returns:
+        Кортеж: (словарь результатов по модулям, список нарушений)
+    """
+    results = {}
+    failures = []
+    for module in modules:
+        result = measure_import(module, repeat)
+        results[module] = result
+        if result['seconds'] > budget:
+            failures.append(f"{module}: {result['seconds'] * 1000:.0f} мс > {budget * 1000:.0f} мс")
+        if result['gui']:
+            failures.append(f"{module}: загружены GUI-пакеты {', '.join(result['gui'])}")
+    return results, failures
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--budget', type=float, default=DEFAULT_BUDGET, help='бюджет на модуль, с')
+    parser.add_argument('--repeat', type=int, default=5, help='число запусков на модуль')
+    args = parser.parse_args(argv)
+
+    results, failures = check_import_budget(budget=args.budget, repeat=args.repeat)
+    for module, result in results.items():
+        print(f"{module:20s} {result['seconds'] * 1000:8.1f} мс")
+    for failure in failures:
+        print(f"ОШИБКА: {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,239 @@
+"""
+Уровень детализации (LOD) для графиков с большим числом точек.
+
+Вместо всех отсчетов в matplotlib передается прореженная копия, сохраняющая форму кривой: для
+каждой корзины отсчетов остаются первая и последняя точки и экстремумы по обеим координатам
+(min/max), либо точки по алгоритму LTTB. Число корзин равно ширине области осей в пикселях, так
+что на экране прореживание не заметно. При изменении пределов осей (масштаб и сдвиг через
+NavigationToolbar) видимый участок заново прореживается из полных данных — при приближении
+появляются все детали. Полные данные можно держать в np.memmap (см. mkm.export).
+
+Модуль не импортирует matplotlib: LodAxes работает с уже созданным объектом осей.
+"""
+import math
+
+import numpy as np
+
+
+def _bucket_extrema(values, size):
+    """Индексы минимума и максимума в каждой корзине по size отсчетов (последняя может быть короче)."""
+    full = len(values) // size * size
+    blocks = values[:full].reshape(-1, size)
+    offsets = np.arange(0, full, size)
+    indices = [offsets + blocks.argmin(axis=1), offsets + blocks.argmax(axis=1)]
+    if full < len(values):
+        tail = values[full:]
+        indices.append(np.array([full + tail.argmin(), full + tail.argmax()]))
+    return np.concatenate(indices)
+
+
+def minmax_indices(x, y, buckets):
+    """
+    Индексы отсчетов, сохраняющих форму кривой при прореживании до buckets корзин.
+
+    В каждой корзине берутся первая и последняя точки и минимумы/максимумы x и y, поэтому
+    сохраняются пики и для параметрических кривых (например, фазового портрета).
+    """
+    n = len(y)
+    if n <= 6 * buckets:
+        return np.arange(n)
+    size = math.ceil(n / buckets)
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    edges = np.arange(0, n, size)
+    indices = np.concatenate((edges, np.minimum(edges + size - 1, n - 1),
+                              _bucket_extrema(x, size), _bucket_extrema(y, size)))
+    return np.unique(indices)
+
+
+def lttb_indices(x, y, threshold):
+    """
+    Индексы точек по алгоритму Largest-Triangle-Three-Buckets (Steinarsson, 2013).
+
+    Из каждой корзины выбирается точка, образующая наибольший треугольник с точкой, выбранной
+    в предыдущей корзине, и средней точкой следующей. Медленнее min/max, но дает ровно threshold точек.
+    """
+    n = len(y)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    edges = np.linspace(1, n - 1, threshold - 1).astype(int)
+    selected = np.empty(threshold, dtype=int)
+    selected[0], selected[-1] = 0, n - 1
+    previous = 0
+    for i in range(threshold - 2):
+        start, stop = edges[i], edges[i + 1]
+        next_stop = edges[i + 2] if i + 2 < len(edges) else n
+        mean_x = x[stop:next_stop].mean()
+        mean_y = y[stop:next_stop].mean()
+        area = np.abs((x[previous] - mean_x) * (y[start:stop] - y[previous])
+                      - (x[previous] - x[start:stop]) * (mean_y - y[previous]))
+        previous = start + int(area.argmax())
+        selected[i + 1] = previous
+    return selected
+
+
+def visible_indices(x, y, xlim, ylim, monotonic):
+    """
+    Индексы отсчетов внутри пределов осей вместе с соседями (чтобы линия доходила до края).
+
+    Для монотонного x используется двоичный поиск, для остальных — маска по обеим координатам.
+    """
+    n = len(x)
+    if monotonic:
+        start = max(np.searchsorted(x, min(xlim), side='left') - 1, 0)
+        stop = min(np.searchsorted(x, max(xlim), side='right') + 1, n)
+        return np.arange(start, stop)
+    x = np.asarray(x)
+    y = np.asarray(y)
+    inside = (x >= min(xlim)) & (x <= max(xlim)) & (y >= min(ylim)) & (y <= max(ylim))
+    near = inside.copy()
+    near[:-1] |= inside[1:]
+    near[1:] |= inside[:-1]
+    return np.flatnonzero(near)
+
+
+def thin_grid(coordinates, limits, pixels, spacing):
+    """
+    Шаг прореживания одной оси сетки: индексы узлов в пределах limits не чаще одного на spacing пикселей.
+
+    Args:
+        coordinates: Координаты узлов вдоль оси (возрастающие).
+        limits: Видимые пределы оси.
+        pixels: Длина оси на экране, пикс.
+        spacing: Минимальное расстояние между стрелками, пикс.
+    """
+    low, high = min(limits), max(limits)
+    visible = np.flatnonzero((coordinates >= low) & (coordinates <= high))
+    if len(visible) == 0:
+        return visible
+    allowed = max(int(pixels / spacing), 1)
+    step = max(math.ceil(len(visible) / allowed), 1)
+    return visible[::step]
+
+
+class LodAxes:
+    """
+    Обертка над осями matplotlib, прореживающая линии и поля стрелок под разрешение экрана.
+
+    Полные данные хранятся в обертке. При изменении пределов осей обновление откладывается до
+    следующего прохода цикла событий (таймер холста): внутри обработчика xlim_changed matplotlib
+    может еще пересчитывать автомасштаб. Видимый участок прореживается заново, и холст
+    перерисовывается только если выборка изменилась. После ax.clear() обертку нужно очистить
+    (clear()), иначе она будет обновлять удаленные линии.
+
+    Args:
+        ax: Оси matplotlib.
+        method: 'minmax' или 'lttb'.
+        points_per_pixel: Число корзин на пиксель ширины осей.
+        arrow_spacing: Минимальное расстояние между стрелками quiver, пикс.
+    """
+
+    def __init__(self, ax, method='minmax', points_per_pixel=1.0, arrow_spacing=18):
+        self.ax = ax
+        self.method = method
+        self.points_per_pixel = points_per_pixel
+        self.arrow_spacing = arrow_spacing
+        self.series = []  # [линия, x, y, монотонность x, ключ текущей выборки]
+        self.fields = []  # [артист quiver, X, Y, U, V, параметры, ключ текущей выборки]
+        self._callbacks = None
+        self._timer = None
+
+    def clear(self):
+        self.series = []
+        self.fields = []
+
+    def _connect(self):
+        # ax.clear() заменяет реестр обработчиков, поэтому подписка проверяется при каждом добавлении
+        if self._callbacks is not self.ax.callbacks:
+            self._callbacks = self.ax.callbacks
+            self._callbacks.connect('xlim_changed', self._limits_changed)
+            self._callbacks.connect('ylim_changed', self._limits_changed)
+
+    def _buckets(self):
+        return max(int(self.ax.bbox.width * self.points_per_pixel), 100)
+
+    def _reduce(self, x, y, monotonic, indices):
+        buckets = self._buckets()
+        key = (len(indices), int(indices[0]), int(indices[-1]), buckets) if len(indices) else (0, buckets)
+        if len(indices) == len(x):
+            sub_x, sub_y = x, y
+        elif monotonic:
+            sub_x, sub_y = x[indices[0]:indices[-1] + 1], y[indices[0]:indices[-1] + 1]
+        else:
+            sub_x, sub_y = np.asarray(x)[indices], np.asarray(y)[indices]
+
+        if self.method == 'lttb':
+            keep = lttb_indices(sub_x, sub_y, buckets)
+        else:
+            keep = minmax_indices(sub_x, sub_y, buckets)
+        sub_x, sub_y = np.asarray(sub_x, dtype=float)[keep], np.asarray(sub_y, dtype=float)[keep]
+        if not monotonic and len(keep) > 1:
+            # Видимые участки кривой могут идти с разрывами — разрывы отмечаются NaN, чтобы не соединять их
+            runs = np.concatenate(([0], np.cumsum(np.diff(indices) > 1)))[keep]
+            breaks = np.flatnonzero(np.diff(runs)) + 1
+            sub_x, sub_y = np.insert(sub_x, breaks, np.nan), np.insert(sub_y, breaks, np.nan)
+        return sub_x, sub_y, key
+
+    def plot(self, x, y, *args, monotonic=None, **kwargs):
+        """
+        Как ax.plot(x, y, ...), но в оси передается прореженная копия данных.
+
+        monotonic=True избавляет от проверки неубывания x (например, для рядов по времени).
+        """
+        x = x if isinstance(x, np.ndarray) else np.asarray(x)
+        y = y if isinstance(y, np.ndarray) else np.asarray(y)
+        if monotonic is None:
+            monotonic = len(x) < 2 or bool(np.all(np.diff(x) >= 0))
+        sub_x, sub_y, key = self._reduce(x, y, monotonic, np.arange(len(x)))
+        line, = self.ax.plot(sub_x, sub_y, *args, **kwargs)
+        self.series.append([line, x, y, monotonic, key])
+        self._connect()
+        return line
+
+    def quiver(self, X, Y, U, V, **kwargs):
+        """Как ax.quiver(X, Y, U, V, ...) для регулярной сетки; стрелки прореживаются до плотности экрана."""
+        field = [None, np.asarray(X), np.asarray(Y), np.asarray(U), np.asarray(V), kwargs, None]
+        self._draw_field(field, (X[0, 0], X[0, -1]), (Y[0, 0], Y[-1, 0]))
+        self.fields.append(field)
+        self._connect()
+        return field[0]
+
+    def _draw_field(self, field, xlim, ylim):
+        """Перестраивает quiver для пределов осей; False, если выборка узлов не изменилась."""
+        artist, X, Y, U, V, kwargs, key = field
+        columns = thin_grid(X[0], xlim, self.ax.bbox.width, self.arrow_spacing)
+        rows = thin_grid(Y[:, 0], ylim, self.ax.bbox.height, self.arrow_spacing)
+        new_key = (rows.tobytes(), columns.tobytes())
+        if new_key == key:
+            return False
+        if artist is not None and artist.axes is not None:
+            artist.remove()
+        mesh = np.ix_(rows, columns)
+        field[0] = self.ax.quiver(X[mesh], Y[mesh], U[mesh], V[mesh], **kwargs)
+        field[6] = new_key
+        return True
+
+    def _limits_changed(self, ax):
+        if self._timer is None:
+            self._timer = ax.figure.canvas.new_timer(interval=0)
+            self._timer.single_shot = True
+            self._timer.add_callback(self.refresh)
+        self._timer.start()
+
+    def refresh(self):
+        """Прореживает данные заново для текущих пределов осей и перерисовывает холст при изменениях."""
+        xlim, ylim = self.ax.get_xlim(), self.ax.get_ylim()
+        changed = False
+        for series in self.series:
+            line, x, y, monotonic, key = series
+            sub_x, sub_y, new_key = self._reduce(x, y, monotonic, visible_indices(x, y, xlim, ylim, monotonic))
+            if new_key != key:
+                line.set_data(sub_x, sub_y)
+                series[4] = new_key
+                changed = True
+        for field in self.fields:
+            changed |= self._draw_field(field, xlim, ylim)
+        if changed:
+            self.ax.figure.canvas.draw_idle()
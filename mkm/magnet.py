@@ -0,0 +1,238 @@
+import numpy as np
+
+from mkm.profiling import profiler
+
+
+class HorseshoeMagnet:
+    def __init__(self, a, b, d, M, Na=20, Nb=20):
+        self.a = a
+        self.b = b 
+        self.d = d
+        self.M = M
+        self.Na = Na
+        self.Nb = Nb
+        self.ax = a / Na
+        self.ay = b / Nb
+        self.c = M / (4 * np.pi) * self.ax * self.ay
+
+    def H_ext(self, xm, ym, zm):
+        Hx, Hy, Hz = 0.0, 0.0, 0.0
+
+        for ip in range(1, 3):
+            for ia in range(1, self.Na + 1):
+                x = self.ax / 2 + (ia - 1) * self.ax + (ip - 1) * self.d
+                for ib in range(1, self.Nb + 1):
+                    y = self.ay / 2 + (ib - 1) * self.ay
+                    r2 = zm**2 + (x - xm)**2 + (y - ym)**2
+                    r = np.sqrt(r2)
+                    r3 = r * r2
+                    k = 3 - 2 * ip
+
+                    Hx += self.c * (xm - x) * k / r3
+                    Hy += self.c * (ym - y) * k / r3
+                    Hz += self.c * zm * k / r3
+
+        return Hx, Hy, Hz
+
+    def sources(self):
+        """
+        Точечные источники модели: координаты (2*Na*Nb, 3) и знаки зарядов (+1 — северный полюс).
+
+        Полюса — прямоугольники a x b в плоскости z = 0: северный при 0 <= x <= a, южный при
+        d <= x <= d + a, оба при 0 <= y <= b. Порядок источников тот же, что в H_ext.
+        """
+        ip, ia, ib = np.meshgrid(np.arange(1, 3), np.arange(1, self.Na + 1), np.arange(1, self.Nb + 1), indexing='ij')
+        x = self.ax / 2 + (ia - 1) * self.ax + (ip - 1) * self.d
+        y = self.ay / 2 + (ib - 1) * self.ay
+        positions = np.column_stack((x.ravel(), y.ravel(), np.zeros(x.size)))
+        return positions, (3 - 2 * ip).ravel().astype(float)
+
+    def field_at(self, points, jacobian=False, softening=0.0, chunk_size=512):
+        """
+        Поле H_ext сразу во многих точках (векторизовано по точкам и источникам).
+
+        Args:
+            points: Массив точек формы (N, 3).
+            jacobian: Вернуть также матрицу производных dH_i/dx_j формы (N, 3, 3).
+            softening: Радиус сглаживания, м: r^2 заменяется на r^2 + softening^2, чтобы поле
+                оставалось конечным в самих источниках (нужно для узлов решетки на полюсах).
+            chunk_size: Число точек, обрабатываемых за раз (блок точки x источники помещается в кэш).
+
+        Returns:
+            Массив H формы (N, 3) или кортеж (H, J).
+        """
+        points = np.atleast_2d(np.asarray(points, dtype=float))
+        profiler.count('magnet.field_evaluations', len(points))
+        positions, signs = self.sources()
+        weights = self.c * signs
+        H = np.empty((len(points), 3))
+        J = np.empty((len(points), 3, 3)) if jacobian else None
+        for start in range(0, len(points), chunk_size):
+            block = slice(start, start + chunk_size)
+            r = [points[block, k, None] - positions[None, :, k] for k in range(3)]  # (n, источники) на компоненту
+            r2 = r[0] * r[0] + r[1] * r[1] + r[2] * r[2] + softening ** 2
+            w = weights / (r2 * np.sqrt(r2))
+            for i in range(3):
+                H[block, i] = np.einsum('ns,ns->n', w, r[i])
+            if jacobian:
+                # d/dx_j (r_i / r^3) = delta_ij / r^3 - 3 r_i r_j / r^5
+                trace = w.sum(axis=1)
+                u = 3 * w / r2
+                for i in range(3):
+                    ur = u * r[i]
+                    for j in range(i, 3):
+                        value = -np.einsum('ns,ns->n', ur, r[j])
+                        if i == j:
+                            value += trace
+                        J[block, i, j] = J[block, j, i] = value
+        return (H, J) if jacobian else H
+
+    @profiler.timed('magnet.field_grid')
+    def field_grid(self, plane='Y=0', x_range=(-0.5, 0.7), y_range=(-0.5, 0.5), z_range=(-0.5, 0.5), num_points=30):
+        """
+        Вычисляет поле на сетке в плоскости Y=0 или Z=0 (без рисования).
+
+        Returns:
+            Кортеж: (сетка первой координаты, сетка второй координаты, Hx, Hy, Hz) —
+            (X, Z, ...) для плоскости Y=0 и (X, Y, ...) для плоскости Z=0.
+        """
+        blocks = list(self.field_rows(plane, x_range, y_range, z_range, num_points, rows_per_chunk=num_points))
+        return tuple(np.concatenate(columns) for columns in zip(*blocks))
+
+    def field_rows(self, plane='Y=0', x_range=(-0.5, 0.7), y_range=(-0.5, 0.5), z_range=(-0.5, 0.5), num_points=30,
+                   rows_per_chunk=1):
+        """
+        Вычисляет ту же сетку, что field_grid, блоками по rows_per_chunk строк.
+
+        Нужно для потоковой записи больших сеток: в памяти одновременно находится только один блок.
+
+        Yields:
+            Кортежи (U, V, Hx, Hy, Hz) формы (число строк блока, num_points).
+        """
+        x = np.linspace(x_range[0], x_range[1], num_points)
+        if plane == 'Y=0':
+            v = np.linspace(z_range[0], z_range[1], num_points)
+            axes = (0, 2)
+        elif plane == 'Z=0':
+            v = np.linspace(y_range[0], y_range[1], num_points)
+            axes = (0, 1)
+        else:
+            raise ValueError(f"Неизвестная плоскость: {plane}")
+
+        for start in range(0, num_points, rows_per_chunk):
+            U, V = np.meshgrid(x, v[start:start + rows_per_chunk])
+            points = np.zeros((U.size, 3))
+            points[:, axes[0]], points[:, axes[1]] = U.ravel(), V.ravel()
+            Hx, Hy, Hz = self.field_at(points).T.reshape(3, *U.shape)
+            yield U, V, Hx, Hy, Hz
+
+    def plot_field(self, plane='Y=0', x_range=(-0.5, 0.7), y_range=(-0.5, 0.5), z_range=(-0.5, 0.5), num_points=30,
+                   grid=None, lod=None):
+        """
+        Рисует поле в плоскости plane.
+
+        grid — готовый результат field_grid (например, из кэша); lod — mkm.lod.LodAxes для self.axes,
+        прореживающий стрелки до плотности экрана.
+        """
+        # matplotlib нужен только для рисования — импорт откладывается до первого вызова
+        from matplotlib.patches import Rectangle, Arc
+
+        if plane == 'Y=0':
+            if grid is None:
+                grid = self.field_grid(plane, x_range, y_range, z_range, num_points)
+            X, Z, Hx, Hy, Hz = grid
+
+            H_magnitude = np.sqrt(Hx**2 + Hz**2)
+            Hx_norm, Hz_norm = Hx / H_magnitude, Hz / H_magnitude
+
+            self.axes.clear()
+            if lod is not None:
+                lod.clear()
+
+            # Горизонтальное расположение магнита (вид сверху)
+            self.axes.add_patch(Rectangle((0, -self.b/2), self.a, self.b,
+                                    color='blue', alpha=0.4, label='Северный полюс'))
+            self.axes.add_patch(Rectangle((self.d, -self.b/2), self.a, self.b,
+                                    color='red', alpha=0.4, label='Южный полюс'))
+            self.axes.add_patch(Rectangle((self.a, -self.b/2), self.d-self.a, self.b,
+                                    color='gray', alpha=0.3, label='Соединение'))
+
+            quiver = lod.quiver if lod is not None else self.axes.quiver
+            quiver(X, Z, Hx_norm, Hz_norm, angles='xy', scale_units='xy', scale=15, pivot='mid')
+            self.axes.set_xlabel("x, м")
+            self.axes.set_ylabel("z, м")
+            self.axes.set_title(f"Магнитное поле в плоскости Y=0\nРазмеры: a={self.a}, b={self.b}, d={self.d}")
+            self.axes.set_xlim(x_range)
+            self.axes.set_ylim(z_range)
+            self.axes.set_aspect('equal')
+            self.axes.legend()
+            with profiler.timer('draw.frame'):
+                self.canvas.draw()
+
+        elif plane == 'Z=0':
+            if grid is None:
+                grid = self.field_grid(plane, x_range, y_range, z_range, num_points)
+            X, Y, Hx, Hy, Hz = grid
+
+            H_magnitude = np.sqrt(Hx**2 + Hy**2)
+            Hx_norm, Hy_norm = Hx / (H_magnitude + 1e-10), Hy / (H_magnitude + 1e-10)
+            
+            self.axes.clear()
+            if lod is not None:
+                lod.clear()
+
+            # Корректное отображение подковы (вид сбоку)
+            pole_width = self.a
+            pole_height = self.b
+            gap = self.d - pole_width  # Расстояние между ножками
+            
+            # Левая ножка (северный полюс - синий)
+            self.axes.add_patch(Rectangle(
+                (0, 0), 
+                pole_width, 
+                pole_height, 
+                color='blue', alpha=0.4, label='Северный полюс'
+            ))
+            
+            # Правая ножка (южный полюс - красный)
+            self.axes.add_patch(Rectangle(
+                (self.d, 0), 
+                pole_width, 
+                pole_height, 
+                color='red', alpha=0.4, label='Южный полюс'
+            ))
+            
+            # Дуга подковы (серый)
+            arc_center_x = self.d / 2
+            arc_height = pole_height * 1.2
+            self.axes.add_patch(Arc(
+                (arc_center_x, pole_height), 
+                width=self.d + pole_width,  # Ширина дуги
+                height=arc_height, 
+                theta1=180, theta2=0, 
+                color='gray', linewidth=4, alpha=0.4
+            ))
+
+            # Векторное поле
+            quiver = lod.quiver if lod is not None else self.axes.quiver
+            quiver(
+                X, Y, Hx_norm, Hy_norm, 
+                angles='xy', 
+                scale_units='xy', 
+                scale=25,  # Уменьшенный масштаб для лучшей видимости
+                pivot='mid', 
+                width=0.003,
+                headlength=4,
+                headaxislength=3
+            )
+            
+            self.axes.set_xlabel("x, м")
+            self.axes.set_ylabel("y, м")
+            self.axes.set_title(f"Магнитное поле в плоскости Z=0 (вид сбоку)\nРазмеры: a={self.a}, b={self.b}, d={self.d}")
+            self.axes.set_xlim(x_range)
+            self.axes.set_ylim([y_range[0], y_range[1] + arc_height])  # Учет высоты дуги
+            self.axes.grid(True)
+            self.axes.set_aspect('equal')
+            self.axes.legend(loc='upper right')
+            with profiler.timer('draw.frame'):
+                self.canvas.draw()
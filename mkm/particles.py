@@ -0,0 +1,304 @@
+"""
+Движение множества частиц в поле подковообразного магнита.
+
+Поддерживаются два вида частиц:
+    'charge' — заряженные пробные частицы, сила Лоренца q v x B (B = mu0 H). Интегратор Бориса:
+        скорость поворачивается в магнитном поле без изменения модуля, энергия сохраняется при любом шаге;
+    'dipole' — мелкие магнитомягкие частицы с наведенным моментом, ускорение kappa * grad |H|^2.
+        Схема «чехарда» (leapfrog) с точным учетом вязкого трения на шаге.
+
+Все частицы продвигаются вместе массивными операциями NumPy. Поле берется из FieldLattice
+(решетка, посчитанная заранее, с трилинейной интерполяцией — основной режим) или из DirectField
+(прямое суммирование по источникам HorseshoeMagnet.field_at — эталон для проверки решетки).
+
+Полюса (прямоугольники в плоскости z = 0, см. HorseshoeMagnet.sources) поглощают частицы: пересечение
+плоскости полюса на шаге фиксируется вместе с точкой и временем захвата. Частицы, вышедшие за
+границы области, считаются улетевшими. Траектории выдаются блоками (run), поэтому их можно сразу
+записывать на диск (mkm.export.export_particles).
+
+    lattice = FieldLattice(magnet)
+    tracker = ParticleTracker(lattice, positions, velocities, mode='dipole',
+                              coefficient=induced_dipole_coefficient(1000, 7870), drag=50,
+                              acceleration=(0, 0, -9.81), dt=1e-4)
+    for t, positions, status in tracker.run(20000):
+        ...
+    tracker.statistics()
+"""
+import numpy as np
+
+from mkm.profiling import profiler
+
+MU0 = 4e-7 * np.pi  # Магнитная постоянная, Гн/м
+
+# Состояния частиц
+ACTIVE, NORTH, SOUTH, ESCAPED = 0, 1, 2, 3
+OUTCOMES = {ACTIVE: 'active', NORTH: 'north', SOUTH: 'south', ESCAPED: 'escaped'}
+
+
+def induced_dipole_coefficient(susceptibility, density):
+    """
+    Коэффициент kappa в ускорении a = kappa * grad |H|^2 для малого шарика из линейного магнетика.
+
+    Момент шарика m = chi_eff V H, chi_eff = 3 chi / (chi + 3) с учетом размагничивания; сила
+    F = mu0 (m . grad) H = mu0 chi_eff V grad |H|^2 / 2 (вне токов), на единицу массы V / m = 1 / density.
+
+    Args:
+        susceptibility: Магнитная восприимчивость материала chi.
+        density: Плотность материала, кг/м^3.
+    """
+    chi_eff = 3 * susceptibility / (susceptibility + 3)
+    return MU0 * chi_eff / (2 * density)
+
+
+def default_bounds(magnet, margin=0.1):
+    """Область вокруг полюсов магнита с запасом margin, м: ((x_min, x_max), (y_min, y_max), (z_min, z_max))."""
+    return ((-margin, magnet.d + magnet.a + margin), (-margin, magnet.b + margin), (-margin, 2 * margin))
+
+
+class DirectField:
+    """
+    Поле прямым суммированием по источникам магнита: точно, но медленно для тысяч частиц на каждом шаге.
+
+    Args:
+        magnet: HorseshoeMagnet.
+        bounds: Область моделирования (по умолчанию default_bounds).
+        softening: Радиус сглаживания источников, м (см. HorseshoeMagnet.field_at).
+    """
+
+    def __init__(self, magnet, bounds=None, softening=0.0):
+        self.magnet = magnet
+        self.bounds = bounds or default_bounds(magnet)
+        self.softening = softening
+
+    def __call__(self, points, gradient=False):
+        """H в точках (N, 3); при gradient=True — кортеж (H, grad |H|^2)."""
+        if not gradient:
+            return self.magnet.field_at(points, softening=self.softening)
+        H, J = self.magnet.field_at(points, jacobian=True, softening=self.softening)
+        return H, 2 * np.einsum('ni,nij->nj', H, J)
+
+
+class FieldLattice:
+    """
+    Поле H и grad |H|^2 на регулярной решетке с трилинейной интерполяцией.
+
+    Узлы считаются один раз через HorseshoeMagnet.field_at (вместе с производными), после чего значение в
+    любой точке — взвешенная сумма восьми соседних узлов. Поле точечных источников сингулярно на самих
+    полюсах, поэтому в узлах источники сглаживаются на полшага их сетки; точность у полюсов определяется
+    шагом решетки. За пределами области значения берутся с ближайшей грани.
+
+    Args:
+        magnet: HorseshoeMagnet.
+        bounds: Область решетки (по умолчанию default_bounds).
+        spacing: Желаемый шаг решетки, м (по каждой оси округляется до целого числа ячеек).
+    """
+
+    def __init__(self, magnet, bounds=None, spacing=0.01):
+        self.magnet = magnet
+        self.bounds = bounds or default_bounds(magnet)
+        low = np.array([axis[0] for axis in self.bounds], dtype=float)
+        high = np.array([axis[1] for axis in self.bounds], dtype=float)
+        self.shape = tuple(int(n) for n in np.maximum(np.ceil((high - low) / spacing), 1) + 1)
+        self.origin = low
+        self.spacing = (high - low) / (np.array(self.shape) - 1)
+
+        axes = [np.linspace(low[k], high[k], self.shape[k]) for k in range(3)]
+        nodes = np.stack(np.meshgrid(*axes, indexing='ij'), axis=-1).reshape(-1, 3)
+        softening = 0.5 * min(magnet.ax, magnet.ay)
+        with profiler.timer('particles.lattice_build'):
+            H, gradient = DirectField(magnet, self.bounds, softening)(nodes, gradient=True)
+        self.table = np.hstack((H, gradient))  # (узлы, 6): Hx, Hy, Hz, d|H|^2/dx, d|H|^2/dy, d|H|^2/dz
+        nx, ny, nz = self.shape
+        self._corners = [(dx * ny + dy) * nz + dz for dx in (0, 1) for dy in (0, 1) for dz in (0, 1)]
+
+    def __call__(self, points, gradient=False):
+        """H в точках (N, 3); при gradient=True — кортеж (H, grad |H|^2)."""
+        profiler.count('particles.lattice_lookups', len(points))
+        u = (points - self.origin) / self.spacing
+        index = np.clip(np.floor(u).astype(np.intp), 0, np.array(self.shape) - 2)
+        fraction = np.clip(u - index, 0.0, 1.0)
+        base = (index[:, 0] * self.shape[1] + index[:, 1]) * self.shape[2] + index[:, 2]
+        columns = 6 if gradient else 3
+        weights_x = (1 - fraction[:, 0], fraction[:, 0])
+        weights_y = (1 - fraction[:, 1], fraction[:, 1])
+        weights_z = (1 - fraction[:, 2], fraction[:, 2])
+
+        result = np.zeros((len(points), columns))
+        corner = 0
+        for dx in (0, 1):
+            for dy in (0, 1):
+                wxy = weights_x[dx] * weights_y[dy]
+                for dz in (0, 1):
+                    result += (wxy * weights_z[dz])[:, None] * self.table[base + self._corners[corner], :columns]
+                    corner += 1
+        if gradient:
+            return result[:, :3], result[:, 3:]
+        return result
+
+
+class ParticleTracker:
+    """
+    Совместное интегрирование движения множества частиц в поле магнита.
+
+    Положения относятся к целым шагам, скорости — к полушагам (схема «чехарда»); начальная скорость
+    переносится на -dt/2 тем же оператором, поэтому схема второго порядка с первого шага. Частица,
+    поглощенная полюсом или вышедшая из области, исключается из вычислений, а ее положение в выдаче
+    остается в точке остановки.
+
+    Args:
+        field: FieldLattice или DirectField.
+        positions: Начальные положения, массив (N, 3), м.
+        velocities: Начальные скорости, массив (N, 3), м/с.
+        mode: 'charge' (сила Лоренца, интегратор Бориса) или 'dipole' (наведенный момент).
+        charge_to_mass: Удельный заряд q/m, Кл/кг, для 'charge' (число или массив (N,)).
+        coefficient: kappa для 'dipole' (см. induced_dipole_coefficient), число или массив (N,).
+        drag: Коэффициент вязкого трения gamma, 1/с (ускорение -gamma v), число или массив (N,); для 'dipole'.
+        acceleration: Постоянное внешнее ускорение (например, тяжесть (0, 0, -9.81)), м/с^2.
+        dt: Временной шаг, с.
+    """
+
+    def __init__(self, field, positions, velocities, mode='charge', charge_to_mass=0.0, coefficient=0.0,
+                 drag=0.0, acceleration=(0.0, 0.0, 0.0), dt=1e-6):
+        if mode not in ('charge', 'dipole'):
+            raise ValueError(f"Неизвестный вид частиц: {mode}")
+        self.field = field
+        self.magnet = field.magnet
+        self.mode = mode
+        self.dt = dt
+        self.acceleration = np.asarray(acceleration, dtype=float)
+        self.bounds = np.array(field.bounds, dtype=float)
+
+        self.initial_positions = np.array(positions, dtype=float).reshape(-1, 3)
+        count = len(self.initial_positions)
+        self.positions = self.initial_positions.copy()  # положения всех частиц на момент последней записи
+        self.status = np.full(count, ACTIVE, dtype=np.int8)
+        self.stop_time = np.full(count, np.nan)
+        self.time = 0.0
+        self.steps = 0
+
+        # Состояние только активных частиц
+        self.active = np.arange(count)
+        self._x = self.positions.copy()
+        self._v = np.array(velocities, dtype=float).reshape(-1, 3) * np.ones((count, 1))
+        self._charge_to_mass = np.broadcast_to(np.asarray(charge_to_mass, dtype=float), (count,)).copy()
+        self._coefficient = np.broadcast_to(np.asarray(coefficient, dtype=float), (count,)).copy()
+        self._drag = np.broadcast_to(np.asarray(drag, dtype=float), (count,)).copy()
+        self._v = self._advance_velocity(self._x, self._v, -dt / 2)
+
+    def _advance_velocity(self, x, v, h):
+        """Изменение скорости за время h в поле в точках x (h < 0 — обратный ход)."""
+        if self.mode == 'charge':
+            # Интегратор Бориса: полутолчок, поворот вокруг B, полутолчок
+            v_minus = v + self.acceleration * (h / 2)
+            t = (self._charge_to_mass * (MU0 * h / 2))[:, None] * self.field(x)
+            s = 2 * t / (1 + np.einsum('ij,ij->i', t, t))[:, None]
+            v_prime = v_minus + np.cross(v_minus, t)
+            return v_minus + np.cross(v_prime, s) + self.acceleration * (h / 2)
+
+        _, gradient = self.field(x, gradient=True)
+        force = self._coefficient[:, None] * gradient + self.acceleration
+        # Точное решение dv/dt = force - gamma v при постоянной силе на шаге
+        decay = np.exp(-self._drag * h)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            gain = np.where(self._drag != 0, -np.expm1(-self._drag * h) / self._drag, h)
+        return v * decay[:, None] + force * gain[:, None]
+
+    def _stop(self, mask, outcome, points, times):
+        """Отмечает частицы mask (среди активных) остановленными и исключает их из вычислений."""
+        indices = self.active[mask]
+        self.status[indices] = outcome
+        self.stop_time[indices] = times
+        self.positions[indices] = points
+
+    def step(self):
+        """Один шаг всех активных частиц с проверкой поглощения полюсами и выхода из области."""
+        x_old = self._x
+        self._v = self._advance_velocity(x_old, self._v, self.dt)
+        x_new = x_old + self._v * self.dt
+        profiler.count('particles.pushes', len(x_old))
+
+        # Пересечение плоскости полюсов z = 0 внутри прямоугольника полюса
+        z_old, z_new = x_old[:, 2], x_new[:, 2]
+        crossed = (z_old > 0) != (z_new > 0)
+        stopped = np.zeros(len(x_old), dtype=bool)
+        if crossed.any():
+            with np.errstate(divide='ignore', invalid='ignore'):
+                fraction = np.where(crossed, z_old / (z_old - z_new), 0.0)
+            hit = x_old + fraction[:, None] * (x_new - x_old)
+            magnet = self.magnet
+            on_y = (hit[:, 1] >= 0) & (hit[:, 1] <= magnet.b)
+            for outcome, left in ((NORTH, 0.0), (SOUTH, magnet.d)):
+                captured = crossed & on_y & (hit[:, 0] >= left) & (hit[:, 0] <= left + magnet.a)
+                if captured.any():
+                    self._stop(captured, outcome, hit[captured], self.time + fraction[captured] * self.dt)
+                    stopped |= captured
+
+        outside = ~stopped & ((x_new < self.bounds[:, 0]) | (x_new > self.bounds[:, 1])).any(axis=1)
+        if outside.any():
+            self._stop(outside, ESCAPED, x_new[outside], self.time + self.dt)
+            stopped |= outside
+
+        self.time += self.dt
+        self.steps += 1
+        if stopped.any():
+            keep = ~stopped
+            self.active = self.active[keep]
+            x_new, self._v = x_new[keep], self._v[keep]
+            self._charge_to_mass, self._coefficient, self._drag = (
+                self._charge_to_mass[keep], self._coefficient[keep], self._drag[keep])
+        self._x = x_new
+
+    def current_positions(self):
+        """Положения всех частиц на текущий момент (остановленные — в точке остановки)."""
+        self.positions[self.active] = self._x
+        return self.positions.copy()
+
+    def run(self, steps, chunk_steps=100, record_every=1):
+        """
+        Выполняет до steps шагов (меньше, если все частицы остановились), выдавая траектории блоками.
+
+        Args:
+            steps: Число шагов.
+            chunk_steps: Число шагов в одном блоке.
+            record_every: Записывать положения каждые record_every шагов.
+
+        Yields:
+            Кортежи (t, positions, status): t — моменты записи (k,), positions — положения всех
+            частиц (k, N, 3), status — состояния частиц (N,) на конец блока.
+        """
+        done = 0
+        while done < steps and self.active.size:
+            times, frames = [], []
+            with profiler.timer('particles.chunk'):
+                for _ in range(min(chunk_steps, steps - done)):
+                    self.step()
+                    done += 1
+                    if self.steps % record_every == 0:
+                        times.append(self.time)
+                        frames.append(self.current_positions())
+                    if not self.active.size:
+                        break
+            if times:
+                yield np.array(times), np.stack(frames), self.status.copy()
+
+    def statistics(self):
+        """
+        Статистика захвата на текущий момент.
+
+        Returns:
+            Словарь: 'count', 'time'; числа частиц по состояниям ('active', 'north', 'south', 'escaped');
+            'capture_fraction' — доля поглощенных полюсами; для каждого полюса 'mean_capture_time_<полюс>'
+            и 'median_capture_time_<полюс>' (с) и '<полюс>_positions' — точки захвата (k, 3).
+        """
+        summary = {'count': len(self.status), 'time': self.time}
+        for outcome, name in OUTCOMES.items():
+            summary[name] = int(np.count_nonzero(self.status == outcome))
+        summary['capture_fraction'] = (summary['north'] + summary['south']) / max(len(self.status), 1)
+        for outcome in (NORTH, SOUTH):
+            name = OUTCOMES[outcome]
+            captured = self.status == outcome
+            times = self.stop_time[captured]
+            summary[f'mean_capture_time_{name}'] = float(times.mean()) if times.size else np.nan
+            summary[f'median_capture_time_{name}'] = float(np.median(times)) if times.size else np.nan
+            summary[f'{name}_positions'] = self.positions[captured]
+        return summary
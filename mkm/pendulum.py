@@ -0,0 +1,129 @@
+import numpy as np
+
+from mkm.profiling import profiler
+
+class Physicist:
+    def __init__(self, g=9.81, length=1.0):
+        self.g = g
+        self.length = length
+
+    def huygens_formula(self):
+        """Вычисляет период колебаний по формуле Гюйгенса."""
+        return 2 * np.pi * np.sqrt(self.length / self.g)
+
+    def exact_period(self, theta0):
+         """Вычисляет "точный" период, используя эллиптический интеграл."""
+         k = np.sin(theta0 / 2)
+         t = 1 - k * k
+         t1 = (((0.01451196212 * t + 0.03742563713) * t +
+               0.03590092383) * t + 0.09666344259) * t + 1.38629436112
+         t2 = (((0.00441787012 * t + 0.03328355346) * t +
+               0.06880248576) * t + 0.12498593597) * t + 0.5
+         cei1 = t1 - t2 * np.log(t)
+         return 4 * np.sqrt(self.length / self.g) * cei1
+
+    def equation(self, theta, omega, damping):
+        """Дифференциальное уравнение маятника."""
+        return - (self.g / self.length) * np.sin(theta) - damping * omega
+
+class Mathematician:
+    def __init__(self, physicist, theta0, omega0, step, damping, points):
+        self.physicist = physicist
+        self.theta0 = theta0
+        self.omega0 = omega0
+        self.step = step
+        self.damping = damping
+        self.points = points
+
+    def integrate(self):
+        """Интегрирует дифференциальное уравнение маятника."""
+        chunks = list(self.integrate_chunks())
+        return tuple(np.concatenate(columns) for columns in zip(*chunks))
+
+    def integrate_chunks(self, chunk_size=10000):
+        """
+        Интегрирует уравнение маятника, отдавая результат блоками не длиннее chunk_size точек.
+
+        Yields:
+            Кортежи массивов (t, theta, omega); вместе блоки дают ровно результат integrate().
+        """
+        theta, omega = self.theta0, self.omega0
+        t_values, theta_values, omega_values = [0], [theta], [omega]
+
+        for i in range(1, self.points):
+            if len(t_values) == chunk_size:
+                profiler.count('pendulum.steps', chunk_size)
+                yield np.array(t_values), np.array(theta_values), np.array(omega_values)
+                t_values, theta_values, omega_values = [], [], []
+            omega += self.physicist.equation(theta, omega, self.damping) * self.step
+            theta += omega * self.step
+            t_values.append(i * self.step)
+            theta_values.append(theta)
+            omega_values.append(omega)
+
+        profiler.count('pendulum.steps', len(t_values))
+        yield np.array(t_values), np.array(theta_values), np.array(omega_values)
+
+    def integrate_batch(self, length=None, theta0=None, omega0=None, damping=None):
+        """
+        Пакетная версия integrate: интегрирует сразу много маятников с разными параметрами.
+
+        Шаг, число точек и g общие (берутся из self и self.physicist). Схема та же, что в integrate, и
+        операции выполняются в том же порядке, поэтому каждый столбец совпадает с integrate() для
+        своих параметров.
+
+        Args:
+            length: Длина (или массив длин), м. По умолчанию self.physicist.length.
+            theta0: Начальный угол (или массив), рад. По умолчанию self.theta0.
+            omega0: Начальная угловая скорость (или массив), рад/с. По умолчанию self.omega0.
+            damping: Коэффициент затухания (или массив), 1/с. По умолчанию self.damping.
+
+        Returns:
+            Кортеж: (t формы (points,), theta и omega формы (points, число маятников))
+        """
+        length = self.physicist.length if length is None else length
+        theta0 = self.theta0 if theta0 is None else theta0
+        omega0 = self.omega0 if omega0 is None else omega0
+        damping = self.damping if damping is None else damping
+        length, theta, omega, damping = (np.array(arr, dtype=float).ravel() for arr in np.broadcast_arrays(
+            np.asarray(length, dtype=float), np.asarray(theta0, dtype=float),
+            np.asarray(omega0, dtype=float), np.asarray(damping, dtype=float)))
+
+        step = self.step
+        stiffness = -(self.physicist.g / length)  # -(g / L), как в Physicist.equation
+        theta_values = np.empty((self.points, theta.size))
+        omega_values = np.empty((self.points, theta.size))
+        theta_values[0], omega_values[0] = theta, omega
+        acceleration = np.empty(theta.size)
+        friction = np.empty(theta.size)
+
+        # Операции на месте: при малом числе маятников время шага определяется числом вызовов NumPy
+        for i in range(1, self.points):
+            np.sin(theta, out=acceleration)
+            acceleration *= stiffness
+            np.multiply(damping, omega, out=friction)
+            acceleration -= friction
+            acceleration *= step
+            omega += acceleration
+            np.multiply(omega, step, out=friction)
+            theta += friction
+            theta_values[i] = theta
+            omega_values[i] = omega
+
+        profiler.count('pendulum.steps', (self.points - 1) * theta.size)
+        return np.arange(self.points) * step, theta_values, omega_values
+
+    def compute_period(self, t_values, theta_values):
+        """Вычисляет период колебаний на основе данных моделирования."""
+        # Находим все пересечения нуля (сверху вниз)
+        crossings = np.where((theta_values[:-1] >= 0) & (theta_values[1:] < 0))[0]
+
+        # Если нет пересечений или только одно, возвращаем None
+        if len(crossings) < 2:
+            return None
+
+        # Вычисляем периоды между последовательными пересечениями
+        periods = np.diff(t_values[crossings])
+
+        # Возвращаем средний период
+        return np.mean(periods)
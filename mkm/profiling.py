@@ -0,0 +1,217 @@
+"""
+Легковесное профилирование: таймеры и счетчики горячих участков.
+
+Выключенный профайлер почти ничего не стоит: timer() возвращает общий пустой контекст, count()
+сразу выходит. Включается флагом profiler.enabled, переменной окружения MKM_PROFILE=1 или
+флажком в строке состояния GUI. Трасса сохраняется в формате Chrome trace (chrome://tracing,
+Perfetto).
+
+    from mkm.profiling import profiler
+
+    with profiler.timer('magnet.field_grid'):
+        ...
+    profiler.count('magnet.field_evaluations', n)
+"""
+import functools
+import json
+import os
+import threading
+import time
+from collections import deque
+
+
+class _NullTimer:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+
+class _Timer:
+    __slots__ = ('profiler', 'name', 'start')
+
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.profiler._record(self.name, self.start, time.perf_counter())
+        return False
+
+
+class Profiler:
+    """
+    Собирает время именованных участков и значения счетчиков.
+
+    Для каждого таймера хранится [вызовы, сумма, максимум, последнее] (с); события для трассы
+    пишутся в кольцевой буфер из max_events элементов, чтобы долгий сеанс не съел память.
+    """
+
+    def __init__(self, enabled=False, max_events=200000):
+        self.enabled = enabled
+        self.timers = {}
+        self.counters = {}
+        self.events = deque(maxlen=max_events)
+        self.origin = time.perf_counter()
+        self._lock = threading.Lock()
+
+    def timer(self, name):
+        """Контекстный менеджер, замеряющий время блока."""
+        if not self.enabled:
+            return _NULL_TIMER
+        return _Timer(self, name)
+
+    def timed(self, name=None):
+        """Декоратор: замеряет каждый вызов функции (флаг enabled проверяется при вызове)."""
+        def decorate(function):
+            label = name or function.__qualname__
+
+            @functools.wraps(function)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return function(*args, **kwargs)
+                with _Timer(self, label):
+                    return function(*args, **kwargs)
+            return wrapper
+        return decorate
+
+    def count(self, name, n=1):
+        """Увеличивает счетчик name на n."""
+        if not self.enabled:
+            return
+        with self._lock:
+            value = self.counters.get(name, 0) + n
+            self.counters[name] = value
+            self.events.append(('C', name, time.perf_counter(), value, threading.get_ident()))
+
+    def _record(self, name, start, end):
+        elapsed = end - start
+        with self._lock:
+            stats = self.timers.get(name)
+            if stats is None:
+                self.timers[name] = [1, elapsed, elapsed, elapsed]
+            else:
+                stats[0] += 1
+                stats[1] += elapsed
+                stats[2] = max(stats[2], elapsed)
+                stats[3] = elapsed
+            self.events.append(('X', name, start, elapsed, threading.get_ident()))
+
+    def reset(self):
+        """Сбрасывает все таймеры, счетчики и события."""
+        with self._lock:
+            self.timers.clear()
+            self.counters.clear()
+            self.events.clear()
+            self.origin = time.perf_counter()
+
+    def summary(self):
+        """
+        Сводка по таймерам и счетчикам.
+
+        Returns:
+            Словарь: 'timers' — {имя: {'calls', 'total', 'mean', 'max', 'last'}} (с),
+            'counters' — {имя: значение}.
+        """
+        with self._lock:
+            timers = {name: {'calls': calls, 'total': total, 'mean': total / calls, 'max': peak, 'last': last}
+                      for name, (calls, total, peak, last) in self.timers.items()}
+            return {'timers': timers, 'counters': dict(self.counters)}
+
+    def format_status(self, limit=4):
+        """Короткая строка для строки состояния: самые затратные таймеры и все счетчики."""
+        summary = self.summary()
+        timers = sorted(summary['timers'].items(), key=lambda item: -item[1]['total'])[:limit]
+        parts = [f"{name}: {stats['last'] * 1000:.1f} мс (×{stats['calls']})" for name, stats in timers]
+        parts += [f"{name}: {value}" for name, value in sorted(summary['counters'].items())]
+        return " | ".join(parts) if parts else "нет данных"
+
+    def chrome_trace(self):
+        """События в формате Chrome trace (словарь с ключом 'traceEvents', время в мкс)."""
+        pid = os.getpid()
+        with self._lock:
+            events = list(self.events)
+            origin = self.origin
+        trace = []
+        for kind, name, start, value, tid in events:
+            event = {'name': name, 'ph': kind, 'ts': (start - origin) * 1e6, 'pid': pid, 'tid': tid,
+                     'cat': name.split('.')[0]}
+            if kind == 'X':
+                event['dur'] = value * 1e6
+            else:
+                event['args'] = {'value': value}
+            trace.append(event)
+        return {'traceEvents': trace, 'displayTimeUnit': 'ms'}
+
+    def export_chrome_trace(self, path):
+        """Сохраняет трассу в JSON-файл для chrome://tracing или Perfetto."""
+        with open(path, 'w', encoding='utf-8') as file:
+            json.dump(self.chrome_trace(), file)
+
+
+profiler = Profiler(enabled=os.environ.get('MKM_PROFILE') == '1')
+
+
+def create_status_bar(parent, profiler=profiler, interval=500):
+    """
+    Строка состояния с показаниями профайлера для окон GUI.
+
+    Содержит флажок включения, сброс и экспорт трассы; текст обновляется по таймеру раз в interval мс,
+    пока профилирование включено. Qt импортируется только здесь, ядро от него не зависит.
+    """
+    from PyQt5.QtCore import QTimer
+    from PyQt5.QtWidgets import QCheckBox, QFileDialog, QLabel, QPushButton, QSizePolicy, QStatusBar
+
+    status_bar = QStatusBar(parent)
+    label = QLabel()
+    # Длинная строка показаний не должна расширять окно
+    label.setSizePolicy(QSizePolicy.Ignored, QSizePolicy.Preferred)
+    checkbox = QCheckBox("Профилирование")
+    checkbox.setChecked(profiler.enabled)
+    reset_button = QPushButton("Сбросить")
+    export_button = QPushButton("Трасса…")
+    status_bar.addWidget(label, 1)
+    status_bar.addPermanentWidget(checkbox)
+    status_bar.addPermanentWidget(reset_button)
+    status_bar.addPermanentWidget(export_button)
+
+    def refresh():
+        label.setText(profiler.format_status() if profiler.enabled else "Профилирование выключено")
+
+    def toggle(checked):
+        profiler.enabled = checked
+        if checked:
+            timer.start(interval)
+        else:
+            timer.stop()
+        refresh()
+
+    def reset():
+        profiler.reset()
+        refresh()
+
+    def export():
+        path, _ = QFileDialog.getSaveFileName(parent, "Сохранить трассу", "trace.json", "Chrome trace (*.json)")
+        if path:
+            profiler.export_chrome_trace(path)
+            status_bar.showMessage(f"Трасса сохранена: {path}", 3000)
+
+    timer = QTimer(status_bar)
+    timer.timeout.connect(refresh)
+    checkbox.toggled.connect(toggle)
+    reset_button.clicked.connect(reset)
+    export_button.clicked.connect(export)
+    if profiler.enabled:
+        timer.start(interval)
+    refresh()
+    return status_bar
@@ -0,0 +1,577 @@
+"""
+Локальный сервис симуляций: JSON-RPC 2.0 поверх Unix-сокета или stdin/stdout.
+
+Сервис работает долго, поэтому интерпретатор, модули ядра, пул процессов и кэш результатов уже
+прогреты к приходу запроса. Каждое сообщение — одна строка JSON; запросы обрабатываются
+конкурентно (asyncio), ответы приходят по мере готовности и сопоставляются по id. Сообщение может
+быть и пакетом — массивом запросов, на него приходит массив ответов. Уведомления (запросы без id)
+выполняются, но ответа на них нет, даже при ошибке.
+
+Совместимые мелкие запросы собираются в пакеты: например, дальности для многих углов (и разных
+v0/vM) считаются одним вызовом Physic.predictor_corrector_batch. Пакет набирается до
+max_batch запросов или batch_delay секунд и выполняется в пуле процессов. Задачи из mkm.sweep
+(траектории, поле на сетке, маятник, золотое сечение) идут через общий кэш результатов;
+одинаковые задачи, пришедшие одновременно, считаются один раз.
+
+    python -m mkm.service serve --socket /tmp/mkm.sock
+    python -m mkm.service serve --stdio
+    python -m mkm.service bench --requests 20000 --concurrency 256
+
+Пример запроса:
+
+    {"jsonrpc": "2.0", "id": 1, "method": "ballistics.range", "params": {"v0": 750, "vM": 150, "angle": 30}}
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import signal
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import numpy as np
+
+from mkm.ballistics import Physic, Mathematic
+from mkm.fermat import fermat_crossing_point, fermat_travel_time
+from mkm.magnet import HorseshoeMagnet
+from mkm.sweep import TASKS, result_cache, task_key, to_jsonable
+
+PARSE_ERROR = -32700
+INVALID_REQUEST = -32600
+METHOD_NOT_FOUND = -32601
+INVALID_PARAMS = -32602
+SERVER_ERROR = -32000
+
+
+class ServiceError(Exception):
+    """Ошибка JSON-RPC с кодом; на стороне клиента — ошибка, полученная от сервиса."""
+
+    def __init__(self, code, message):
+        super().__init__(message)
+        self.code = code
+        self.message = message
+
+
+def _ballistics_range_batch(key, requests):
+    dt, gravity = key
+    angle, wind_speed, v0, vM = np.array([[r['angle'], r['wind_speed'], r['v0'], r['vM']] for r in requests]).T
+    ranges, times = Physic(v0=1.0, vM=1.0, gravity=gravity, dt=dt).predictor_corrector_batch(angle, wind_speed, v0, vM)
+    return [{'range': float(r), 'time': float(t)} for r, t in zip(ranges, times)]
+
+
+def _fermat_crossing_batch(key, requests):
+    A = np.array([r['A'] for r in requests], dtype=float).T
+    B = np.array([r['B'] for r in requests], dtype=float).T
+    n1 = np.array([r['n1'] for r in requests], dtype=float)
+    n2 = np.array([r['n2'] for r in requests], dtype=float)
+    x = fermat_crossing_point(A, B, n1, n2)
+    times = fermat_travel_time(x, A, B, n1, n2)
+    return [{'x': float(xi), 'time': float(ti)} for xi, ti in zip(x, times)]
+
+
+def _magnet_field_batch(key, requests):
+    # Все точки пакета считаются одним векторным вызовом — тем же, что строит сетки поля
+    points = np.array([r['point'] for r in requests], dtype=float)
+    return HorseshoeMagnet(*key).field_at(points).tolist()
+
+
+# Пакетные методы: функция пакета, параметры по умолчанию (None — обязательный), ключ совместимости
+BATCHED = {
+    'ballistics.range': (_ballistics_range_batch,
+                         {'v0': None, 'vM': None, 'angle': None, 'wind_speed': 0.0, 'dt': 0.01,
+                          'gravity': Mathematic.GRAVITY},
+                         lambda p: (p['dt'], p['gravity'])),
+    'fermat.crossing_point': (_fermat_crossing_batch,
+                              {'A': None, 'B': None, 'n1': None, 'n2': None},
+                              lambda p: ()),
+    'magnet.field': (_magnet_field_batch,
+                     {'a': 0.1, 'b': 0.05, 'd': 0.2, 'M': 1e6, 'Na': 20, 'Nb': 20, 'point': None},
+                     lambda p: (p['a'], p['b'], p['d'], p['M'], p['Na'], p['Nb'])),
+}
+
+
+def _number(value):
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        raise ValueError(f"ожидалось число, получено {value!r}")
+    value = float(value)
+    if not np.isfinite(value):
+        raise ValueError("ожидалось конечное число")
+    return value
+
+
+def _positive(value):
+    value = _number(value)
+    if value <= 0:
+        raise ValueError(f"ожидалось положительное число, получено {value}")
+    return value
+
+
+def _count(value):
+    if isinstance(value, bool) or not isinstance(value, int) or value < 1:
+        raise ValueError(f"ожидалось натуральное число, получено {value!r}")
+    return value
+
+
+def _vector(length):
+    def check(value):
+        if not isinstance(value, (list, tuple)) or len(value) != length:
+            raise ValueError(f"ожидался массив из {length} чисел, получено {value!r}")
+        return tuple(_number(item) for item in value)
+    return check
+
+
+# Проверка и приведение параметров пакетных методов. Проверяется каждый запрос до постановки в пакет:
+# иначе один некорректный запрос уронил бы векторный расчет для всех запросов пакета
+PARAM_CHECKS = {
+    'v0': _number, 'vM': _positive, 'angle': _number, 'wind_speed': _number, 'dt': _positive, 'gravity': _positive,
+    'A': _vector(2), 'B': _vector(2), 'n1': _positive, 'n2': _positive,
+    'a': _positive, 'b': _positive, 'd': _number, 'M': _number, 'Na': _count, 'Nb': _count, 'point': _vector(3),
+}
+
+
+def _checked_params(defaults, params):
+    """Параметры запроса с подставленными значениями по умолчанию, приведенные к нужным типам."""
+    checked = {}
+    for name, value in dict(defaults, **params).items():
+        try:
+            checked[name] = PARAM_CHECKS[name](value)
+        except ValueError as error:
+            raise ServiceError(INVALID_PARAMS, f"Параметр {name}: {error}") from None
+    return checked
+
+
+def _run_sweep_task(name, params):
+    return TASKS[name](**params)
+
+
+def _cache_lookup(cache, key):
+    try:
+        return True, cache.get(key)
+    except KeyError:
+        return False, None
+
+
+def _warm_worker():
+    """Инициализатор процесса пула: прогоняет короткие расчеты, чтобы первый запрос не ждал загрузки."""
+    _ballistics_range_batch((0.01, Mathematic.GRAVITY), [{'angle': 45.0, 'wind_speed': 0.0, 'v0': 50.0, 'vM': 150.0}])
+    _magnet_field_batch((0.1, 0.05, 0.2, 1e6, 2, 2), [{'point': (0.0, 0.0, 0.3)}])
+
+
+class Batcher:
+    """
+    Собирает совместимые запросы одного метода в пакеты и выполняет их в пуле процессов.
+
+    Пакет отправляется через delay секунд после первого запроса или сразу по набору max_batch.
+    Одновременно выполняется не больше max_running пакетов: пока процессы заняты, запросы копятся,
+    и под нагрузкой пакеты сами становятся крупнее.
+    """
+
+    def __init__(self, service, function, key, max_batch, delay, max_running):
+        self.service = service
+        self.function = function
+        self.key = key
+        self.max_batch = max_batch
+        self.delay = delay
+        self.max_running = max_running
+        self.running = 0
+        self.pending = {}  # ключ -> [(параметры, future)]
+        self.ready = []  # ключи, чей пакет ждет свободного процесса
+
+    def submit(self, params):
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        key = self.key(params)
+        bucket = self.pending.setdefault(key, [])
+        bucket.append((params, future))
+        if len(bucket) >= self.max_batch:
+            self._flush(key)
+        elif len(bucket) == 1:
+            loop.call_later(self.delay, self._flush, key)
+        return future
+
+    def _flush(self, key):
+        if key in self.pending and key not in self.ready:
+            self.ready.append(key)
+        while self.ready and self.running < self.max_running:
+            key = self.ready.pop(0)
+            items = self.pending.pop(key)
+            batch, rest = items[:self.max_batch], items[self.max_batch:]
+            if rest:
+                self.pending[key] = rest
+                self.ready.append(key)
+            self.running += 1
+            asyncio.ensure_future(self._run(key, batch))
+
+    async def _run(self, key, items):
+        loop = asyncio.get_running_loop()
+        self.service.stats['batches'] += 1
+        self.service.stats['batched_requests'] += len(items)
+        try:
+            results = await loop.run_in_executor(self.service.executor, self.function, key,
+                                                 [params for params, _ in items])
+        except Exception as error:
+            results = None
+            for _, future in items:
+                if not future.done():
+                    future.set_exception(error)
+        finally:
+            self.running -= 1
+            if self.ready:
+                self._flush(self.ready[0])
+        if results is not None:
+            for (_, future), result in zip(items, results):
+                if not future.done():
+                    future.set_result(result)
+
+
+class SimulationService:
+    """
+    Обработчик JSON-RPC запросов с пулом процессов, пакетированием и кэшем результатов.
+
+    Args:
+        max_workers: Число процессов пула (по умолчанию — число ядер).
+        cache: ResultCache для задач mkm.sweep (по умолчанию общий).
+        max_batch: Максимальный размер пакета.
+        batch_delay: Сколько ждать добора пакета после первого запроса, с.
+    """
+
+    def __init__(self, max_workers=None, cache=None, max_batch=4096, batch_delay=0.002):
+        self.max_workers = max_workers or os.cpu_count()
+        self.cache = cache or result_cache
+        self.executor = None
+        # Чтение и запись кэша (распаковка с диска) идут в отдельном потоке, чтобы не останавливать
+        # цикл событий; один поток — и обращения к кэшу не пересекаются
+        self.cache_executor = ThreadPoolExecutor(max_workers=1)
+        self.running_tasks = {}  # ключ кэша -> задача asyncio, которая его сейчас вычисляет
+        self.batchers = {name: Batcher(self, function, key, max_batch, batch_delay, self.max_workers)
+                         for name, (function, _, key) in BATCHED.items()}
+        self.stats = {'requests': 0, 'errors': 0, 'batches': 0, 'batched_requests': 0,
+                      'cache_hits': 0, 'cache_misses': 0, 'deduplicated': 0}
+
+    async def start(self):
+        """Создает пул и прогревает все его процессы."""
+        self.executor = ProcessPoolExecutor(max_workers=self.max_workers, initializer=_warm_worker)
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(*(loop.run_in_executor(self.executor, time.sleep, 0.05)
+                               for _ in range(self.max_workers)))
+
+    def close(self):
+        if self.executor is not None:
+            self.executor.shutdown(cancel_futures=True)
+        self.cache_executor.shutdown(cancel_futures=True)
+
+    def methods(self):
+        return sorted(BATCHED) + sorted(TASKS) + ['system.methods', 'system.ping', 'system.stats']
+
+    async def call(self, method, params):
+        """Выполняет метод и возвращает результат, пригодный для JSON."""
+        if method == 'system.ping':
+            return 'pong'
+        if method == 'system.methods':
+            return self.methods()
+        if method == 'system.stats':
+            return dict(self.stats)
+        if not isinstance(params, dict):
+            raise ServiceError(INVALID_PARAMS, "params должен быть объектом")
+
+        if method in BATCHED:
+            _, defaults, _ = BATCHED[method]
+            unknown = set(params) - set(defaults)
+            missing = [name for name, value in defaults.items() if value is None and name not in params]
+            if unknown or missing:
+                raise ServiceError(INVALID_PARAMS, f"Лишние параметры: {sorted(unknown)}, недостающие: {missing}")
+            return await self.batchers[method].submit(_checked_params(defaults, params))
+
+        if method in TASKS:
+            try:
+                key = task_key(method, params)
+            except TypeError as error:
+                raise ServiceError(INVALID_PARAMS, str(error)) from None
+            task = self.running_tasks.get(key)
+            if task is None:
+                task = asyncio.ensure_future(self._cached_task(key, method, params))
+                self.running_tasks[key] = task
+                task.add_done_callback(lambda _: self.running_tasks.pop(key, None))
+            else:
+                self.stats['deduplicated'] += 1
+            # shield: отмена одного из ожидающих не должна прерывать расчет для остальных
+            return await asyncio.shield(task)
+
+        raise ServiceError(METHOD_NOT_FOUND, f"Неизвестный метод: {method}")
+
+    async def _cached_task(self, key, method, params):
+        loop = asyncio.get_running_loop()
+        found, value = await loop.run_in_executor(self.cache_executor, _cache_lookup, self.cache, key)
+        if found:
+            self.stats['cache_hits'] += 1
+        else:
+            self.stats['cache_misses'] += 1
+            value = await loop.run_in_executor(self.executor, _run_sweep_task, method, params)
+            await loop.run_in_executor(self.cache_executor, self.cache.put, key, value)
+        return to_jsonable(value)
+
+    async def handle(self, message):
+        """
+        Обрабатывает разобранное сообщение: один запрос или пакет (список запросов).
+
+        Returns:
+            Ответ, список ответов для пакета или None, если отвечать не нужно (уведомления).
+        """
+        if isinstance(message, list):
+            if not message:
+                return _error_response(None, INVALID_REQUEST, "Пустой пакет JSON-RPC")
+            responses = await asyncio.gather(*(self._handle_request(item) for item in message))
+            return [response for response in responses if response is not None] or None
+        return await self._handle_request(message)
+
+    async def _handle_request(self, message):
+        if not isinstance(message, dict) or message.get('jsonrpc') != '2.0' or 'method' not in message:
+            return _error_response(None, INVALID_REQUEST, "Некорректный запрос JSON-RPC 2.0")
+        request_id = message.get('id')
+        self.stats['requests'] += 1
+        try:
+            result = await self.call(message['method'], message.get('params', {}))
+        except ServiceError as error:
+            self.stats['errors'] += 1
+            response = _error_response(request_id, error.code, error.message)
+        except Exception as error:
+            self.stats['errors'] += 1
+            response = _error_response(request_id, SERVER_ERROR, f"{type(error).__name__}: {error}")
+        else:
+            response = {'jsonrpc': '2.0', 'id': request_id, 'result': result}
+        # Уведомление (без id) не получает ответа, даже если завершилось ошибкой
+        return response if 'id' in message else None
+
+    async def serve_stream(self, reader, writer):
+        """Обслуживает одно соединение: строки JSON на входе, ответы по мере готовности на выходе."""
+        lock = asyncio.Lock()
+        tasks = set()
+
+        async def respond(line):
+            try:
+                message = json.loads(line)
+            except ValueError:
+                response = _error_response(None, PARSE_ERROR, "Ошибка разбора JSON")
+            else:
+                response = await self.handle(message)
+            if response is not None:
+                async with lock:
+                    writer.write(json.dumps(response, ensure_ascii=False).encode() + b'\n')
+                    await writer.drain()
+
+        try:
+            while line := await reader.readline():
+                if line.strip():
+                    task = asyncio.ensure_future(respond(line))
+                    tasks.add(task)
+                    task.add_done_callback(tasks.discard)
+            await asyncio.gather(*tasks)
+        finally:
+            writer.close()
+
+    async def serve_unix(self, path):
+        if os.path.exists(path):
+            os.unlink(path)
+        server = await asyncio.start_unix_server(self.serve_stream, path)
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            os.unlink(path)
+
+    async def serve_stdio(self):
+        # stdin/stdout могут быть обычными файлами, а не каналами, поэтому вместо транспортов asyncio
+        # строки читаются в отдельном потоке, а ответы пишутся напрямую
+        await self.serve_stream(_StdioReader(sys.stdin.buffer), _StdioWriter(sys.stdout.buffer))
+
+
+class _StdioReader:
+    def __init__(self, stream):
+        self.stream = stream
+
+    async def readline(self):
+        return await asyncio.get_running_loop().run_in_executor(None, self.stream.readline)
+
+
+class _StdioWriter:
+    def __init__(self, stream):
+        self.stream = stream
+
+    def write(self, data):
+        self.stream.write(data)
+
+    async def drain(self):
+        self.stream.flush()
+
+    def close(self):
+        self.stream.flush()
+
+
+def _error_response(request_id, code, message):
+    return {'jsonrpc': '2.0', 'id': request_id, 'error': {'code': code, 'message': message}}
+
+
+class ServiceClient:
+    """Асинхронный клиент сервиса; допускает много одновременных вызовов через одно соединение."""
+
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+        self.ids = itertools.count(1)
+        self.pending = {}
+        self.listener = asyncio.ensure_future(self._listen())
+
+    @classmethod
+    async def connect(cls, path):
+        reader, writer = await asyncio.open_unix_connection(path, limit=2 ** 24)
+        return cls(reader, writer)
+
+    async def _listen(self):
+        while line := await self.reader.readline():
+            response = json.loads(line)
+            future = self.pending.pop(response.get('id'), None)
+            if future is None or future.done():
+                continue
+            if 'error' in response:
+                future.set_exception(ServiceError(response['error']['code'], response['error']['message']))
+            else:
+                future.set_result(response['result'])
+        for future in self.pending.values():
+            future.set_exception(ConnectionError("Сервис закрыл соединение"))
+
+    async def call(self, method, **params):
+        request_id = next(self.ids)
+        future = asyncio.get_running_loop().create_future()
+        self.pending[request_id] = future
+        self.writer.write(json.dumps({'jsonrpc': '2.0', 'id': request_id, 'method': method,
+                                      'params': params}).encode() + b'\n')
+        await self.writer.drain()
+        return await future
+
+    async def close(self):
+        self.writer.close()
+        self.listener.cancel()
+
+
+async def run_benchmark(path, requests=10000, concurrency=256, method='ballistics.range', seed=0):
+    """
+    Нагрузочный тест: requests вызовов method, не более concurrency одновременно.
+
+    Returns:
+        Словарь: пропускная способность (запр/с), задержки p50/p95/p99/max (мс) и статистика сервиса.
+    """
+    rng = np.random.default_rng(seed)
+    if method == 'ballistics.range':
+        make = lambda: {'v0': float(rng.choice([600.0, 750.0, 900.0])), 'vM': 150.0,
+                        'angle': float(rng.uniform(5, 85)), 'wind_speed': float(rng.uniform(-20, 20))}
+    elif method == 'fermat.crossing_point':
+        make = lambda: {'A': [float(rng.uniform(-5, 5)), float(rng.uniform(0.5, 5))],
+                        'B': [float(rng.uniform(-5, 5)), float(rng.uniform(-5, -0.5))], 'n1': 1.0, 'n2': 1.5}
+    elif method == 'magnet.field':
+        make = lambda: {'point': rng.uniform(-0.5, 0.5, 3).tolist()}
+    else:
+        make = lambda: {}
+
+    client = await ServiceClient.connect(path)
+    before = await client.call('system.stats')
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def one():
+        params = make()
+        async with semaphore:
+            started = time.perf_counter()
+            await client.call(method, **params)
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(requests)))
+    elapsed = time.perf_counter() - started
+    after = await client.call('system.stats')
+    await client.close()
+
+    latencies.sort()
+    percentile = lambda q: 1000 * latencies[min(int(q * len(latencies)), len(latencies) - 1)]
+    batches = after['batches'] - before['batches']
+    return {
+        'method': method, 'requests': requests, 'concurrency': concurrency,
+        'seconds': elapsed, 'throughput': requests / elapsed,
+        'p50_ms': percentile(0.50), 'p95_ms': percentile(0.95), 'p99_ms': percentile(0.99),
+        'max_ms': 1000 * latencies[-1], 'mean_ms': 1000 * statistics.fmean(latencies),
+        'batches': batches, 'mean_batch': (after['batched_requests'] - before['batched_requests']) / max(batches, 1),
+    }
+
+
+def _wait_for_socket(path, process, timeout=30):
+    deadline = time.monotonic() + timeout
+    while not os.path.exists(path):
+        if process.poll() is not None or time.monotonic() > deadline:
+            raise RuntimeError("Сервис не запустился")
+        time.sleep(0.05)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    commands = parser.add_subparsers(dest='command', required=True)
+    serve = commands.add_parser('serve', help='запустить сервис')
+    transport = serve.add_mutually_exclusive_group(required=True)
+    transport.add_argument('--socket', help='путь к Unix-сокету')
+    transport.add_argument('--stdio', action='store_true', help='JSON-RPC через stdin/stdout')
+    serve.add_argument('--workers', type=int, help='число процессов пула')
+    serve.add_argument('--batch-delay', type=float, default=0.002, help='ожидание добора пакета, с')
+    serve.add_argument('--max-batch', type=int, default=4096, help='максимальный размер пакета')
+    bench = commands.add_parser('bench', help='нагрузочный тест (без --socket поднимает свой сервис)')
+    bench.add_argument('--socket', help='путь к Unix-сокету работающего сервиса')
+    bench.add_argument('--method', default='ballistics.range')
+    bench.add_argument('--requests', type=int, default=10000)
+    bench.add_argument('--concurrency', type=int, default=256)
+    bench.add_argument('--workers', type=int, help='число процессов пула поднимаемого сервиса')
+    args = parser.parse_args(argv)
+
+    if args.command == 'serve':
+        service = SimulationService(args.workers, max_batch=args.max_batch, batch_delay=args.batch_delay)
+
+        async def serve():
+            # По SIGTERM (в том числе от bench) пул закрывается штатно, а не остается без родителя
+            asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, asyncio.current_task().cancel)
+            await service.start()
+            try:
+                if args.stdio:
+                    await service.serve_stdio()
+                else:
+                    await service.serve_unix(args.socket)
+            finally:
+                service.close()
+
+        try:
+            asyncio.run(serve())
+        except (KeyboardInterrupt, asyncio.CancelledError):
+            pass
+        return 0
+
+    process = None
+    path = args.socket
+    if path is None:
+        path = os.path.join(tempfile.mkdtemp(), 'mkm.sock')
+        command = [sys.executable, '-m', 'mkm.service', 'serve', '--socket', path]
+        if args.workers:
+            command += ['--workers', str(args.workers)]
+        process = subprocess.Popen(command)
+        _wait_for_socket(path, process)
+    try:
+        report = asyncio.run(run_benchmark(path, args.requests, args.concurrency, args.method))
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait()
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,427 @@
+"""
+Кэш результатов по содержимому и планировщик перебора параметров.
+
+Результат задачи хранится на диске под ключом — хэшем имени задачи, всех ее аргументов (с учетом
+значений по умолчанию) и исходного кода ядра. Поэтому повторный расчет с
+теми же входными данными берется из кэша, а изменение кода автоматически делает старые записи
+недействительными.
+
+Перебор раскрывает сетку параметров в задачи, убирает повторы, отбрасывает уже посчитанные и
+выполняет остальные в пуле процессов. Каждый результат записывается сразу, поэтому прерванный
+перебор продолжается с того же места простым повторным запуском.
+
+    python -m mkm.sweep pendulum.integrate damping=0,0.05,0.1 theta0=0.1,0.5,1.0
+    python -m mkm.sweep --clear-cache
+"""
+import argparse
+import ast
+import functools
+import hashlib
+import inspect
+import itertools
+import json
+import math
+import os
+import pickle
+import sys
+import tempfile
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+from mkm.ballistics import Physic
+from mkm.fermat import FermatSolver
+from mkm.magnet import HorseshoeMagnet
+from mkm.pendulum import Physicist, Mathematician
+from mkm.profiling import profiler
+
+CACHE_VERSION = 1
+DEFAULT_CACHE_BYTES = 2 ** 30  # Бюджет кэша на диске, байт ($MKM_CACHE_MAX_BYTES)
+TASKS = {}
+
+
+def task(name):
+    """Регистрирует функцию как задачу, результат которой можно кэшировать и перебирать."""
+    def register(function):
+        TASKS[name] = function
+        return function
+    return register
+
+
+@task('ballistics.trajectory')
+def ballistics_trajectory(v0=750.0, vM=150.0, angle=45.0, wind_speed=0.0, dt=0.01):
+    x, y, time = Physic(v0=v0, vM=vM, dt=dt).predictor_corrector(angle, wind_speed)
+    return {'x': x, 'y': y, 'time': time}
+
+
+@task('ballistics.optimal_angle')
+def ballistics_optimal_angle(v0=750.0, vM=150.0, wind_speed=0.0, angle_step=0.1, dt=0.01):
+    return float(Physic(v0=v0, vM=vM, dt=dt).find_optimal_angle_with_air_resistance(wind_speed, angle_step))
+
+
+@task('ballistics.vertical_fall')
+def ballistics_vertical_fall(v0=750.0, vM=150.0, initial_height=100.0, analytic=False, dt=0.01):
+    physics = Physic(v0=v0, vM=vM, dt=dt)
+    if analytic:
+        return physics.vertical_fall_analytic(initial_height)
+    return physics.vertical_fall_predictor_corrector(initial_height)
+
+
+@task('pendulum.integrate')
+def pendulum_integrate(length=1.0, theta0=0.2, omega0=0.0, step=0.01, damping=0.05, points=1000, g=9.81):
+    return Mathematician(Physicist(g=g, length=length), theta0, omega0, step, damping, points).integrate()
+
+
+@task('magnet.field_grid')
+def magnet_field_grid(a=0.1, b=0.05, d=0.2, M=1e6, Na=20, Nb=20, plane='Y=0', x_range=(-0.5, 0.7),
+                      y_range=(-0.5, 0.5), z_range=(-0.5, 0.5), num_points=30):
+    return HorseshoeMagnet(a, b, d, M, Na, Nb).field_grid(plane, x_range, y_range, z_range, num_points)
+
+
+@task('fermat.golden_section')
+def fermat_golden_section(A=(-2.0, 5.0), B=(3.0, -5.0), n1=1.0, n2=1.5, tol=1e-5):
+    return FermatSolver(A, B, n1, n2, tol).solve()
+
+
+def to_jsonable(value):
+    """
+    Приводит значение к виду, однозначно сериализуемому в JSON.
+
+    NaN и бесконечности становятся None: строгий JSON их не допускает.
+    """
+    if isinstance(value, (tuple, list, np.ndarray)):
+        return [to_jsonable(item) for item in value]
+    if isinstance(value, np.generic):
+        return to_jsonable(value.item())
+    if isinstance(value, dict):
+        return {str(key): to_jsonable(item) for key, item in value.items()}
+    if isinstance(value, float) and not math.isfinite(value):
+        return None
+    return value
+
+
+@functools.lru_cache(maxsize=None)
+def _code_hash(name):
+    """Хэш исходного кода задачи и модулей ядра, от которых зависит ее результат."""
+    digest = hashlib.sha256(inspect.getsource(TASKS[name]).encode())
+    for dependency in ('mkm.ballistics', 'mkm.pendulum', 'mkm.magnet', 'mkm.fermat'):
+        with open(sys.modules[dependency].__file__, 'rb') as file:
+            digest.update(file.read())
+    return digest.hexdigest()
+
+
+def task_arguments(name, params):
+    """Все аргументы задачи, включая значения по умолчанию, в нормализованном виде."""
+    bound = inspect.signature(TASKS[name]).bind(**params)
+    bound.apply_defaults()
+    return to_jsonable(dict(bound.arguments))
+
+
+def task_key(name, params):
+    """Ключ кэша: SHA-256 от имени задачи, ее аргументов и исходного кода."""
+    payload = json.dumps({'task': name, 'params': task_arguments(name, params), 'code': _code_hash(name),
+                          'version': CACHE_VERSION}, sort_keys=True)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def _run_task(name, params):
+    return TASKS[name](**params)
+
+
+def _shared(value):
+    """
+    Значение из кэша для выдачи вызывающему коду.
+
+    Массивы помечаются только для чтения (без копирования данных), списки, кортежи и словари
+    собираются заново: изменить запись кэша через результат нельзя.
+    """
+    if isinstance(value, np.ndarray):
+        value.setflags(write=False)
+        return value
+    if isinstance(value, dict):
+        return {name: _shared(item) for name, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return type(value)(_shared(item) for item in value)
+    return value
+
+
+class ResultCache:
+    """
+    Кэш результатов на диске с небольшим кэшем в памяти.
+
+    Записи лежат в directory/<2 символа ключа>/<ключ>.pkl и пишутся атомарно (через временный файл),
+    так что прерванная запись никогда не оставляет поврежденный результат. Каталог по умолчанию —
+    $MKM_CACHE_DIR или ~/.cache/mkm.
+
+    Объем на диске ограничен max_bytes (по умолчанию $MKM_CACHE_MAX_BYTES или 1 ГиБ): когда запись
+    его превышает, удаляются давно не использованные записи (время изменения файла обновляется
+    при каждом чтении); max_bytes=0 отключает запись на диск. Массивы в выдаваемых результатах
+    доступны только для чтения.
+    """
+
+    def __init__(self, directory=None, memory_items=64, max_bytes=None):
+        self.directory = directory or os.environ.get('MKM_CACHE_DIR') or os.path.join(
+            os.path.expanduser('~'), '.cache', 'mkm')
+        self.memory_items = memory_items
+        if max_bytes is None:
+            max_bytes = int(os.environ.get('MKM_CACHE_MAX_BYTES') or DEFAULT_CACHE_BYTES)
+        self.max_bytes = max_bytes
+        self._memory = OrderedDict()
+        self._disk_bytes = None  # Оценка объема на диске; None — еще не подсчитан
+
+    def path(self, key):
+        return os.path.join(self.directory, key[:2], key + '.pkl')
+
+    def __contains__(self, key):
+        return key in self._memory or os.path.exists(self.path(key))
+
+    def get(self, key):
+        """Результат по ключу; KeyError, если его нет."""
+        if key in self._memory:
+            self._memory.move_to_end(key)
+            self._touch(key)
+            return _shared(self._memory[key])
+        try:
+            with open(self.path(key), 'rb') as file:
+                value = pickle.load(file)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            raise KeyError(key) from None
+        self._touch(key)
+        self._remember(key, value)
+        return _shared(value)
+
+    def put(self, key, value):
+        if self.max_bytes <= 0:
+            self._remember(key, value)  # Нулевой бюджет: на диск ничего не пишется
+            return
+        path = self.path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        descriptor, temporary = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+        try:
+            with os.fdopen(descriptor, 'wb') as file:
+                pickle.dump(value, file, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(temporary, path)
+        except BaseException:
+            os.unlink(temporary)
+            raise
+        self._remember(key, value)
+        if self._disk_bytes is None:
+            self._disk_bytes = self.disk_usage()
+        else:
+            self._disk_bytes += os.path.getsize(path)
+        if self._disk_bytes > self.max_bytes:
+            # С запасом 10%, чтобы на границе бюджета каталог не просматривался при каждой записи
+            self.prune(int(self.max_bytes * 0.9), keep=key)
+
+    def _remember(self, key, value):
+        self._memory[key] = _shared(value)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_items:
+            self._memory.popitem(last=False)
+
+    def _touch(self, key):
+        try:
+            os.utime(self.path(key))
+        except OSError:
+            pass
+
+    def _entries(self):
+        """Записи на диске: список (время последнего использования, размер, путь)."""
+        entries = []
+        for root, _, files in os.walk(self.directory):
+            for filename in files:
+                if filename.endswith('.pkl'):
+                    path = os.path.join(root, filename)
+                    try:
+                        status = os.stat(path)
+                    except OSError:
+                        continue
+                    entries.append((status.st_mtime, status.st_size, path))
+        return entries
+
+    def disk_usage(self):
+        """Объем записей кэша на диске, байт."""
+        return sum(size for _, size, _ in self._entries())
+
+    def prune(self, max_bytes=None, keep=None):
+        """
+        Удаляет давно не использованные записи, пока объем на диске больше max_bytes
+        (по умолчанию self.max_bytes). Запись keep не удаляется.
+
+        Returns:
+            Число удаленных записей.
+        """
+        max_bytes = self.max_bytes if max_bytes is None else max_bytes
+        entries = sorted(self._entries())
+        total = sum(size for _, size, _ in entries)
+        removed = 0
+        for _, size, path in entries:
+            if total <= max_bytes:
+                break
+            key = os.path.basename(path)[:-len('.pkl')]
+            if key == keep:
+                continue
+            try:
+                os.unlink(path)
+            except OSError:
+                continue
+            self._memory.pop(key, None)
+            total -= size
+            removed += 1
+        self._disk_bytes = total
+        return removed
+
+    def compute(self, name, **params):
+        """Результат задачи name: из кэша или, при промахе, вычисленный здесь же и сохраненный."""
+        key = task_key(name, params)
+        try:
+            value = self.get(key)
+        except KeyError:
+            profiler.count('cache.misses')
+            with profiler.timer(f'task.{name}'):
+                value = _run_task(name, params)
+            self.put(key, value)
+            return _shared(value)
+        profiler.count('cache.hits')
+        return value
+
+    def clear(self):
+        """Удаляет все записи кэша."""
+        self._memory.clear()
+        for _, _, path in self._entries():
+            os.unlink(path)
+        self._disk_bytes = 0
+
+
+result_cache = ResultCache()  # Общий кэш для GUI и перебора
+
+
+def expand_grid(grid):
+    """
+    Раскрывает сетку параметров в список наборов аргументов.
+
+    Значения-списки — оси перебора (декартово произведение), остальные значения (числа, строки,
+    кортежи вроде x_range) передаются как есть.
+    """
+    axes = {name: value for name, value in grid.items() if isinstance(value, list)}
+    fixed = {name: value for name, value in grid.items() if not isinstance(value, list)}
+    return [dict(fixed, **dict(zip(axes, combination))) for combination in itertools.product(*axes.values())]
+
+
+class SweepScheduler:
+    """
+    Перебор параметров задачи с кэшированием и продолжением после прерывания.
+
+    Args:
+        name: Имя зарегистрированной задачи (см. TASKS).
+        grid: Сетка параметров для expand_grid.
+        cache: ResultCache (по умолчанию — общий кэш в каталоге по умолчанию).
+        max_workers: Число процессов пула; 0 — считать в текущем процессе.
+    """
+
+    def __init__(self, name, grid, cache=None, max_workers=None):
+        if name not in TASKS:
+            raise ValueError(f"Неизвестная задача: {name}")
+        self.name = name
+        self.cache = cache or result_cache
+        self.max_workers = max_workers
+        self.tasks = OrderedDict()  # ключ -> аргументы; повторяющиеся наборы сливаются
+        for params in expand_grid(grid):
+            self.tasks.setdefault(task_key(name, params), params)
+
+    def plan(self):
+        """Словарь: 'unique' (число уникальных задач), 'cached' (уже в кэше), 'pending' (осталось)."""
+        cached = sum(key in self.cache for key in self.tasks)
+        return {'unique': len(self.tasks), 'cached': cached, 'pending': len(self.tasks) - cached}
+
+    def run(self):
+        """
+        Выполняет перебор.
+
+        Yields:
+            Кортежи (аргументы, результат, из_кэша): сначала найденные в кэше, затем по мере готовности.
+        """
+        pending = []
+        for key, params in self.tasks.items():
+            try:
+                value = self.cache.get(key)
+            except KeyError:
+                pending.append((key, params))
+                continue
+            profiler.count('cache.hits')
+            yield params, value, True
+
+        if not pending:
+            return
+        profiler.count('cache.misses', len(pending))
+        if self.max_workers == 0:
+            for key, params in pending:
+                value = _run_task(self.name, params)
+                self.cache.put(key, value)
+                yield params, value, False
+            return
+
+        with ProcessPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = {executor.submit(_run_task, self.name, params): (key, params) for key, params in pending}
+            try:
+                for future in as_completed(futures):
+                    key, params = futures[future]
+                    value = future.result()
+                    self.cache.put(key, value)
+                    yield params, value, False
+            finally:
+                for future in futures:
+                    future.cancel()
+
+    def results(self):
+        """Все результаты перебора в порядке сетки: список пар (аргументы, результат)."""
+        collected = {task_key(self.name, params): value for params, value, _ in self.run()}
+        return [(params, collected[key]) for key, params in self.tasks.items()]
+
+
+def _parse_value(text):
+    """Значение параметра из командной строки; "v1,v2,..." без скобок — ось перебора."""
+    try:
+        value = ast.literal_eval(text)
+    except (ValueError, SyntaxError):
+        return text
+    if isinstance(value, tuple) and not text.lstrip().startswith('('):
+        return list(value)
+    return value
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('task', nargs='?', choices=sorted(TASKS), help='задача')
+    parser.add_argument('params', nargs='*', help='параметр=значение или параметр=v1,v2,... (ось перебора)')
+    parser.add_argument('--workers', type=int, default=None, help='число процессов (0 — без пула)')
+    parser.add_argument('--cache-dir', help='каталог кэша')
+    parser.add_argument('--clear-cache', action='store_true', help='удалить все записи кэша')
+    args = parser.parse_args(argv)
+
+    cache = ResultCache(args.cache_dir)
+    if args.clear_cache:
+        cache.clear()
+        print(f"Кэш очищен: {cache.directory}")
+        if args.task is None:
+            return 0
+    elif args.task is None:
+        parser.error('не указана задача')
+
+    grid = {}
+    for item in args.params:
+        name, _, text = item.partition('=')
+        grid[name] = _parse_value(text)
+
+    scheduler = SweepScheduler(args.task, grid, cache, args.workers)
+    plan = scheduler.plan()
+    print(f"Задач: {plan['unique']}, в кэше: {plan['cached']}, к расчету: {plan['pending']}")
+    for done, (params, _, from_cache) in enumerate(scheduler.run(), 1):
+        varying = {name: params[name] for name in grid if isinstance(grid[name], list)}
+        print(f"[{done}/{plan['unique']}] {'кэш ' if from_cache else 'расчет'} {varying}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,40 @@
+"""
+Вертикальное падение: точное решение против численного предиктор-корректора.
+"""
+import numpy as np
+import pytest
+
+from mkm.ballistics import Physic
+
+
+@pytest.mark.parametrize('initial_height', [10.0, 100.0, 2000.0])
+def test_analytic_fall_matches_predictor_corrector(initial_height):
+    physics = Physic(v0=750.0, vM=150.0)
+    times, heights, velocities = physics.vertical_fall_predictor_corrector(initial_height)
+    _, exact_heights, exact_velocities = physics.vertical_fall_analytic(initial_height, times)
+    np.testing.assert_allclose(velocities, exact_velocities, atol=1e-4)
+    # Корректор высоты в численной схеме первого порядка: ошибка растет как g * t * dt
+    assert np.max(np.abs(heights - exact_heights)) < physics.gravity * times[-1] * physics.dt
+
+    fall_time, impact_speed = physics.fall_time_and_impact_speed(initial_height)
+    assert times[-2] < fall_time <= times[-1]
+    assert impact_speed == pytest.approx(-velocities[-1], abs=0.05)
+
+
+def test_fall_time_vectorized_and_bounded():
+    physics = Physic(v0=750.0, vM=150.0)
+    heights = np.array([0.0, 10.0, 1e7])
+    fall_times, impact_speeds = physics.fall_time_and_impact_speed(heights)
+    assert fall_times[0] == 0.0 and impact_speeds[0] == 0.0
+    assert np.all(np.isfinite(fall_times))
+    assert impact_speeds[-1] == pytest.approx(physics.vM)
+    for height, fall_time in zip(heights, fall_times):
+        assert fall_time == physics.fall_time_and_impact_speed(height)[0]
+
+
+def test_negative_height_raises():
+    physics = Physic(v0=750.0, vM=150.0)
+    with pytest.raises(ValueError):
+        physics.fall_time_and_impact_speed(-1.0)
+    with pytest.raises(ValueError):
+        physics.fall_time_and_impact_speed([5.0, -0.1])
@@ -0,0 +1,41 @@
+"""
+Исследование сходимости на схемах с известным порядком.
+"""
+import numpy as np
+import pytest
+
+from mkm.ballistics import Physic
+from mkm.convergence import ConvergenceStudy
+
+
+def _second_order(step):
+    return 1.0 + 0.5 * step ** 2
+
+
+def _fourth_order(step):
+    return 2.0 - 3.0 * step ** 4
+
+
+@pytest.mark.parametrize('quantity, order, exact', [(_second_order, 2, 1.0), (_fourth_order, 4, 2.0)])
+def test_known_order_is_recovered(quantity, order, exact):
+    result = ConvergenceStudy(quantity, 0.1, levels=6, max_workers=1).run()
+    assert result['order'] == pytest.approx(order, abs=1e-6)
+    np.testing.assert_allclose(result['orders'], order, atol=1e-6)
+    assert result['extrapolated'] == pytest.approx(exact, abs=1e-12)
+
+
+def test_recommended_step_for_second_order_scheme():
+    # Погрешности 0.5 h^2: 5e-3, 1.25e-3, 3.1e-4, ... — tol = 1e-3 впервые выполняется при h = 0.025
+    result = ConvergenceStudy(_second_order, 0.1, levels=6, max_workers=1).run(tol=1e-3)
+    assert result['recommended_step'] == pytest.approx(0.025)
+    assert result['predicted_step'] == pytest.approx(np.sqrt(2e-3))
+    assert ConvergenceStudy(_second_order, 0.1, levels=6, max_workers=1).run(tol=1e-12)['recommended_step'] is None
+
+
+def test_recommended_step_meets_tolerance_for_physic():
+    study = ConvergenceStudy.for_physic(Physic(v0=300.0, vM=150.0, dt=0.02), 'range', levels=5, max_workers=1)
+    result = study.run(tol=0.05)
+    assert result['order'] > 0.5
+    step = result['recommended_step']
+    assert step is not None
+    assert np.all(result['errors'][result['steps'] <= step] <= 0.05)
@@ -0,0 +1,103 @@
+"""
+Колоночный экспорт: запись блоками и чтение через memmap возвращают те же данные поразрядно.
+"""
+import json
+import os
+
+import numpy as np
+import pytest
+
+from mkm.ballistics import Physic
+from mkm.export import (ColumnWriter, export_field_grid, export_particles, export_pendulum, export_trajectory,
+                        load_run, save_columns)
+from mkm.magnet import HorseshoeMagnet
+from mkm.particles import DirectField, ParticleTracker
+from mkm.pendulum import Mathematician, Physicist
+
+
+def _strict_meta(path):
+    """meta.json, разобранный без поддержки NaN/Infinity (как строгими читателями JSON)."""
+    def reject(constant):
+        raise ValueError(f"Недопустимое значение в JSON: {constant}")
+    with open(os.path.join(path, 'meta.json'), encoding='utf-8') as file:
+        return json.load(file, parse_constant=reject)
+
+
+def test_save_columns_round_trip(tmp_path):
+    rng = np.random.default_rng(0)
+    columns = {'x': rng.normal(size=2501), 'n': np.arange(2501, dtype=np.int32),
+               'v': rng.normal(size=(2501, 3)).astype(np.float32)}
+    path = save_columns(str(tmp_path / 'run.mkm'), 'test', {'range': (1, 2), 'scale': np.float64(0.5)},
+                        chunk_rows=1000, **columns)
+    run = load_run(path)
+    assert run.rows == 2501 and sorted(run.columns) == ['n', 'v', 'x']
+    assert run.params == {'range': [1, 2], 'scale': 0.5}
+    for name, values in columns.items():
+        loaded = run[name]
+        assert isinstance(loaded, np.memmap) and not loaded.flags.writeable
+        assert loaded.dtype == values.dtype
+        np.testing.assert_array_equal(loaded, values)
+    assert _strict_meta(path)['complete']
+
+
+def test_empty_columns_round_trip(tmp_path):
+    path = save_columns(str(tmp_path / 'empty.mkm'), 'test', {}, x=np.zeros(0), v=np.zeros((0, 3)))
+    run = load_run(path)
+    assert run.rows == 0
+    assert run['x'].shape == (0,) and run['v'].shape == (0, 3)
+
+
+def test_failed_write_is_marked_incomplete(tmp_path):
+    path = str(tmp_path / 'broken.mkm')
+    with pytest.raises(RuntimeError):
+        with ColumnWriter(path, 'test') as writer:
+            writer.append(x=np.arange(3.0))
+            raise RuntimeError
+    run = load_run(path)
+    assert not run.meta['complete']
+    np.testing.assert_array_equal(run['x'], [0.0, 1.0, 2.0])
+
+
+def test_mismatched_chunks_are_rejected(tmp_path):
+    with ColumnWriter(str(tmp_path / 'bad.mkm'), 'test') as writer:
+        writer.append(x=np.zeros(2), y=np.zeros(2))
+        with pytest.raises(ValueError):
+            writer.append(x=np.zeros(2), y=np.zeros(3))
+        with pytest.raises(ValueError):
+            writer.append(x=np.zeros(2))
+
+
+def test_streaming_exports_match_direct_results(tmp_path):
+    physics = Physic(v0=300.0, vM=150.0)
+    run = load_run(export_trajectory(str(tmp_path / 'trajectory.mkm'), physics, 30.0, 5.0, chunk_size=333))
+    x, y, _ = physics.predictor_corrector(30.0, 5.0)
+    np.testing.assert_array_equal(run['x'], x)
+    np.testing.assert_array_equal(run['y'], y)
+
+    mathematician = Mathematician(Physicist(length=0.7), 0.4, 0.0, 0.001, 0.1, 5000)
+    run = load_run(export_pendulum(str(tmp_path / 'pendulum.mkm'), mathematician, chunk_size=777))
+    t, theta, omega = mathematician.integrate()
+    np.testing.assert_array_equal(run['t'], t)
+    np.testing.assert_array_equal(run['theta'], theta)
+    np.testing.assert_array_equal(run['omega'], omega)
+
+    magnet = HorseshoeMagnet(0.1, 0.05, 0.2, 1e6, 5, 5)
+    run = load_run(export_field_grid(str(tmp_path / 'field.mkm'), magnet, 'Z=0', num_points=20, rows_per_chunk=7))
+    for name, values in zip(('u', 'v', 'Hx', 'Hy', 'Hz'), magnet.field_grid('Z=0', num_points=20)):
+        np.testing.assert_array_equal(run[name], values)
+
+
+def test_particle_export_without_captures_is_strict_json(tmp_path):
+    magnet = HorseshoeMagnet(0.1, 0.05, 0.2, 1e6, 4, 4)
+    positions = np.array([[0.15, 0.02, 0.1], [0.15, 0.03, 0.12]])
+    tracker = ParticleTracker(DirectField(magnet), positions, np.zeros((2, 3)), dt=1e-4)
+    path = export_particles(str(tmp_path / 'particles.mkm'), tracker, steps=10, chunk_steps=4)
+
+    meta = _strict_meta(path)
+    assert meta['params']['capture']['mean_capture_time_north'] is None
+    assert meta['params']['capture']['active'] == 2
+    run = load_run(path)
+    assert run['position'].shape == (10, 2, 3)
+    capture = load_run(os.path.join(path, 'capture.mkm'))
+    np.testing.assert_array_equal(capture['initial_position'], positions)
+    assert np.isnan(capture['stop_time']).all()
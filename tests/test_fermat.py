@@ -0,0 +1,222 @@
+"""
+Решатели принципа Ферма: метод Ньютона против золотого сечения, слоистые среды, эйконал, веер лучей.
+"""
+import subprocess
+import sys
+from functools import partial
+
+import numpy as np
+import pytest
+
+from mkm.fermat import (EikonalSolver, FermatSolver, fan_wavefronts, fermat_crossing_point, fermat_travel_time,
+                        golden_section_crossing_point, grin_lens_index, mirage_index, multilayer_crossing_points,
+                        multilayer_snell_residuals, multilayer_travel_time, ray_fan)
+
+
+def _random_pairs(count, seed=0):
+    rng = np.random.default_rng(seed)
+    A = (rng.uniform(-5, 5, count), rng.uniform(0.1, 5, count))
+    B = (rng.uniform(-5, 5, count), rng.uniform(-5, -0.1, count))
+    n1, n2 = rng.uniform(1.0, 2.5, count), rng.uniform(1.0, 2.5, count)
+    return A, B, n1, n2
+
+
+def test_newton_matches_golden_section_on_random_pairs():
+    A, B, n1, n2 = _random_pairs(2000)
+    newton = fermat_crossing_point(A, B, n1, n2)
+    golden = golden_section_crossing_point(A, B, n1, n2, tol=1e-10)
+    np.testing.assert_allclose(newton, golden, atol=1e-6)
+    assert np.all(fermat_travel_time(newton, A, B, n1, n2) <= fermat_travel_time(golden, A, B, n1, n2) + 1e-12)
+
+    # Закон Снеллиуса в найденной точке выполняется до машинной точности
+    sin1 = (newton - A[0]) / np.hypot(newton - A[0], A[1])
+    sin2 = (B[0] - newton) / np.hypot(B[0] - newton, B[1])
+    np.testing.assert_allclose(n1 * sin1, n2 * sin2, atol=1e-12)
+
+
+def test_newton_scalar_and_degenerate_cases():
+    # Равные показатели — прямая AB; вертикальный луч — точка под A
+    assert fermat_crossing_point((0.0, 1.0), (2.0, -1.0), 1.3, 1.3) == pytest.approx(1.0, abs=1e-14)
+    assert fermat_crossing_point((1.5, 2.0), (1.5, -3.0), 1.0, 1.5) == pytest.approx(1.5, abs=1e-14)
+    solver = FermatSolver((-3.0, 2.0), (4.0, -1.5), 1.0, 1.5, tol=1e-9)
+    result = solver.solve()
+    assert result['newton_x'] == pytest.approx(result['x'], abs=1e-6)
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_two_layer_stack_reduces_to_single_interface(seed):
+    A, B, n1, n2 = _random_pairs(1, seed)
+    A, B, n1, n2 = (A[0][0], A[1][0]), (B[0][0], B[1][0]), n1[0], n2[0]
+    xs = multilayer_crossing_points(A, B, [0.0], [n1, n2])
+    assert xs[0] == pytest.approx(float(fermat_crossing_point(A, B, n1, n2)), abs=1e-10)
+    assert multilayer_travel_time(xs, A, B, [0.0], [n1, n2]) == pytest.approx(
+        float(fermat_travel_time(xs[0], A, B, n1, n2)))
+
+
+def test_multilayer_satisfies_snell_at_every_interface():
+    rng = np.random.default_rng(1)
+    interfaces = np.sort(rng.uniform(-10, 10, 200))[::-1]
+    indices = rng.uniform(1.0, 2.0, 201)
+    A, B = (-3.0, 11.0), (25.0, -11.0)
+    xs = multilayer_crossing_points(A, B, interfaces, indices)
+    invariants, residuals = multilayer_snell_residuals(xs, A, B, interfaces, indices)
+    np.testing.assert_allclose(residuals, 0.0, atol=1e-10)
+    assert np.all(np.diff(np.concatenate(([A[0]], xs, [B[0]]))) > 0)
+
+    # Любое малое смещение точек только увеличивает время прохождения
+    time = multilayer_travel_time(xs, A, B, interfaces, indices)
+    for _ in range(10):
+        shifted = xs + rng.normal(0, 1e-3, xs.shape)
+        assert multilayer_travel_time(shifted, A, B, interfaces, indices) > time
+
+
+def test_multilayer_uniform_stack_is_straight_line():
+    interfaces = [3.0, 1.0, -2.0]
+    A, B = (0.0, 5.0), (10.0, -5.0)
+    xs = multilayer_crossing_points(A, B, interfaces, [1.4] * 4)
+    np.testing.assert_allclose(xs, [2.0, 4.0, 7.0], atol=1e-12)
+
+
+def test_multilayer_rejects_bad_geometry():
+    with pytest.raises(ValueError):
+        multilayer_crossing_points((0.0, 1.0), (1.0, -1.0), [0.0, 0.5], [1.0, 1.2, 1.4])
+    with pytest.raises(ValueError):
+        multilayer_crossing_points((0.0, 1.0), (1.0, -1.0), [0.0], [1.0, 1.2, 1.4])
+
+
+@pytest.mark.parametrize('target', [(5.0, 5.0), (8.0, -3.0), (-9.0, 0.5)])
+def test_eikonal_uniform_medium_is_distance_times_index(target):
+    solver = EikonalSolver(lambda X, Y: 1.5 + 0 * X)
+    expected = 1.5 * np.hypot(*target)
+    assert solver.travel_time((0.0, 0.0), target) == pytest.approx(expected, rel=0.02)
+    path = solver.trace_ray((0.0, 0.0), target)
+    np.testing.assert_array_equal(path[0], (0.0, 0.0))
+    np.testing.assert_array_equal(path[-1], target)
+    # Луч в однородной среде — прямая (с точностью до двух шагов сетки)
+    distances = np.abs(path[:, 0] * target[1] - path[:, 1] * target[0]) / np.hypot(*target)
+    assert distances.max() < 2 * solver.hx
+
+
+def test_mirage_index_does_not_depend_on_domain():
+    mirage = partial(mirage_index, n0=1.0, gradient=0.02)
+    small = EikonalSolver(mirage, (-10, 10), (-10, 10), shape=(201, 201))
+    large = EikonalSolver(mirage, (-20, 20), (-20, 20), shape=(401, 401))
+    np.testing.assert_allclose(small.n, large.n[100:301, 100:301], atol=1e-15)
+    assert mirage(0.0, 0.0) == mirage(0.0, -5.0) == 1.0
+    assert mirage(0.0, 3.0) == pytest.approx(1.06)
+    A, B = (-8.0, 2.0), (8.0, 2.0)
+    assert small.travel_time(A, B) == pytest.approx(large.travel_time(A, B), rel=1e-3)
+
+
+def test_mirage_ray_sags_toward_lower_index():
+    mirage = partial(mirage_index, n0=1.0, gradient=0.02)
+    solver = EikonalSolver(mirage)
+    A, B = (-8.0, 2.0), (8.0, 2.0)
+    path = solver.trace_ray(A, B)
+    assert path[:, 1].min() < 1.6
+    # Путь наименьшего времени не длиннее прямой AB по оптической длине
+    assert solver.travel_time(A, B) < 16.0 * mirage(0.0, 2.0)
+    # Поле времен кэшируется: новый приемник — только обратный ход
+    solver.trace_ray(A, (5.0, 4.0))
+    assert len(solver._fields) == 1
+
+
+def test_grin_axis_ray_is_straight_and_symmetric():
+    solver = EikonalSolver(grin_lens_index)
+    A, B = (-9.0, 0.0), (9.0, 0.0)
+    path = solver.trace_ray(A, B)
+    assert np.abs(path[:, 1]).max() < 0.02
+    assert solver.travel_time(A, B) == pytest.approx(1.5 * 18.0, rel=1e-3)
+    upper = solver.trace_ray(A, (9.0, 1.0))
+    lower = solver.trace_ray(A, (9.0, -1.0))
+    np.testing.assert_allclose(upper[:, 1], -lower[:, 1], atol=0.5 * solver.hy)
+
+
+def _fan_directions(fan):
+    return (fan['ends'] - fan['hits']) / fan['length']
+
+
+def test_ray_fan_obeys_snell_without_tir():
+    A, n1, n2 = (-2.0, 5.0), 1.0, 1.5
+    fan = ray_fan(A, n1, n2, num_rays=10001)
+    assert not fan['tir'].any()
+    np.testing.assert_allclose(fan['hits'][:, 1], 0.0)
+    directions = _fan_directions(fan)
+    np.testing.assert_allclose(np.hypot(directions[:, 0], directions[:, 1]), 1.0)
+    assert np.all(directions[:, 1] < 0)
+    np.testing.assert_allclose(n1 * np.sin(fan['angles']), n2 * directions[:, 0], atol=1e-12)
+
+    # Луч веера, попавший в B, совпадает с решением Ньютона для A -> B
+    B = fan['hits'][7000] + 3.0 * directions[7000]
+    assert float(fermat_crossing_point(A, B, n1, n2)) == pytest.approx(fan['hits'][7000, 0], abs=1e-9)
+
+
+def test_ray_fan_total_internal_reflection():
+    A, n1, n2 = (0.0, 2.0), 1.5, 1.0
+    fan = ray_fan(A, n1, n2, num_rays=2001)
+    critical = np.arcsin(n2 / n1)
+    np.testing.assert_array_equal(fan['tir'], np.abs(fan['angles']) > critical)
+    directions = _fan_directions(fan)
+    reflected = fan['tir']
+    # Отраженный луч: угол отражения равен углу падения, луч уходит вверх
+    np.testing.assert_allclose(directions[reflected, 0], np.sin(fan['angles'][reflected]))
+    assert np.all(directions[reflected, 1] > 0)
+    np.testing.assert_allclose(n1 * np.sin(fan['angles'][~reflected]), n2 * directions[~reflected, 0], atol=1e-12)
+    np.testing.assert_array_equal(fan['second_index'], np.where(reflected, n1, n2))
+
+
+def test_fan_wavefront_points_have_equal_optical_length():
+    A, n1, n2 = (0.0, 2.0), 1.5, 1.0
+    fan = ray_fan(A, n1, n2, num_rays=2001, length=10.0)
+    level = 6.0
+    points = np.concatenate(fan_wavefronts(A, fan, n1, [level]))
+    first = np.hypot(points[:, 0] - A[0], points[:, 1] - A[1])
+    before = np.isclose(n1 * first, level)
+    assert before.any() and not before.all()
+
+    # Точки после границы: находим луч, на котором лежит точка, и его оптическую длину до нее
+    after = points[~before]
+    hits, directions = fan['hits'], _fan_directions(fan)
+    offsets = after[:, None, :] - hits[None, :, :]
+    along = np.einsum('prk,rk->pr', offsets, directions)
+    across = np.abs(offsets[..., 0] * directions[:, 1] - offsets[..., 1] * directions[:, 0])
+    across[along < 0] = np.inf
+    ray = np.argmin(across, axis=1)
+    assert across[np.arange(len(after)), ray].max() < 1e-9
+    optical = n1 * fan['first_length'][ray] + fan['second_index'][ray] * along[np.arange(len(after)), ray]
+    np.testing.assert_allclose(optical, level, rtol=1e-12)
+
+
+def test_ray_fan_requires_source_above_interface():
+    with pytest.raises(ValueError):
+        ray_fan((0.0, -1.0), 1.0, 1.5)
+
+
+def test_solver_trace_is_complete_golden_section_search():
+    solver = FermatSolver((-2.0, 5.0), (6.0, -4.0), 1.0, 1.5)
+    trace, x = solver.golden_section_trace()
+    widths = np.array([state['b'] - state['a'] for state in trace])
+    np.testing.assert_allclose(widths[1:] / widths[:-1], 2 / (1 + np.sqrt(5)))
+    assert widths[-1] > solver.tol >= widths[-1] * 2 / (1 + np.sqrt(5))
+    for state in trace:
+        assert state['a'] <= x <= state['b']
+        assert state['fc'] == solver.time_function(state['c']) and state['fd'] == solver.time_function(state['d'])
+
+    result = solver.solve()
+    assert result['trace'] == trace and result['x'] == x
+    assert result['snell']['ok']
+    assert result['time'] == pytest.approx(float(fermat_travel_time(result['newton_x'], solver.A, solver.B, 1.0, 1.5)))
+
+
+def test_batched_golden_section_matches_solver():
+    A, B, n1, n2 = _random_pairs(50, seed=3)
+    batched = golden_section_crossing_point(A, B, n1, n2)
+    for i in range(50):
+        solver = FermatSolver((A[0][i], A[1][i]), (B[0][i], B[1][i]), n1[i], n2[i])
+        assert batched[i] == pytest.approx(solver.golden_section_trace()[1], abs=1e-12)
+
+
+def test_fermat_core_imports_without_gui():
+    code = "import sys, mkm.fermat; print(sorted({'PyQt5', 'matplotlib'} & set(sys.modules)))"
+    output = subprocess.run([sys.executable, '-c', code], check=True, capture_output=True, text=True).stdout
+    assert output.strip() == '[]'
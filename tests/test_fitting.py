@@ -0,0 +1,41 @@
+"""
+Подгонка параметров маятника по модельным записям с известными параметрами.
+"""
+import numpy as np
+import pytest
+
+from mkm.fitting import PARAMETERS, PendulumFit, benchmark_synthetic, synthetic_recording
+
+TRUTH = {'length': 1.2, 'damping': 0.05, 'theta0': 0.6, 'omega0': 0.3}
+
+
+def test_exact_recording_is_recovered():
+    t, theta = synthetic_recording(points=20000, **TRUTH)
+    result = PendulumFit(t, theta).fit()
+    assert result['converged']
+    for name in PARAMETERS:
+        assert result['parameters'][name] == pytest.approx(TRUTH[name], abs=1e-8)
+    assert result['rms_residual'] < 1e-10
+
+
+def test_true_parameters_fall_inside_confidence_intervals():
+    benchmark = benchmark_synthetic(points=20000, noise=0.002, seed=3)
+    result = benchmark['result']
+    assert result['converged']
+    assert all(benchmark['within_interval'].values()), result['confidence_intervals']
+    assert result['rms_residual'] == pytest.approx(0.002, rel=0.05)
+
+    # Интервалы сужаются с уровнем доверия и остаются вокруг оценки
+    narrow = PendulumFit(*synthetic_recording(points=20000, noise=0.002, seed=3, **TRUTH)).fit(confidence=0.5)
+    for name in PARAMETERS:
+        low, high = result['confidence_intervals'][name]
+        narrow_low, narrow_high = narrow['confidence_intervals'][name]
+        assert low < narrow_low < narrow['parameters'][name] < narrow_high < high
+
+
+def test_recording_must_be_evenly_sampled():
+    t, theta = synthetic_recording(points=100)
+    with pytest.raises(ValueError):
+        PendulumFit(t[:-1], theta)
+    with pytest.raises(ValueError):
+        PendulumFit(np.r_[t[:50], t[51:], t[-1] + 0.5], theta)
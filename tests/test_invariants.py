@@ -0,0 +1,68 @@
+"""
+Точные инварианты численного ядра: пакетные и векторные версии совпадают с исходными поразрядно,
+результат Монте-Карло не зависит от числа процессов.
+
+    python -m pytest -q tests
+"""
+import numpy as np
+import pytest
+
+from mkm.ballistics import MonteCarloDispersion, Physic
+from mkm.pendulum import Mathematician, Physicist
+
+DISTRIBUTIONS = {
+    'v0': ('normal', 750.0, 5.0),
+    'vM': ('uniform', 140.0, 160.0),
+    'wind_speed': ('triangular', -5.0, 0.0, 5.0),
+    'angle': ('normal', 45.0, 0.5),
+}
+
+
+def _dispersion(max_workers):
+    analysis = MonteCarloDispersion(DISTRIBUTIONS, dt=0.05, batch_size=250, max_workers=max_workers, seed=12345)
+    return analysis.analyze(1000)
+
+
+def test_monte_carlo_independent_of_worker_count():
+    single, parallel = _dispersion(1), _dispersion(3)
+    assert single['count'] == parallel['count'] == 1000
+    for name in ('mean_range', 'mean_time', 'covariance', 'range_hist', 'time_hist', 'range_edges'):
+        np.testing.assert_array_equal(single[name], parallel[name])
+
+
+@pytest.mark.parametrize('angle, wind_speed', [(30.0, 0.0), (45.0, 20.0), (70.0, -10.0)])
+def test_predictor_corrector_batch_matches_scalar(angle, wind_speed):
+    physics = Physic(v0=750.0, vM=150.0)
+    x, _, time = physics.predictor_corrector(angle, wind_speed)
+    ranges, times = physics.predictor_corrector_batch([angle, angle], wind_speed)
+    assert ranges[0] == ranges[1] == x[-1]
+    assert times[0] == times[1] == time
+
+
+def test_integrate_batch_matches_integrate():
+    mathematician = Mathematician(Physicist(length=1.2), 0.5, 0.1, 0.001, 0.05, 5000)
+    lengths, theta0s, omega0s, dampings = [1.2, 0.8], [0.5, 1.0], [0.1, 0.0], [0.05, 0.2]
+    t, theta, omega = mathematician.integrate_batch(lengths, theta0s, omega0s, dampings)
+    for column, parameters in enumerate(zip(lengths, theta0s, omega0s, dampings)):
+        length, theta0, omega0, damping = parameters
+        expected = Mathematician(Physicist(length=length), theta0, omega0, 0.001, damping, 5000).integrate()
+        np.testing.assert_array_equal(t, expected[0])
+        np.testing.assert_array_equal(theta[:, column], expected[1])
+        np.testing.assert_array_equal(omega[:, column], expected[2])
+
+
+@pytest.mark.parametrize('angle', [10.0, 45.0, 70.0])
+def test_3d_without_wind_and_atmosphere_matches_2d(angle):
+    physics = Physic(v0=750.0, vM=150.0)
+    x, y, time = physics.predictor_corrector(angle)
+    x3, y3, z3, time3 = physics.predictor_corrector_3d(angle)
+    np.testing.assert_array_equal(x, x3)
+    np.testing.assert_array_equal(y, y3)
+    assert time == time3 and not z3.any()
+
+    angles = np.linspace(5.0, 85.0, 50)
+    ranges, times = physics.predictor_corrector_batch(angles)
+    ranges3, drifts3, times3 = physics.predictor_corrector_3d_batch(angles)
+    np.testing.assert_array_equal(ranges, ranges3)
+    np.testing.assert_array_equal(times, times3)
+    assert not drifts3.any()
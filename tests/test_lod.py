@@ -0,0 +1,79 @@
+"""
+Прореживание графиков: форма кривой (концы, пики) сохраняется, число точек и стрелок ограничено.
+"""
+import numpy as np
+import pytest
+
+from mkm.lod import LodAxes, lttb_indices, minmax_indices, thin_grid, visible_indices
+
+
+def _series_with_spikes(n=1000000):
+    x = np.linspace(0.0, 100.0, n)
+    y = np.sin(x)
+    spikes = [n // 81, n // 2, n - n // 77]
+    y[spikes] = [25.0, -40.0, 30.0]
+    return x, y, spikes
+
+
+def test_minmax_keeps_spikes_and_endpoints():
+    x, y, spikes = _series_with_spikes()
+    keep = minmax_indices(x, y, 1000)
+    assert len(keep) <= 4 * 1000 + 4
+    assert keep[0] == 0 and keep[-1] == len(x) - 1
+    assert set(spikes) <= set(keep)
+    assert np.all(np.diff(keep) > 0)
+    assert y[keep].min() == y.min() and y[keep].max() == y.max()
+
+
+def test_lttb_keeps_spikes_and_endpoints():
+    x, y, spikes = _series_with_spikes(200000)
+    keep = lttb_indices(x, y, 500)
+    assert len(keep) == 500
+    assert keep[0] == 0 and keep[-1] == len(x) - 1
+    assert set(spikes) <= set(keep) and np.all(np.diff(keep) > 0)
+    assert y[keep].min() == y.min() and y[keep].max() == y.max()
+
+
+def test_short_series_are_not_reduced():
+    x = np.arange(50.0)
+    np.testing.assert_array_equal(minmax_indices(x, x, 100), np.arange(50))
+    np.testing.assert_array_equal(lttb_indices(x, x, 100), np.arange(50))
+
+
+@pytest.mark.parametrize('nodes, pixels, spacing', [(300, 600, 18), (1000, 800, 10), (20, 1000, 18), (5000, 50, 18)])
+def test_thin_grid_bounds_arrow_count(nodes, pixels, spacing):
+    coordinates = np.linspace(-1.0, 1.0, nodes)
+    limits = (-0.5, 0.7)
+    selected = thin_grid(coordinates, limits, pixels, spacing)
+    assert 1 <= len(selected) <= max(int(pixels / spacing), 1)
+    assert np.all((coordinates[selected] >= -0.5) & (coordinates[selected] <= 0.7))
+    visible = np.count_nonzero((coordinates >= -0.5) & (coordinates <= 0.7))
+    if visible <= pixels / spacing:
+        assert len(selected) == visible
+    assert len(thin_grid(coordinates, (2.0, 3.0), pixels, spacing)) == 0
+
+
+def test_visible_indices_include_neighbours():
+    x = np.arange(10.0)
+    np.testing.assert_array_equal(visible_indices(x, x, (2.5, 5.5), (0, 10), monotonic=True), np.arange(2, 7))
+    np.testing.assert_array_equal(visible_indices(x, x, (2.5, 5.5), (0, 10), monotonic=False), np.arange(2, 7))
+
+
+def test_lod_axes_restores_full_detail_when_zoomed():
+    matplotlib = pytest.importorskip('matplotlib')
+    matplotlib.use('Agg')
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+    figure = Figure(figsize=(4, 3), dpi=100)
+    FigureCanvasAgg(figure)
+    ax = figure.subplots()
+    lod = LodAxes(ax)
+    x, y, spikes = _series_with_spikes()
+    line = lod.plot(x, y, monotonic=True)
+    assert len(line.get_xdata()) < 6 * 400
+    assert line.get_ydata().max() == 30.0 and line.get_ydata().min() == -40.0
+
+    ax.set_xlim(x[spikes[1] - 50], x[spikes[1] + 50])
+    lod.refresh()
+    np.testing.assert_array_equal(line.get_xdata(), x[spikes[1] - 51:spikes[1] + 52])
@@ -0,0 +1,80 @@
+"""
+Частицы в поле магнита: интегратор Бориса сохраняет энергию, решетка поля согласована с прямым суммированием.
+"""
+import numpy as np
+import pytest
+
+from mkm.magnet import HorseshoeMagnet
+from mkm.particles import NORTH, DirectField, FieldLattice, ParticleTracker, induced_dipole_coefficient
+
+
+@pytest.fixture(scope='module')
+def magnet():
+    return HorseshoeMagnet(0.1, 0.05, 0.2, 1e6, 10, 10)
+
+
+@pytest.fixture(scope='module')
+def lattice(magnet):
+    return FieldLattice(magnet, spacing=0.01)
+
+
+def _points_above_poles(field, count, z_min, seed=0):
+    rng = np.random.default_rng(seed)
+    bounds = np.array(field.bounds)
+    points = rng.uniform(bounds[:, 0], bounds[:, 1], size=(count, 3))
+    points[:, 2] = rng.uniform(z_min, bounds[2, 1], count)
+    return points
+
+
+@pytest.mark.parametrize('dt', [1e-6, 1e-4])
+def test_boris_preserves_speed(lattice, dt):
+    rng = np.random.default_rng(1)
+    positions = rng.uniform([0.0, 0.0, 0.03], [0.3, 0.05, 0.1], size=(200, 3))
+    tracker = ParticleTracker(lattice, positions, rng.normal(size=(200, 3)) * 10.0 / (dt / 1e-6),
+                              charge_to_mass=1e5, dt=dt)
+    initial = tracker._v.copy()
+    for _ in tracker.run(3000, chunk_steps=1000):
+        pass
+    assert tracker.active.size > 100
+    before, after = initial[tracker.active], tracker._v
+    speed_before, speed_after = np.linalg.norm(before, axis=1), np.linalg.norm(after, axis=1)
+    np.testing.assert_allclose(speed_after, speed_before, rtol=1e-12)
+    # Поле действительно поворачивает скорости, иначе проверка ничего не значит
+    turn = np.einsum('ij,ij->i', before, after) / (speed_before * speed_after)
+    assert np.median(turn) < 0.9
+
+
+def test_lattice_matches_direct_field_away_from_poles(magnet, lattice):
+    points = _points_above_poles(lattice, 2000, z_min=0.05)
+    H = magnet.field_at(points)
+    error = np.linalg.norm(lattice(points) - H, axis=1) / np.linalg.norm(H, axis=1)
+    assert error.max() < 0.02 and np.median(error) < 2e-3
+
+    _, gradient = DirectField(magnet)(points, gradient=True)
+    _, approximation = lattice(points, gradient=True)
+    error = np.linalg.norm(approximation - gradient, axis=1) / np.linalg.norm(gradient, axis=1)
+    assert error.max() < 0.05 and np.median(error) < 0.01
+
+
+def test_lattice_error_decreases_with_spacing(magnet, lattice):
+    points = _points_above_poles(lattice, 1000, z_min=0.05, seed=2)
+    H = magnet.field_at(points)
+    coarse = FieldLattice(magnet, spacing=0.02)
+    errors = [np.median(np.linalg.norm(field(points) - H, axis=1) / np.linalg.norm(H, axis=1))
+              for field in (coarse, lattice)]
+    assert errors[1] < errors[0] / 2
+
+
+def test_dipole_particle_is_captured_by_pole(magnet, lattice):
+    start = np.array([[0.05, 0.025, 0.03]])
+    tracker = ParticleTracker(lattice, start, np.zeros((1, 3)), mode='dipole',
+                              coefficient=induced_dipole_coefficient(1000, 7870), drag=50.0,
+                              acceleration=(0.0, 0.0, -9.81), dt=1e-4)
+    for _ in tracker.run(20000):
+        pass
+    assert tracker.status[0] == NORTH
+    stop = tracker.positions[0]
+    assert stop[2] == pytest.approx(0.0, abs=1e-12)
+    assert 0.0 <= stop[0] <= magnet.a and 0.0 <= stop[1] <= magnet.b
+    statistics = tracker.statistics()
+    assert statistics['north'] == 1 and statistics['capture_fraction'] == 1.0
@@ -0,0 +1,84 @@
+"""
+Сервис симуляций: пакеты JSON-RPC, уведомления и ошибки отдельных запросов внутри общего пакета расчета.
+"""
+import asyncio
+import json
+import os
+import subprocess
+import sys
+
+import numpy as np
+import pytest
+
+from mkm.ballistics import Physic
+from mkm.service import INVALID_PARAMS, INVALID_REQUEST, SimulationService
+from mkm.sweep import ResultCache
+
+
+def _request(request_id, method, **params):
+    return {'jsonrpc': '2.0', 'id': request_id, 'method': method, 'params': params}
+
+
+def _handle(tmp_path, *messages):
+    """Обрабатывает сообщения одновременно (как из одного соединения) и возвращает ответы."""
+    async def run():
+        service = SimulationService(max_workers=1, cache=ResultCache(str(tmp_path)), batch_delay=0.05)
+        await service.start()
+        try:
+            return await asyncio.gather(*(service.handle(message) for message in messages)), service.stats
+        finally:
+            service.close()
+    return asyncio.run(run())
+
+
+def test_invalid_request_fails_alone_in_a_batch(tmp_path):
+    valid = [_request(i, 'ballistics.range', v0=300.0, vM=150.0, angle=10.0 * i) for i in range(1, 5)]
+    invalid = [_request('nan', 'ballistics.range', v0=300.0, vM=150.0, angle='30'),
+               _request('dt', 'ballistics.range', v0=300.0, vM=150.0, angle=30.0, dt=0.0),
+               _request('vector', 'fermat.crossing_point', A=[0.0, 1.0, 2.0], B=[1.0, -1.0], n1=1.0, n2=1.5),
+               _request('point', 'magnet.field', point=[0.0, 0.0])]
+    responses, stats = _handle(tmp_path, *valid[:2], *invalid, *valid[2:])
+    by_id = {response['id']: response for response in responses}
+
+    assert {name for name, response in by_id.items() if 'error' in response} == {'nan', 'dt', 'vector', 'point'}
+    assert all(by_id[name]['error']['code'] == INVALID_PARAMS for name in ('nan', 'dt', 'vector', 'point'))
+    assert stats['batches'] == 1 and stats['batched_requests'] == 4
+    ranges, times = Physic(v0=300.0, vM=150.0).predictor_corrector_batch(np.arange(10.0, 41.0, 10.0))
+    for request_id, expected in zip(range(1, 5), ranges):
+        assert by_id[request_id]['result']['range'] == pytest.approx(expected)
+
+
+def test_integer_params_are_coerced(tmp_path):
+    (response,), _ = _handle(tmp_path, _request(1, 'magnet.field', Na=2, Nb=2, M=1000000, point=[0, 0, 1]))
+    assert len(response['result']) == 3 and all(isinstance(value, float) for value in response['result'])
+
+
+def test_batch_array_and_notifications(tmp_path):
+    notification = {'jsonrpc': '2.0', 'method': 'ballistics.range', 'params': {'v0': 1}}  # Ошибка без ответа
+    (batch, single, empty), stats = _handle(
+        tmp_path,
+        [_request(1, 'system.ping'), notification, {'jsonrpc': '2.0', 'method': 'system.ping'},
+         _request(2, 'fermat.crossing_point', A=[0, 1], B=[1, -1], n1=1, n2=1)],
+        notification,
+        [])
+    assert [response['id'] for response in batch] == [1, 2]
+    assert batch[0]['result'] == 'pong' and batch[1]['result']['x'] == pytest.approx(0.5)
+    assert single is None
+    assert empty['error']['code'] == INVALID_REQUEST
+    assert stats['errors'] == 2
+
+
+def test_stdio_transport(tmp_path):
+    lines = [json.dumps(_request(1, 'system.ping')),
+             '{"jsonrpc": "2.0", "method": "system.ping"}',
+             json.dumps([_request(2, 'ballistics.range', v0=300, vM=150, angle=45),
+                         _request(3, 'ballistics.range', v0=300, vM=150, angle=45, gravity=-1)]),
+             'не JSON']
+    process = subprocess.run([sys.executable, '-m', 'mkm.service', 'serve', '--stdio', '--workers', '1'],
+                             input='\n'.join(lines) + '\n', capture_output=True, text=True, timeout=120,
+                             env=dict(os.environ, MKM_CACHE_DIR=str(tmp_path)))
+    responses = [json.loads(line) for line in process.stdout.splitlines()]
+    assert len(responses) == 3
+    batch = next(response for response in responses if isinstance(response, list))
+    assert {response['id']: 'error' in response for response in batch} == {2: False, 3: True}
+    assert {'id': 1, 'jsonrpc': '2.0', 'result': 'pong'} in responses
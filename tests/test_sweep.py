@@ -0,0 +1,99 @@
+"""
+Кэш результатов и перебор параметров: попадания, вытеснение по объему, продолжение прерванного перебора.
+"""
+import os
+import time
+
+import numpy as np
+import pytest
+
+from mkm.sweep import TASKS, ResultCache, SweepScheduler, task_key
+
+CALLS = []
+
+
+def _counted_task(x=1.0, scale=2.0):
+    CALLS.append(x)
+    return {'x': x, 'values': np.full(1000, x * scale)}
+
+
+@pytest.fixture
+def counted(monkeypatch):
+    CALLS.clear()
+    monkeypatch.setitem(TASKS, 'test.counted', _counted_task)
+    return CALLS
+
+
+def test_compute_hits_cache_across_instances(tmp_path, counted):
+    cache = ResultCache(str(tmp_path))
+    first = cache.compute('test.counted', x=3.0)
+    again = ResultCache(str(tmp_path)).compute('test.counted', x=3.0, scale=2.0)  # Значение по умолчанию явно
+    assert counted == [3.0]
+    np.testing.assert_array_equal(first['values'], again['values'])
+    assert task_key('test.counted', {'x': 3.0}) in cache
+    assert task_key('test.counted', {'x': 4.0}) not in cache
+
+
+def test_values_are_read_only(tmp_path, counted):
+    cache = ResultCache(str(tmp_path))
+    result = cache.compute('test.counted', x=1.0)
+    with pytest.raises(ValueError):
+        result['values'][0] = 0.0
+    result['x'] = 'changed'
+    for reader in (cache, ResultCache(str(tmp_path))):
+        value = reader.compute('test.counted', x=1.0)
+        assert value['x'] == 1.0 and not value['values'].flags.writeable
+    assert counted == [1.0]
+
+
+def test_put_prunes_least_recently_used_to_budget(tmp_path, counted):
+    cache = ResultCache(str(tmp_path))
+    cache.compute('test.counted', x=0.0)
+    entry = cache.disk_usage()
+    cache = ResultCache(str(tmp_path), memory_items=0, max_bytes=int(3.5 * entry))
+    for x in (1.0, 2.0):
+        time.sleep(0.01)
+        cache.compute('test.counted', x=x)
+    time.sleep(0.01)
+    cache.get(task_key('test.counted', {'x': 0.0}))  # Чтение обновляет время использования
+    time.sleep(0.01)
+    cache.compute('test.counted', x=3.0)
+
+    assert cache.disk_usage() <= cache.max_bytes
+    kept = {x for x in (0.0, 1.0, 2.0, 3.0) if task_key('test.counted', {'x': x}) in cache}
+    assert kept == {0.0, 2.0, 3.0}
+
+
+def test_zero_budget_writes_nothing(tmp_path, counted):
+    cache = ResultCache(str(tmp_path), max_bytes=0)
+    assert cache.max_bytes == 0
+    cache.compute('test.counted', x=1.0)
+    assert cache.disk_usage() == 0 and not os.listdir(tmp_path)
+
+
+def test_clear_removes_everything(tmp_path, counted):
+    cache = ResultCache(str(tmp_path))
+    cache.compute('test.counted', x=1.0)
+    cache.clear()
+    assert cache.disk_usage() == 0
+    cache.compute('test.counted', x=1.0)
+    assert counted == [1.0, 1.0]
+
+
+def test_sweep_deduplicates_and_resumes(tmp_path, counted):
+    grid = {'x': [1.0, 2.0, 1.0, 3.0, 2.0, 4.0]}
+    scheduler = SweepScheduler('test.counted', grid, ResultCache(str(tmp_path)), max_workers=0)
+    assert scheduler.plan() == {'unique': 4, 'cached': 0, 'pending': 4}
+
+    # Прерывание после двух результатов: они уже записаны
+    run = scheduler.run()
+    next(run), next(run)
+    run.close()
+    assert counted == [1.0, 2.0]
+
+    resumed = SweepScheduler('test.counted', grid, ResultCache(str(tmp_path)), max_workers=0)
+    assert resumed.plan() == {'unique': 4, 'cached': 2, 'pending': 2}
+    results = resumed.results()
+    assert counted == [1.0, 2.0, 3.0, 4.0]
+    assert [params['x'] for params, _ in results] == [1.0, 2.0, 3.0, 4.0]
+    assert all(value['values'][0] == 2 * params['x'] for params, value in results)